@@ -0,0 +1,160 @@
+"""
+Atmosphere module - Density, speed of sound, viscosity, temperature and pressure of the air over altitude
+
+An Atmosphere is tabulated once on a uniform grid of altitudes above the launch site, from the International
+Standard Atmosphere (ISA, see Atmosphere.standard) or from a sounding (measured temperature and pressure over
+altitude, see Atmosphere.from_sounding). Lookups interpolate linearly in the table by arithmetic, for one
+altitude (the last one is cached, all force models of a RHS call share it) or for an array of altitudes.
+
+--Propulse NTNU--
+"""
+import numpy as np
+from scipy.constants import R, g
+
+m = 28.9644e-3  # Molecular mass of air [kg/mol]
+Rair = R/m  # Specific gas constant of air [J/(kg K)]
+gamma = 1.4  # Heat capacity ratio of air
+sutherland = (1.458e-6, 110.4)  # Dynamic viscosity mu = beta*T^1.5/(T + S) (Sutherland's law)
+
+# ISA layers: base altitude (geopotential) [m] and temperature gradient [K/m], sea level temperature and pressure
+standardLayers = ((0, -6.5e-3), (11000, 0), (20000, 1e-3), (32000, 2.8e-3), (47000, 0), (51000, -2.8e-3),
+                  (71000, -2e-3))
+standardTemperature = 288.15  # [K]
+standardPressure = 101325  # [Pa]
+
+# Columns of the table (see Atmosphere.evaluate)
+DENSITY = 0
+SPEED_OF_SOUND = 1
+KINEMATIC_VISCOSITY = 2
+TEMPERATURE = 3
+PRESSURE = 4
+
+
+def standardTemperaturePressure(altitude):
+    """
+    :param altitude: [np.array] altitudes above sea level [m]
+    :return: temperature [K] and pressure [Pa] of the ISA at the altitudes
+    """
+    altitude = np.asarray(altitude, dtype=float)
+    temperature, pressure = np.empty_like(altitude), np.empty_like(altitude)
+    baseTemperature, basePressure = standardTemperature, standardPressure
+
+    def layer(dz, gradient):
+        if gradient == 0:
+            return np.full(np.shape(dz), baseTemperature), basePressure*np.exp(-g*dz/(Rair*baseTemperature))
+        T = baseTemperature + gradient*dz
+        return T, basePressure*(T/baseTemperature)**(-g/(Rair*gradient))
+
+    for i, (base, gradient) in enumerate(standardLayers):
+        # The first layer continues below sea level, the last one above its base
+        lower = -np.inf if i == 0 else base
+        top = standardLayers[i + 1][0] if i + 1 < len(standardLayers) else np.inf
+        inLayer = (altitude >= lower) & (altitude < top)
+        temperature[inLayer], pressure[inLayer] = layer(altitude[inLayer] - base, gradient)
+        if np.isfinite(top):
+            baseTemperature, basePressure = [float(value[0]) for value in layer(np.array([top - base]), gradient)]
+    return temperature, pressure
+
+
+class Atmosphere:
+    def __init__(self, altitude, temperature, pressure, groundAltitude=0, step=10, height=40e3):
+        """
+        :param altitude: [np.array] increasing altitudes above sea level of the profile [m]
+        :param temperature: [np.array] temperature at the altitudes [K]
+        :param pressure: [np.array] pressure at the altitudes [Pa] (outside of the profile the pressure is
+                         continued with the hydrostatic equation)
+        :param groundAltitude: [float] altitude of the launch site above sea level [m]
+        :param step: [float] spacing of the table [m]
+        :param height: [float] top of the table above the launch site [m], higher altitudes use the top
+        """
+        altitude, temperature = np.asarray(altitude, dtype=float), np.asarray(temperature, dtype=float)
+        logPressure = np.log(np.asarray(pressure, dtype=float))
+        if len(altitude) < 2 or np.any(np.diff(altitude) <= 0):
+            raise ValueError("The altitudes of an atmosphere profile must be increasing (at least 2 points).")
+        self.__groundAltitude = groundAltitude
+        self.__step = step
+        z = np.arange(0, height + step/2, step) + groundAltitude
+        T = np.interp(z, altitude, temperature)
+        # Pressure decreases exponentially, interpolate its logarithm
+        lnP = np.interp(z, altitude, logPressure)
+        # Hydrostatic equation d(lnP)/dz = -g/(Rair*T) outside of the profile
+        inverse = 1/T
+        hydrostatic = np.concatenate(([0], np.cumsum(-g/Rair*(inverse[1:] + inverse[:-1])/2*np.diff(z))))
+        for edge, outside, value in ((altitude[0], z < altitude[0], logPressure[0]),
+                                     (altitude[-1], z > altitude[-1], logPressure[-1])):
+            lnP[outside] = value + hydrostatic[outside] - np.interp(edge, z, hydrostatic)
+        P = np.exp(lnP)
+        density = P/(Rair*T)
+        mu = sutherland[0]*T**1.5/(T + sutherland[1])
+        self.__table = np.stack((density, np.sqrt(gamma*Rair*T), mu/density, T, P), axis=1)
+        self.__tableList = self.__table.tolist()
+        # The last scalar lookup
+        self.__lastAltitude, self.__lastValues = None, None
+
+    def evaluate(self, z):
+        """
+        :param z: [float or np.array] altitude above the launch site [m]
+        :return: density [kg/m^3], speed of sound [m/s], kinematic viscosity [m^2/s], temperature [K] and
+                 pressure [Pa] at the altitude (floats or arrays of the shape of z)
+        """
+        n = len(self.__tableList)
+        if np.ndim(z) == 0:
+            z = float(z)
+            if z != self.__lastAltitude:
+                s = min(max(z/self.__step, 0.0), n - 1.0)
+                i = min(int(s), n - 2)
+                f = s - i
+                self.__lastValues = tuple(a + f*(b - a) for a, b in zip(self.__tableList[i],
+                                                                          self.__tableList[i + 1]))
+                self.__lastAltitude = z
+            return self.__lastValues
+        s = np.clip(np.asarray(z, dtype=float)/self.__step, 0, n - 1)
+        i = np.minimum(s.astype(int), n - 2)
+        f = (s - i)[..., np.newaxis]
+        values = self.__table[i] + f*(self.__table[i + 1] - self.__table[i])
+        return tuple(np.moveaxis(values, -1, 0))
+
+    def getDensity(self, z):
+        return self.evaluate(z)[DENSITY]
+
+    def getSpeedOfSound(self, z):
+        return self.evaluate(z)[SPEED_OF_SOUND]
+
+    def getKinematicViscosity(self, z):
+        return self.evaluate(z)[KINEMATIC_VISCOSITY]
+
+    def getTemperature(self, z):
+        return self.evaluate(z)[TEMPERATURE]
+
+    def getPressure(self, z):
+        return self.evaluate(z)[PRESSURE]
+
+    def getGroundAltitude(self):
+        return self.__groundAltitude
+
+    def getTables(self):
+        """
+        :return: grid spacing [m] and the table (columns DENSITY, SPEED_OF_SOUND, ... of this module) starting at
+                 the launch site
+        """
+        return self.__step, self.__table
+
+    @staticmethod
+    def standard(groundAltitude=0, temperatureOffset=0, step=10, height=40e3):
+        """
+        :param temperatureOffset: [float] offset of the temperature from the ISA (e.g. ISA+10) [K]
+        :return: [Atmosphere] the International Standard Atmosphere (see Atmosphere.__init__ for the other parameters)
+        """
+        altitude = np.arange(0, height + step/2, step) + groundAltitude
+        temperature, pressure = standardTemperaturePressure(altitude)
+        return Atmosphere(altitude, temperature + temperatureOffset, pressure, groundAltitude, step, height)
+
+    @staticmethod
+    def from_sounding(file, groundAltitude=0, step=10, height=40e3):
+        """
+        Assuming the sounding is a text file with one header row and columns: altitude above sea level [m],
+        temperature [K], pressure [Pa].
+        """
+        sounding = np.loadtxt(file, skiprows=1, dtype=float, ndmin=2)
+        sounding = sounding[np.argsort(sounding[:, 0])]
+        return Atmosphere(sounding[:, 0], sounding[:, 1], sounding[:, 2], groundAltitude, step, height)
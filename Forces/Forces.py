@@ -8,6 +8,7 @@ Last edit: 04.02.2019
 """
 import numpy as np
 from scipy.constants import R, g, atmosphere
+from Atmosphere import Atmosphere
 
 T0 = 20 + 273 # Temperature at sea level [K]
 P0 = atmosphere # Air pressure at sea level [Pa]
@@ -17,6 +18,22 @@ h = R*T0/(m*g)  # Height constant of Air ~ 1e4 [m]
 nu = 1.511e-5  # Kinematic viscosity of air [m^2/s]
 c = 343  # Speed of sound (at 293K) [m/s] 
 
+# The atmosphere of the force models (see getAtmosphere and setAtmosphere)
+currentAtmosphere = Atmosphere.standard()
+
+def getAtmosphere():
+    """
+    :return: [Atmosphere] the atmosphere used by the force models (the ISA unless set with setAtmosphere)
+    """
+    return currentAtmosphere
+
+def setAtmosphere(atmosphere):
+    """
+    :param atmosphere: [Atmosphere] e.g. Atmosphere.from_sounding of the launch site
+    """
+    global currentAtmosphere
+    currentAtmosphere = atmosphere
+
 # Forces
 def Drag1(rocket, position, linearVelocityBody, AoA):
     """
@@ -31,14 +48,15 @@ def Drag1(rocket, position, linearVelocityBody, AoA):
     z = abs(position[2])  # Vertical position of rocket
     velocity = np.array([linearVelocityBody[0], 0, 0])  # component along body x-axis that contributes
     speed = np.linalg.norm(velocity)
-    M = speed/c
+    density, speedOfSound, viscosity = currentAtmosphere.evaluate(z)[:3]
+    M = speed/speedOfSound
     AwetNose = rocket.getNose().getSurfaceArea()
     AwetBody = rocket.getBody().getSurfaceArea()
     N = rocket.getNumberOfFins()
     AwetFins = 2*N*rocket.getFin().getSurfaceArea()
     Awet = AwetNose + AwetBody + AwetFins
     D = rocket.getBody().getDiameter()
-    R = speed*D/nu  # Reynold's number (Kinematic viscosity)
+    R = speed*D/viscosity  # Reynold's number (Kinematic viscosity)
     Rcrit = 51*(100e-6/D)**(-1.039)
     Cf = 0
     # Conditions for different R
@@ -55,7 +73,7 @@ def Drag1(rocket, position, linearVelocityBody, AoA):
     else:
         Cf = Cf/(1 + 0.15*M**2)**0.58
         
-    k = 1/2*rho0*Awet*Cf*np.exp(-z/h)
+    k = 1/2*density*Awet*Cf
     
     return -k*speed*velocity
 
@@ -63,63 +81,94 @@ def Drag2(rocket, position, linearVelocityBody, AoA):
     """
     Reference: "Estimating the dynamic and aerodynamic paramters of
     passively controlled high power rockets for flight simulaton" by Simon B. .. Feb 2009
-    
+       Assuming contribution to drag is component of velocity along body (see dragCoefficient).
+
     :param rocket: [rocket class] The rocket object
     :param position: [np.array] The position vector in world coordinates
     :param linearVelocity: [np.array] The current rocket velocity in body coord. (with wind)
-    :return: [float] Lift force in the body frame [N]
+    :return: [np.array] drag force in the body frame [N]
     """
     z = abs(position[2])  # Vertical position of rocket
     velocity = np.array([linearVelocityBody[0], 0, 0])  # component along body x-axis that contributes
     speed = np.linalg.norm(velocity)
-    M = speed/c
+    density, speedOfSound, viscosity = currentAtmosphere.evaluate(z)[:3]
+    M = speed/speedOfSound
+    R = speed*rocket.getLength()/viscosity  # Reynold's number of the rocket
+    Cd = dragCoefficient(rocket, M, R)
+    k = 1/2*density*rocket.getAref()*Cd
+
+    return -k*speed*velocity
+
+def skinFriction(R, M):
+    """
+    Skin friction coefficient of a flat plate, laminar up to the critical Reynold's number and turbulent
+    (with the laminar part) above, corrected for compressibility as in Drag1.
+
+    :param R: [float or np.array] Reynold's number
+    :param M: [float or np.array] Mach number
+    """
     Rcrit = 5e5
-    # For body and nose
-    Lb = rocket.getBody().getLength() + rocket.getNose().getLength()
-    R = speed*Lb/nu  # Reynold's number (Kinematic viscosity)
-    B = Rcrit*(0.074/(R**0.2) - 1.328/(R**0.5))
-    Cfb = 0
-    # Conditions for different R
-    if R <= Rcrit:
-        Cfb = 1.328/(R**0.5)
-    else:
-        Cfb = 0.074/(R**0.2) - B/R
-    
-    # For fins
-    Lf = rocket.getFin().getSemiChord()
-    R = R*Lf/Lb
-    B = Rcrit*(0.074/(R**0.2) - 1.328/(R**0.5))
-    Cff = 0 
-    # Conditions for different R
-    if R <= Rcrit:
-        Cff = 1.328/(R**0.5)
-    else:
-        Cff = 0.074/(R**0.2) - B/R
-        
-    # Interference term (between body and fins)
+    R = np.maximum(R, 1)
+    B = Rcrit*(0.074/(Rcrit**0.2) - 1.328/(Rcrit**0.5))
+    Cf = np.where(R <= Rcrit, 1.328/np.sqrt(R), 0.074/(R**0.2) - B/R)
+    # Conditions for different speeds (subsonic/supersonic)
+    return np.where(M < 0.8, Cf*(1 - 0.1*M**2), Cf/(1 + 0.15*M**2)**0.58)
+
+def dragCoefficient(rocket, M, R):
+    """
+    Zero lift drag coefficient of a component buildup (see Drag2): skin friction drag of nose and body,
+    base drag, skin friction drag of the fins and interference drag between fins and body.
+
+    :param rocket: [rocket class] The rocket object (RocketSimple)
+    :param M: [float or np.array] Mach number
+    :param R: [float or np.array] Reynold's number with the rocket length as characteristic length
+    :return: [float or np.array] drag coefficient, relative to the cross section of the body
+    """
+    Ltotal = rocket.getLength()
+    Ln = rocket.getNose().getLength()
+    Lb = rocket.getBody().getLength()
     D = rocket.getBody().getDiameter()
     N = rocket.getNumberOfFins()
-    Cdint = 2*Cff*(1 + 2)     
-    
-    Cf = Cfb + Cff
-    # TODO finish this
-    return Cf
+    # Nose and body (no boattail)
+    Cfb = skinFriction(R, M)
+    Cdfb = (1 + 60/(Ltotal/D)**3 + 0.0025*Lb/D)*(2.7*Ln/D + 4*Lb/D)*Cfb
+    # Base drag
+    Cdb = 0.029/np.sqrt(Cdfb)
+    # Fins, with Reynold's number of the mean aerodynamic chord
+    fin = rocket.getFin()
+    RC, TC, SC = fin.getRootChord(), fin.getTipChord(), fin.getSemiChord()
+    Lm = 2/3*(RC + TC - RC*TC/(RC + TC))
+    Cff = skinFriction(R*Lm/Ltotal, M)
+    Afe = 1/2*(RC + TC)*SC  # Exposed area of one fin
+    Afp = Afe + 1/2*D*RC  # Planform area of one fin, extended to the rocket axis
+    thickness = 1 + 2*fin.getThickness()/Lm
+    Cdf = 2*Cff*thickness*4*N*Afe/(np.pi*D**2)
+    # Interference term (between body and fins)
+    Cdi = 2*Cff*thickness*4*N*(Afp - Afe)/(np.pi*D**2)
+
+    return Cdfb + Cdb + Cdf + Cdi
 
 def SAMdrag(rocket, position, linearVelocityWorld):
     """
         Assumptions:- AoA ~ 0
-                    - Quadratic drag F ~ -kv^2
+                    - Quadratic drag F ~ -kv^2, with Cd(Mach, Re) of the rocket (see dragCoefficient)
     :param rocket: [rocket class] The rocket object
     :param position: [np.array] The position vector in world coordinates
     :param linearVelocity: [np.array] The current rocket velocity in world coord. (with wind)
     :return: [np.array] drag force in the world frame
+
+    NOTE: position and linearVelocityWorld may also be Nx3 arrays (one row per rocket state).
     """
-    z = abs(position[2])  # Vertical position of rocket
-    Cd = rocket.getCd()
-    Aref = np.pi*(rocket.getBody().getDiameter()/2)**2
-    k = 1/2*rho0*Aref*Cd*np.exp(-z/h)
+    z = abs(position[..., 2])  # Vertical position of rocket
+    speed = np.linalg.norm(linearVelocityWorld, axis=-1)
+    density, speedOfSound, viscosity = currentAtmosphere.evaluate(z)[:3]
+    M = speed/speedOfSound
+    R = speed*rocket.getLength()/viscosity  # Reynold's number of the rocket
+    Cd = rocket.getCd(M, R)
+    Aref = rocket.getAref()
+    k = 1/2*density*Aref*Cd
 
-    return -k*np.linalg.norm(linearVelocityWorld)*linearVelocityWorld
+    return -(k*speed)[..., np.newaxis]*linearVelocityWorld
 
 def SAMlift(rocket, position, linearVelocityWorld, AoA):
     """
@@ -127,11 +176,13 @@ def SAMlift(rocket, position, linearVelocityWorld, AoA):
     :param position: [np.array] The position vector in world coordinates
     :param linearVelocity: [np.array] The current rocket velocity in world coord. (with wind)
     :return: [float] Lift force in the body frame [N]
+
+    NOTE: position and linearVelocityWorld may also be Nx3 arrays (and AoA an array of length N).
     """
-    z = abs(position[2])  # Vertical position of rocket
+    z = abs(position[..., 2])  # Vertical position of rocket
     Cn = rocket.getCn(AoA)
-    Aref = np.pi*(rocket.getBody().getDiameter()/2)**2
-    k = 1/2*rho0*Aref*Cn*np.exp(-z/h)
-    speed = np.linalg.norm(linearVelocityWorld)
+    Aref = rocket.getAref()
+    k = 1/2*currentAtmosphere.getDensity(z)*Aref*Cn
+    speed = np.linalg.norm(linearVelocityWorld, axis=-1)
 
     return k*speed**2
@@ -0,0 +1,175 @@
+"""
+Wind module - Wind velocity over altitude and time
+
+A WindField is a mean wind profile, tabulated once on a uniform grid of altitudes above the launch site
+(constant, power law, log law or a sounding), plus an optional gust time series tabulated on a uniform time
+grid (see drydenGusts). The gusts are generated up front for the whole flight by filtering white noise, so a
+lookup during the integration is two linear interpolations by arithmetic, for one point or for arrays.
+
+--Propulse NTNU--
+"""
+import numpy as np
+from scipy import signal
+
+# Default Dryden parameters of the gusts: length scale [m] and speed of the rocket through the turbulence [m/s]
+gustLengthScale = 300
+gustAirspeed = 100
+
+
+def drydenGusts(intensity, duration, dt=0.05, lengthScale=gustLengthScale, airspeed=gustAirspeed, seed=None):
+    """
+    Gust velocities of the Dryden turbulence model as seen by a rocket flying through frozen turbulence: white
+    noise filtered with the Dryden transfer functions, longitudinal along the (vertical) flight path and lateral
+    in the horizontal plane.
+
+    :param intensity: [float or np.array] standard deviation of the gusts [m/s] (or one for each of x, y, z)
+    :param duration: [float] length of the time series [s]
+    :param dt: [float] time step of the series [s]
+    :param lengthScale: [float or np.array] turbulence length scale [m] (or one for each of x, y, z)
+    :param airspeed: [float] speed of the rocket through the turbulence [m/s]
+    :param seed: seed of the random generator (one realization per seed)
+    :return: [np.array, Nx3] gust velocity in the world frame at t = 0, dt, 2*dt, ... [m/s]
+    """
+    rng = np.random.default_rng(seed)
+    intensity = np.broadcast_to(np.asarray(intensity, dtype=float), (3,))
+    lengthScale = np.broadcast_to(np.asarray(lengthScale, dtype=float), (3,))
+    n = int(np.ceil(duration/dt)) + 1
+    # Band limited white noise of unit (two-sided) spectral density pi, see the normalization of the spectra
+    noise = rng.normal(0, np.sqrt(np.pi/dt), (3, n))
+    gusts = np.zeros((n, 3))
+    for i in range(3):
+        T = lengthScale[i]/airspeed
+        if i == 2:
+            # Longitudinal: sigma*sqrt(2L/(pi V))/(1 + T s)
+            numerator = [intensity[i]*np.sqrt(2*T/np.pi)]
+            denominator = [T, 1]
+        else:
+            # Lateral: sigma*sqrt(L/(pi V))*(1 + sqrt(3) T s)/(1 + T s)^2
+            numerator = intensity[i]*np.sqrt(T/np.pi)*np.array([np.sqrt(3)*T, 1])
+            denominator = [T**2, 2*T, 1]
+        b, a = signal.bilinear(numerator, denominator, 1/dt)
+        gusts[:, i] = signal.lfilter(b, a, noise[i])
+    return gusts
+
+
+class WindField:
+    def __init__(self, altitude, velocity, step=10, height=40e3, gusts=None, gustStep=None):
+        """
+        :param altitude: [np.array] increasing altitudes above the launch site of the profile [m]
+        :param velocity: [np.array, Nx3] mean wind velocity in the world frame at the altitudes [m/s]
+        :param step: [float] spacing of the table [m]
+        :param height: [float] top of the table [m], higher altitudes use the wind at the top
+        :param gusts: [np.array, Mx3] gust velocity at t = 0, gustStep, ... (see drydenGusts), added to the mean
+                      wind; the last value is kept after the end of the series
+        :param gustStep: [float] time step of the gusts [s]
+        """
+        altitude, velocity = np.asarray(altitude, dtype=float), np.asarray(velocity, dtype=float)
+        if len(altitude) < 2 or np.any(np.diff(altitude) <= 0) or velocity.shape != (len(altitude), 3):
+            raise ValueError("A wind profile needs increasing altitudes (at least 2) and a velocity (x, y, z) at each.")
+        self.__step = step
+        z = np.arange(0, height + step/2, step)
+        self.__profile = np.stack([np.interp(z, altitude, velocity[:, i]) for i in range(3)], axis=1)
+        self.__profileList = self.__profile.tolist()
+        self.setGusts(gusts, gustStep)
+
+    def setGusts(self, gusts, gustStep=None):
+        """
+        :param gusts: [np.array, Mx3] gust velocities (see drydenGusts) or None (no gusts)
+        :param gustStep: [float] time step of the gusts [s]
+        """
+        if gusts is None:
+            gusts, gustStep = np.zeros((2, 3)), 1.0
+        gusts = np.asarray(gusts, dtype=float)
+        if gusts.ndim != 2 or gusts.shape[1] != 3 or len(gusts) < 2 or gustStep is None:
+            raise ValueError("The gusts must be a Mx3 array (M >= 2) with its time step.")
+        self.__gusts, self.__gustStep = gusts, gustStep
+        self.__gustList = gusts.tolist()
+
+    def getVelocity(self, z, t):
+        """
+        :param z: [float or np.array] altitude above the launch site [m]
+        :param t: [float or np.array] point in time [s], broadcast with z
+        :return: [np.array] wind velocity in the world frame [m/s] (shape of z and t + (3,))
+        """
+        n, m = len(self.__profileList), len(self.__gustList)
+        if np.ndim(z) == 0 and np.ndim(t) == 0:
+            s = min(max(float(z)/self.__step, 0.0), n - 1.0)
+            i = min(int(s), n - 2)
+            r = min(max(float(t)/self.__gustStep, 0.0), m - 1.0)
+            j = min(int(r), m - 2)
+            f, e = s - i, r - j
+            p0, p1 = self.__profileList[i], self.__profileList[i + 1]
+            g0, g1 = self.__gustList[j], self.__gustList[j + 1]
+            return np.array([p0[k] + f*(p1[k] - p0[k]) + g0[k] + e*(g1[k] - g0[k]) for k in range(3)])
+        z, t = np.broadcast_arrays(np.asarray(z, dtype=float), np.asarray(t, dtype=float))
+        s = np.clip(z/self.__step, 0, n - 1)
+        i = np.minimum(s.astype(int), n - 2)
+        r = np.clip(t/self.__gustStep, 0, m - 1)
+        j = np.minimum(r.astype(int), m - 2)
+        f, e = (s - i)[..., np.newaxis], (r - j)[..., np.newaxis]
+        return (self.__profile[i] + f*(self.__profile[i + 1] - self.__profile[i]) +
+                self.__gusts[j] + e*(self.__gusts[j + 1] - self.__gusts[j]))
+
+    def getTables(self):
+        """
+        :return: altitude step [m] and mean wind table (Nx3) starting at the launch site, time step [s] and gust
+                 table (Mx3) starting at t = 0
+        """
+        return self.__step, self.__profile, self.__gustStep, self.__gusts
+
+    @staticmethod
+    def constant(velocity):
+        """
+        :param velocity: [np.array] wind velocity in the world frame [m/s]
+        """
+        return WindField([0, 1], np.tile(np.asarray(velocity, dtype=float), (2, 1)), step=1, height=1)
+
+    @staticmethod
+    def powerLaw(speed, direction, referenceAltitude=10, exponent=1/7, step=10, height=40e3):
+        """
+        Wind speed speed*(z/referenceAltitude)^exponent
+
+        :param speed: [float] wind speed at the reference altitude [m/s]
+        :param direction: [float] direction of the wind velocity [rad, from the x-axis towards the y-axis]
+        """
+        z = np.arange(0, height + step/2, step)
+        return WindField(z, horizontal(speed*(z/referenceAltitude)**exponent, direction), step, height)
+
+    @staticmethod
+    def logLaw(speed, direction, referenceAltitude=10, roughness=0.03, step=10, height=40e3):
+        """
+        Wind speed speed*ln(z/roughness)/ln(referenceAltitude/roughness), no wind below the roughness length
+
+        :param roughness: [float] roughness length of the terrain [m] (0.03 for open grass land)
+        """
+        z = np.arange(0, height + step/2, step)
+        profile = speed*np.log(np.maximum(z, roughness)/roughness)/np.log(referenceAltitude/roughness)
+        return WindField(z, horizontal(profile, direction), step, height)
+
+    @staticmethod
+    def from_sounding(file, step=10, height=40e3):
+        """
+        Assuming the sounding is a text file with one header row and columns: altitude above the launch site [m],
+        wind speed [m/s] and direction of the wind velocity [deg, from the x-axis towards the y-axis].
+        """
+        sounding = np.loadtxt(file, skiprows=1, dtype=float, ndmin=2)
+        sounding = sounding[np.argsort(sounding[:, 0])]
+        return WindField(sounding[:, 0], horizontal(sounding[:, 1], np.deg2rad(sounding[:, 2])), step, height)
+
+
+def horizontal(speed, direction):
+    """
+    :return: [np.array, Nx3] horizontal velocities of the speeds in the directions [rad, from the x-axis]
+    """
+    speed, direction = np.broadcast_arrays(np.asarray(speed, dtype=float), np.asarray(direction, dtype=float))
+    return np.stack((speed*np.cos(direction), speed*np.sin(direction), np.zeros_like(speed)), axis=-1)
+
+
+def windField(wind):
+    """
+    :param wind: None (no wind), a constant wind velocity [np.array, m/s] or a WindField
+    :return: [WindField]
+    """
+    if isinstance(wind, WindField):
+        return wind
+    return WindField.constant(np.zeros(3) if wind is None else wind)
@@ -0,0 +1,190 @@
+"""
+Binary database of the aero data of many rocket configurations (e.g. the CFD reports of V9, V13, ...)
+
+File layout: magic bytes, the length of the header (uint64), the header (JSON) and the arrays, each aligned to
+64 bytes. The header indexes the configurations by name, with the dtype, shape and offset of their arrays and
+their attributes. For each configuration the database holds the CFD samples, the (AoA, Mach) grid and the values
+and cell coefficients of the drag, lift and moment tables (see AeroFit.aeroTables). Opening a database only reads
+the header; the arrays of a configuration are memory mapped (np.memmap) when asked for, so nothing is parsed,
+fitted or copied.
+
+--Propulse NTNU--
+"""
+import os
+import json
+import numpy as np
+from AeroTable import AeroTable
+from AeroFit import aeroTableNames, aeroTableShape, rotateAeroForces, aeroTables
+from lib.File_utilities import find_parameter, unwrap_report1, unwrap_report2, write_atomic
+
+magic = b'AERODB\x00\x01'
+alignment = 64
+
+class AeroDatabase:
+    def __init__(self, path):
+        """
+        :param path: [str] the database file (see writeDatabase)
+        """
+        self.__path = path
+        with open(path, 'rb') as file:
+            if file.read(len(magic)) != magic:
+                raise ValueError("'%s' is not an aero database." % path)
+            length = int(np.frombuffer(file.read(8), dtype='<u8')[0])
+            self.__header = json.loads(file.read(length).decode())
+        self.__dataOffset = aligned(len(magic) + 8 + length)
+        self.__arrays = {}  # the memory mapped arrays, by (name, key)
+
+    def __contains__(self, name):
+        return name in self.__header['cases']
+
+    def getPath(self):
+        return self.__path
+
+    def getNames(self):
+        """
+        :return: [list] names of the configurations in the database
+        """
+        return list(self.__header['cases'])
+
+    def __case(self, name):
+        if name not in self:
+            raise KeyError("No configuration '%s' in '%s', use one of %s." % (name, self.__path,
+                                                                              ', '.join(self.getNames())))
+        return self.__header['cases'][name]
+
+    def getKeys(self, name):
+        """
+        :return: [list] names of the arrays of the configuration
+        """
+        return list(self.__case(name)['arrays'])
+
+    def getAttributes(self, name):
+        """
+        :return: [dict] the attributes of the configuration (fit settings, methods of the tables, residuals, source)
+        """
+        return self.__case(name)['attributes']
+
+    def getArray(self, name, key):
+        """
+        :return: [np.memmap] the (read only) array key of the configuration name
+        """
+        if (name, key) not in self.__arrays:
+            entry = self.__case(name)['arrays'][key]
+            offset = self.__dataOffset + entry['offset']
+            self.__arrays[(name, key)] = np.memmap(self.__path, dtype=entry['dtype'], mode='r', offset=offset,
+                                                   shape=tuple(entry['shape']))
+        return self.__arrays[(name, key)]
+
+    def getSamples(self, name):
+        """
+        :return: the CFD samples as unwrap_report2: AoA [deg], speed [Mach], aeroForces (2xn) and moment
+        """
+        return tuple(self.getArray(name, key) for key in ('AoA', 'speed', 'aeroForces', 'moment'))
+
+    def getTables(self, name):
+        """
+        :return: [dict] 'drag', 'lift' and 'moment' -> AeroTable of the configuration, on the memory mapped values
+        """
+        methods = self.getAttributes(name)['methods']
+        AoAaxis, speedAxis = self.getArray(name, 'AoAaxis'), self.getArray(name, 'speedAxis')
+        return {table: AeroTable(AoAaxis, speedAxis, self.getArray(name, table + 'Values'), methods[table],
+                                 coefficients=self.getArray(name, table + 'Coefficients'))
+                for table in aeroTableNames}
+
+def aligned(offset):
+    return -(-offset//alignment)*alignment
+
+def writeDatabase(path, cases):
+    """
+    :param path: [str] the database file (replaced if it exists)
+    :param cases: [dict] name -> (arrays, attributes) of every configuration, where arrays is a dict of np.arrays and
+                  attributes a dict of values that can be written as JSON
+    """
+    header = {'cases': {}}
+    offset = 0
+    for name, (arrays, attributes) in cases.items():
+        entries = {}
+        for key, array in arrays.items():
+            array = np.asarray(array)
+            entries[key] = {'dtype': array.dtype.newbyteorder('<').str, 'shape': list(array.shape), 'offset': offset}
+            offset = aligned(offset + array.nbytes)
+        header['cases'][name] = {'arrays': entries, 'attributes': attributes}
+    encoded = json.dumps(header).encode()
+    dataOffset = aligned(len(magic) + 8 + len(encoded))
+    def write(file):
+        file.write(magic)
+        file.write(np.array([len(encoded)], dtype='<u8').tobytes())
+        file.write(encoded)
+        for name, (arrays, attributes) in cases.items():
+            for key, array in arrays.items():
+                file.seek(dataOffset + header['cases'][name]['arrays'][key]['offset'])
+                file.write(np.ascontiguousarray(array, dtype=np.asarray(array).dtype.newbyteorder('<')).tobytes())
+    # the database may be memory mapped by other processes
+    write_atomic(path, write)
+
+def addCase(path, name, arrays, attributes):
+    """
+    Add a configuration to the database (created if it does not exist), replacing a configuration of the same name.
+    """
+    cases = {}
+    if os.path.exists(path):
+        database = AeroDatabase(path)
+        for other in database.getNames():
+            if other != name:
+                cases[other] = ({key: database.getArray(other, key) for key in database.getKeys(other)},
+                                database.getAttributes(other))
+    cases[name] = (arrays, attributes)
+    writeDatabase(path, cases)
+
+def caseFromSamples(AoA, speed, aeroForces, moment, fit='rbf', shape=aeroTableShape, source='', **fitOptions):
+    """
+    Tabulate CFD samples (as unwrap_report2) for the database.
+
+    :param fit, shape, fitOptions: see AeroFit.aeroTables
+    :param source: [str] where the samples come from (e.g. the CFD report)
+    :return: the arrays and attributes of the configuration (see writeDatabase)
+    """
+    AoA, speed = np.asarray(AoA, dtype=float), np.asarray(speed, dtype=float)
+    aeroForces, moment = np.asarray(aeroForces, dtype=float), np.asarray(moment, dtype=float)
+    tables, fits = aeroTables(AoA, speed, rotateAeroForces(AoA, aeroForces), moment, fit, None, shape, **fitOptions)
+    AoAaxis, speedAxis = tables['drag'].getAxes()
+    arrays = {'AoA': AoA, 'speed': speed, 'aeroForces': aeroForces, 'moment': moment, 'AoAaxis': AoAaxis,
+              'speedAxis': speedAxis}
+    for table in aeroTableNames:
+        arrays[table + 'Values'] = tables[table].getValues()
+        arrays[table + 'Coefficients'] = tables[table].getCoefficients()
+    attributes = {'source': source, 'fit': fit, 'fitOptions': fitOptions,
+                  'methods': {table: tables[table].getMethod() for table in aeroTableNames},
+                  'residuals': {table: float(fits[table].getRMSResidual()) for table in fits}}
+    return arrays, attributes
+
+def samplesFromReport1(alpha, speed, drag, lift, moment):
+    """
+    :param alpha, speed, drag, lift, moment: output of unwrap_report1 (axes and len(alpha) x len(speed) arrays)
+    :return: the scattered samples as unwrap_report2: AoA [deg], speed [Mach], aeroForces (2xn) and moment
+    """
+    AoA, speed = [a.ravel() for a in np.meshgrid(alpha, speed, indexing='ij')]
+    return AoA, speed, np.stack((np.ravel(drag), np.ravel(lift))), np.ravel(moment)
+
+def convertReport(path, name, reportFile, fit='rbf', **fitOptions):
+    """
+    Add a CFD report to the database. Reports with the sampling period, alpha_max, delta_v and v0 at the bottom
+    are read with unwrap_report1, other reports with unwrap_report2 (AoA and speed as columns).
+
+    example: convertReport('rockets.aerodb', 'V13', 'V13/V13_CFD.txt')
+
+    :param path: [str] the database file (created if it does not exist)
+    :param name: [str] name of the configuration
+    :param reportFile: [str] the CFD report
+    :param fit, fitOptions: see AeroFit.aeroTables
+    """
+    with open(reportFile) as file:
+        hasPeriod = any(line.replace(' ', '').lower().startswith('period=') for line in file)
+    if hasPeriod:
+        T = int(find_parameter(reportFile, 'period'))
+        parameters = [float(find_parameter(reportFile, key)) for key in ('alpha_max', 'delta_v', 'v0')]
+        samples = samplesFromReport1(*unwrap_report1(reportFile, T, *parameters))
+    else:
+        samples = unwrap_report2(reportFile)
+    arrays, attributes = caseFromSamples(*samples, fit=fit, source=os.path.basename(reportFile), **fitOptions)
+    addCase(path, name, arrays, attributes)
@@ -0,0 +1,193 @@
+"""
+Fitting of scattered aero data (e.g. the CFD reports read by unwrap_report2) onto a regular grid
+
+The CFD samples are noisy, so instead of interpolating them exactly a smooth surface may be fitted once
+(smoothing radial basis functions or a least-squares polynomial) and evaluated on a dense (AoA, Mach) grid.
+A Rocket interpolates its samples unless it is given a fit (see the fit argument of Rocket2.Rocket), the
+conversions of AeroDatabase fit them by default.
+The residuals of the fit at the samples are kept for reporting. Fits may be cached on disk, keyed by a hash
+of the samples, the grid and the fit settings, so a rocket built from the same data skips the fitting.
+
+--Propulse NTNU--
+"""
+import os
+import hashlib
+import numpy as np
+from scipy.interpolate import bisplrep, bisplev, RBFInterpolator
+from AeroTable import AeroTable
+from lib.File_utilities import write_atomic
+
+fitMethods = ('rbf', 'polynomial', 'spline')
+parities = (None, 'even', 'odd')
+
+# Number of AoA and speed points of the aero tables of the CFD data
+aeroTableShape = (101, 71)
+# The tables of a CFD rocket, with the symmetry in AoA of the fits (drag is symmetric, lift and moment antisymmetric)
+aeroTableNames = ('drag', 'lift', 'moment')
+aeroTableParities = {'drag': 'even', 'lift': 'odd', 'moment': 'odd'}
+
+class AeroFit:
+    """
+    A fitted surface tabulated on a regular grid, with the residuals of the fit at the samples
+    """
+    def __init__(self, xAxis, yAxis, values, residuals):
+        """
+        :param xAxis, yAxis: [np.array] the uniform axes of the grid
+        :param values: [np.array] the fitted surface on the grid, len(xAxis) x len(yAxis)
+        :param residuals: [np.array] sample value - fitted value at every sample
+        """
+        self.__xAxis = np.asarray(xAxis, dtype=float)
+        self.__yAxis = np.asarray(yAxis, dtype=float)
+        self.__values = np.asarray(values, dtype=float)
+        self.__residuals = np.asarray(residuals, dtype=float)
+
+    def getAxes(self):
+        return self.__xAxis, self.__yAxis
+
+    def getValues(self):
+        return self.__values
+
+    def getResiduals(self):
+        return self.__residuals
+
+    def getRMSResidual(self):
+        return np.sqrt(np.mean(self.__residuals**2))
+
+    def getMaxResidual(self):
+        return np.max(np.abs(self.__residuals))
+
+    def getTable(self, method='bicubic', bounds='clamp'):
+        """
+        :return: [AeroTable] the fitted surface
+        """
+        return AeroTable(self.__xAxis, self.__yAxis, self.__values, method, bounds)
+
+    def report(self, name=''):
+        """
+        :return: [str] one line summary of the residuals
+        """
+        return '%s residuals: rms %1.3g, max %1.3g (%d samples)' % (name, self.getRMSResidual(),
+                                                                     self.getMaxResidual(), len(self.__residuals))
+
+    def save(self, file):
+        """
+        :param file: [str or file] the .npz file
+        """
+        np.savez(file, xAxis=self.__xAxis, yAxis=self.__yAxis, values=self.__values, residuals=self.__residuals)
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            return AeroFit(data['xAxis'], data['yAxis'], data['values'], data['residuals'])
+
+def fitScattered(x, y, values, xAxis, yAxis, method='rbf', smoothing=1e-2, degree=(3, 2), parity=None):
+    """
+    Fit a surface to scattered samples and evaluate it on a regular grid.
+
+    :param x, y, values: [np.array] the samples (e.g. AoA [deg], Mach and a force)
+    :param xAxis, yAxis: [np.array] the uniform axes of the grid
+    :param method: 'rbf' (thin plate spline radial basis functions with smoothing), 'polynomial' (least-squares
+                   polynomial surface) or 'spline' (the interpolating bicubic spline, no smoothing)
+    :param smoothing: [float] smoothing of the rbf fit (0 interpolates the samples)
+    :param degree: [tuple] degrees in x and y of the polynomial fit
+    :param parity: None, 'even' or 'odd': symmetry of the surface in x (e.g. drag is even and lift odd in AoA).
+                   The samples at x > 0 are mirrored to x < 0 before fitting, so the fit respects the symmetry at x = 0.
+    :return: [AeroFit]
+    """
+    if method not in fitMethods:
+        raise ValueError("Unknown fit method '%s', use %s." % (method, ', '.join(fitMethods)))
+    if parity not in parities:
+        raise ValueError("Unknown parity '%s', use None, 'even' or 'odd'." % parity)
+    x, y, values = (np.asarray(a, dtype=float).ravel() for a in (x, y, values))
+    xAxis, yAxis = np.asarray(xAxis, dtype=float), np.asarray(yAxis, dtype=float)
+    xFit, yFit, valuesFit = x, y, values
+    if parity is not None:
+        mirrored = x > 0
+        sign = 1 if parity == 'even' else -1
+        xFit = np.concatenate((x, -x[mirrored]))
+        yFit = np.concatenate((y, y[mirrored]))
+        valuesFit = np.concatenate((values, sign*values[mirrored]))
+    X, Y = np.meshgrid(xAxis, yAxis, indexing='ij')
+    if method == 'spline':
+        spline = bisplrep(xFit, yFit, valuesFit, kx=3, ky=3, s=0.0)
+        grid = bisplev(xAxis, yAxis, spline)
+        fitted = np.array([bisplev(a, b, spline) for a, b in zip(x, y)])
+        return AeroFit(xAxis, yAxis, grid, values - fitted)
+    # Scale both variables to about [0, 1], the samples of AoA and Mach have very different magnitudes
+    xScale, yScale = np.ptp(x) or 1.0, np.ptp(y) or 1.0
+    x0, y0 = np.min(x), np.min(y)
+    normalize = lambda a, b: ((a - x0)/xScale, (b - y0)/yScale)
+    if method == 'rbf':
+        surface = RBFInterpolator(np.stack(normalize(xFit, yFit), axis=1), valuesFit, kernel='thin_plate_spline',
+                                  smoothing=smoothing)
+        evaluate = lambda a, b: surface(np.stack(normalize(a.ravel(), b.ravel()), axis=1)).reshape(a.shape)
+    else:
+        vandermonde = lambda a, b: np.polynomial.polynomial.polyvander2d(*normalize(a, b), degree)
+        coefficients = np.linalg.lstsq(vandermonde(xFit, yFit), valuesFit, rcond=None)[0]
+        evaluate = lambda a, b: vandermonde(a, b)@coefficients
+    return AeroFit(xAxis, yAxis, evaluate(X, Y), values - evaluate(x, y))
+
+def cachedFit(cacheDirectory, name, x, y, values, xAxis, yAxis, **options):
+    """
+    fitScattered, loading the fit from cacheDirectory when the same samples, grid and settings were fitted before.
+
+    :param cacheDirectory: [str] directory of the cached fits (created if missing), None to always fit
+    :param name: [str] name of the fitted quantity, part of the file name (e.g. 'drag')
+    :param options: see fitScattered
+    :return: [AeroFit]
+    """
+    if cacheDirectory is None:
+        return fitScattered(x, y, values, xAxis, yAxis, **options)
+    key = hashlib.sha1()
+    for array in (x, y, values, xAxis, yAxis):
+        key.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    key.update(repr(sorted(options.items())).encode())
+    path = os.path.join(cacheDirectory, '%s-%s.npz' % (name, key.hexdigest()[:16]))
+    if os.path.exists(path):
+        return AeroFit.load(path)
+    fit = fitScattered(x, y, values, xAxis, yAxis, **options)
+    os.makedirs(cacheDirectory, exist_ok=True)
+    # processes building the same rocket may save the fit at the same time
+    write_atomic(path, fit.save)
+    return fit
+
+def rotateAeroForces(AoA, aeroForces):
+    """
+    :param AoA: [np.array] AoA of the CFD samples [deg]
+    :param aeroForces: [np.array] 2xn forces of the CFD samples along and normal to the rocket axis
+    :return: [np.array] new 2xn array of the forces along and normal to the air velocity (drag as row 1 and lift
+             as row 2)
+    """
+    sa, ca = np.sin(np.deg2rad(AoA)), np.cos(np.deg2rad(AoA))
+    return np.array([ca*aeroForces[0] + sa*aeroForces[1], -sa*aeroForces[0] + ca*aeroForces[1]])
+
+def aeroTables(AoA, speed, aeroForces, moment, fit='rbf', cacheDirectory=None, shape=aeroTableShape, **fitOptions):
+    """
+    Tabulate the drag, lift and moment of CFD samples on a regular (AoA [deg], speed [Mach]) grid.
+
+    :param AoA, speed: [np.array] AoA [deg] and speed [Mach] of the samples
+    :param aeroForces: [np.array] 2xn [drag, lift] of the samples (see rotateAeroForces)
+    :param moment: [np.array] moments about COM of the samples
+    :param fit: method of fitScattered, or None to resample the samples with the interpolating splines of
+                AeroTable.from_scattered (cubic drag, linear lift and moment)
+    :param cacheDirectory: [str] directory where the fits are cached (None: no caching)
+    :param shape: [tuple] number of AoA and speed points of the tables
+    :param fitOptions: further options of fitScattered (smoothing, degree)
+    :return: [dict] 'drag', 'lift' and 'moment' -> AeroTable, and [dict] of the AeroFits (empty if fit is None)
+    """
+    AoAaxis = np.linspace(np.min(AoA), np.max(AoA), shape[0])
+    speedAxis = np.linspace(np.min(speed), np.max(speed), shape[1])
+    samples = dict(zip(aeroTableNames, (aeroForces[0], aeroForces[1], moment)))
+    tables, fits = {}, {}
+    for name in aeroTableNames:
+        if fit is None:
+            print('\tTabulating the %s..' % name)
+            order, method = (3, 'bicubic') if name == 'drag' else (1, 'bilinear')
+            tables[name] = AeroTable.from_scattered(AoA, speed, samples[name], AoAaxis, speedAxis, order, method)
+        else:
+            print('\tFitting the %s..' % name)
+            fits[name] = cachedFit(cacheDirectory, name, AoA, speed, samples[name], AoAaxis, speedAxis, method=fit,
+                                   parity=aeroTableParities[name], **fitOptions)
+            print('\t\t' + fits[name].report(name))
+            tables[name] = fits[name].getTable()
+    return tables, fits
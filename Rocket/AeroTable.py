@@ -0,0 +1,168 @@
+"""
+Aerodynamic tables on a regular grid
+
+An AeroTable stores a quantity (e.g. drag, lift or moment) sampled on a uniform (x, y) grid, e.g. (AoA, Mach),
+together with the coefficients of the interpolating polynomial of every grid cell. A lookup finds the cell
+with arithmetic and evaluates its polynomial, so scalar and batched queries cost O(1) per point.
+
+--Propulse NTNU--
+"""
+import math
+import numpy as np
+from scipy.interpolate import bisplrep, bisplev
+
+methods = ('bilinear', 'bicubic')
+boundsModes = ('clamp', 'extrapolate')
+
+# Maps [f(0,0), f(1,0), f(0,1), f(1,1), fx.., fy.., fxy..] of a unit cell to the bicubic coefficients a_ij
+def bicubicMatrix():
+    rows = []
+    corners = ((0, 0), (1, 0), (0, 1), (1, 1))
+    # value, d/dx, d/dy and d2/dxdy of t^i u^j at the corners
+    for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+        for t, u in corners:
+            row = []
+            for i in range(4):
+                for j in range(4):
+                    ct = (i if dx else 1)*(t**(i - dx) if i >= dx else 0)
+                    cu = (j if dy else 1)*(u**(j - dy) if j >= dy else 0)
+                    row.append(ct*cu)
+            rows.append(row)
+    return np.linalg.inv(np.array(rows, dtype=float))
+
+bicubicInverse = bicubicMatrix()
+
+class AeroTable:
+    def __init__(self, xAxis, yAxis, values, method='bicubic', bounds='clamp', coefficients=None):
+        """
+        :param xAxis: [np.array] uniformly spaced, increasing values of the first variable (e.g. AoA)
+        :param yAxis: [np.array] uniformly spaced, increasing values of the second variable (e.g. Mach)
+        :param values: [np.array] the tabulated quantity, len(xAxis) x len(yAxis)
+        :param method: 'bilinear' or 'bicubic' (C1 continuous, derivatives from finite differences)
+        :param bounds: 'clamp' (queries outside the grid use the nearest point of the grid) or 'extrapolate'
+                       (the polynomial of the nearest cell is continued)
+        :param coefficients: [np.array] the cell coefficients of the values (see getCoefficients), e.g. memory
+                             mapped from an AeroDatabase, so they are not calculated again
+        """
+        if method not in methods:
+            raise ValueError("Unknown method '%s', use %s." % (method, ' or '.join(methods)))
+        if bounds not in boundsModes:
+            raise ValueError("Unknown bounds mode '%s', use %s." % (bounds, ' or '.join(boundsModes)))
+        xAxis, yAxis = np.asarray(xAxis, dtype=float), np.asarray(yAxis, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if values.shape != (len(xAxis), len(yAxis)) or len(xAxis) < 2 or len(yAxis) < 2:
+            raise ValueError("The values must be a len(xAxis) x len(yAxis) array with at least 2x2 points.")
+        for axis in (xAxis, yAxis):
+            step = axis[1] - axis[0]
+            if step <= 0 or not np.allclose(np.diff(axis), step, rtol=1e-6, atol=0):
+                raise ValueError("The axes of an AeroTable must be increasing and uniformly spaced.")
+        self.__xAxis, self.__yAxis = xAxis, yAxis
+        self.__values = values
+        self.__x0, self.__dx, self.__nx = float(xAxis[0]), float(xAxis[1] - xAxis[0]), len(xAxis)
+        self.__y0, self.__dy, self.__ny = float(yAxis[0]), float(yAxis[1] - yAxis[0]), len(yAxis)
+        self.__method = method
+        self.__bounds = bounds
+        if coefficients is None:
+            coefficients = self.__cellCoefficients()
+        elif np.shape(coefficients) != (self.__nx - 1, self.__ny - 1, 4, 4):
+            raise ValueError("The coefficients must be a (len(xAxis)-1) x (len(yAxis)-1) x 4 x 4 array.")
+        self.__coefficients = coefficients
+        # Coefficients of the cells of the scalar lookups as nested lists, by cell, read when a cell is first used
+        # (only the used cells of memory mapped coefficients are read)
+        self.__cells = {}
+
+    def __deepcopy__(self, memo):
+        # A table is never changed, copies of a rocket (e.g. in MonteCarlo) share it
+        return self
+
+    def __cellCoefficients(self):
+        """
+        :return: [np.array] (nx-1) x (ny-1) x 4 x 4 coefficients a_ij of sum a_ij t^i u^j for every cell,
+                 with t, u in [0, 1] the position in the cell
+        """
+        f = self.__values
+        f00, f10, f01, f11 = f[:-1, :-1], f[1:, :-1], f[:-1, 1:], f[1:, 1:]
+        a = np.zeros((self.__nx - 1, self.__ny - 1, 4, 4))
+        if self.__method == 'bilinear':
+            a[:, :, 0, 0] = f00
+            a[:, :, 1, 0] = f10 - f00
+            a[:, :, 0, 1] = f01 - f00
+            a[:, :, 1, 1] = f11 - f10 - f01 + f00
+            return a
+        # Derivatives in grid units (central differences, second order one sided at the edges)
+        fx = np.gradient(f, axis=0, edge_order=2 if self.__nx > 2 else 1)
+        fy = np.gradient(f, axis=1, edge_order=2 if self.__ny > 2 else 1)
+        fxy = np.gradient(fx, axis=1, edge_order=2 if self.__ny > 2 else 1)
+        corners = lambda g: (g[:-1, :-1], g[1:, :-1], g[:-1, 1:], g[1:, 1:])
+        b = np.stack(corners(f) + corners(fx) + corners(fy) + corners(fxy), axis=-1)
+        return np.einsum('kl,...l->...k', bicubicInverse, b).reshape(self.__nx - 1, self.__ny - 1, 4, 4)
+
+    def __locate(self, s, n):
+        # Cell index and position in the cell of the grid coordinate s
+        if self.__bounds == 'clamp':
+            s = np.clip(s, 0, n - 1)
+        i = np.clip(np.floor(s), 0, n - 2).astype(int)
+        return i, s - i
+
+    def __call__(self, x, y):
+        """
+        :param x: [float or np.array] first variable (e.g. AoA)
+        :param y: [float or np.array] second variable (e.g. Mach), broadcast with x
+        :return: [float or np.array] the interpolated values
+        """
+        if np.ndim(x) == 0 and np.ndim(y) == 0:
+            # Fast path for a single point
+            s = (float(x) - self.__x0)/self.__dx
+            r = (float(y) - self.__y0)/self.__dy
+            if self.__bounds == 'clamp':
+                s = min(max(s, 0.0), self.__nx - 1.0)
+                r = min(max(r, 0.0), self.__ny - 1.0)
+            i = min(max(math.floor(s), 0), self.__nx - 2)
+            j = min(max(math.floor(r), 0), self.__ny - 2)
+            t, u = s - i, r - j
+            cell = self.__cells.get((i, j))
+            if cell is None:
+                cell = self.__cells[(i, j)] = self.__coefficients[i, j].tolist()
+            value = 0.0
+            for a in reversed(cell):  # Horner's scheme in t
+                value = value*t + ((a[3]*u + a[2])*u + a[1])*u + a[0]
+            return value
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        i, t = self.__locate((x - self.__x0)/self.__dx, self.__nx)
+        j, u = self.__locate((y - self.__y0)/self.__dy, self.__ny)
+        a = self.__coefficients[i, j]
+        T = np.stack((np.ones_like(t), t, t*t, t*t*t), axis=-1)
+        U = np.stack((np.ones_like(u), u, u*u, u*u*u), axis=-1)
+        return np.einsum('...i,...ij,...j->...', T, a, U)
+
+    def getAxes(self):
+        return self.__xAxis, self.__yAxis
+
+    def getValues(self):
+        return self.__values
+
+    def getCoefficients(self):
+        """
+        :return: [np.array] (nx-1) x (ny-1) x 4 x 4 coefficients a_ij of sum a_ij t^i u^j for every cell
+        """
+        return self.__coefficients
+
+    def getMethod(self):
+        return self.__method
+
+    def getBounds(self):
+        return self.__bounds
+
+    @staticmethod
+    def from_scattered(x, y, values, xAxis, yAxis, order=3, method='bicubic', bounds='clamp'):
+        """
+        Resample scattered samples (e.g. CFD results) onto a regular grid, with the interpolating spline
+        surface that scipy's interp2d fits to scattered data (bisplrep with s = 0).
+
+        :param x, y, values: [np.array] the samples
+        :param xAxis, yAxis: [np.array] the uniform axes of the table
+        :param order: [int] order of the spline surface (1: linear, 3: cubic)
+        :return: [AeroTable]
+        """
+        spline = bisplrep(x, y, values, kx=order, ky=order, s=0.0)
+        return AeroTable(xAxis, yAxis, bisplev(xAxis, yAxis, spline), method, bounds)
@@ -0,0 +1,186 @@
+"""
+Motor library - the motors of a directory of motor files (.dot and RASP .eng)
+
+The library scans its directory once and keeps an index of the motors (name, impulse class, total impulse, burn
+time, thrust, dimensions and masses) next to the files, in __motorindex__.json. Later libraries of the directory
+only read the index and parse the files that were added or modified since, so queries (see MotorLibrary.find) run
+on the index without reading any thrust curve. A Motor is constructed from its file when it is first asked for.
+
+--Propulse NTNU--
+"""
+import os
+import json
+import math
+import numpy as np
+from Rocket1 import Motor
+from lib.File_utilities import read_dot, read_eng, save_json
+
+indexName = '__motorindex__.json'
+indexVersion = 1
+motorFormats = ('.dot', '.eng')
+relativeTolerance = 0.01  # numbers given to MotorLibrary.find match within 1% (e.g. a diameter of 98 mm)
+
+def impulseClass(totalImpulse):
+    """
+    :param totalImpulse: [float] total impulse of a motor [Ns]
+    :return: [str] the impulse class, 'A' up to 2.5 Ns and one letter for each doubling above (e.g. 'M' for
+             5120 to 10240 Ns)
+    """
+    return chr(ord('A') + max(math.ceil(math.log2(totalImpulse/2.5) - 1e-12), 0))
+
+def curveEntry(thrust):
+    """
+    :param thrust: [np.array] time [s] and thrust [N] as columns
+    :return: [dict] burn time, maximum and average thrust of the curve
+    """
+    burnTime = float(thrust[-1, 0])
+    return {'burnTime': burnTime, 'maxThrust': float(np.max(thrust[:, 1])),
+            'averageThrust': float(np.trapz(thrust[:, 1], thrust[:, 0])/burnTime)}
+
+def indexFile(path, file):
+    """
+    :param path: [str] path of a motor file
+    :param file: [str] the path relative to the library
+    :return: [list] the index entries of the motors in the file (none if it is not a motor file)
+    """
+    if file.lower().endswith('.eng'):
+        entries = []
+        for motor in read_eng(path):
+            thrust = motor['data']
+            totalImpulse = float(np.trapz(thrust[:, 1], thrust[:, 0]))
+            entry = {'name': motor['name'], 'file': file, 'manufacturer': motor['manufacturer'],
+                     'totalImpulse': totalImpulse, 'impulseClass': impulseClass(totalImpulse),
+                     'diameter': motor['diameter'], 'length': motor['length'],
+                     'propellantMass': motor['propellant_mass'],
+                     'frameMass': motor['total_mass'] - motor['propellant_mass']}
+            entry.update(curveEntry(thrust))
+            entries.append(entry)
+        return entries
+    motor = read_dot(path)
+    parameters = motor.parameters
+    keys = ('name', 'diameter', 'length', 'propellant_mass', 'frame_mass', 'total_impulse')
+    if any(key not in parameters for key in keys) or len(motor.data) == 0:
+        return []
+    totalImpulse = float(parameters['total_impulse'])
+    entry = {'name': str(parameters['name']), 'file': file, 'manufacturer': '',
+             'totalImpulse': totalImpulse, 'impulseClass': impulseClass(totalImpulse),
+             'diameter': float(parameters['diameter']), 'length': float(parameters['length']),
+             'propellantMass': float(parameters['propellant_mass']), 'frameMass': float(parameters['frame_mass'])}
+    entry.update(curveEntry(motor.data))
+    entry['averageThrust'] = totalImpulse/entry['burnTime']  # as Motor
+    return [entry]
+
+class MotorLibrary:
+    def __init__(self, directory):
+        """
+        :param directory: [str] directory of the motor files (.dot and RASP .eng), its index is updated if files
+                          were added, modified or removed
+        """
+        self.__directory = directory
+        self.__indexPath = os.path.join(directory, indexName)
+        self.__motors = {}  # the constructed motors, by name
+        index = {'version': indexVersion, 'files': {}}
+        if os.path.exists(self.__indexPath):
+            with open(self.__indexPath) as file:
+                stored = json.load(file)
+            if stored.get('version') == indexVersion:
+                index = stored
+        # Motor files and their modification time and size
+        files = {}
+        with os.scandir(directory) as entries:
+            for entry in sorted(entries, key=lambda entry: entry.name):
+                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in motorFormats:
+                    stat = entry.stat()
+                    files[entry.name] = [stat.st_mtime_ns, stat.st_size]
+        changed = set(files) != set(index['files'])
+        for file, stamp in files.items():
+            if file not in index['files'] or index['files'][file]['stamp'] != stamp:
+                index['files'][file] = {'stamp': stamp, 'motors': indexFile(os.path.join(directory, file), file)}
+                changed = True
+        index['files'] = {file: index['files'][file] for file in files}
+        if changed:
+            self.__writeIndex(index)
+        self.__entries = {}
+        for file in files:
+            for entry in index['files'][file]['motors']:
+                if entry['name'] in self.__entries:
+                    print("WARNING: motor '%s' of '%s' is already in '%s', it is skipped." %
+                          (entry['name'], file, self.__entries[entry['name']]['file']))
+                    continue
+                self.__entries[entry['name']] = entry
+
+    def __writeIndex(self, index):
+        # other processes may read the index at the same time
+        try:
+            save_json(self.__indexPath, index, indent=1)
+        except OSError:
+            print("WARNING: could not write the motor index '%s'." % self.__indexPath)
+
+    def __contains__(self, name):
+        return name in self.__entries
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def getDirectory(self):
+        return self.__directory
+
+    def getNames(self):
+        """
+        :return: [list] names of the motors of the library
+        """
+        return list(self.__entries)
+
+    def getEntry(self, name):
+        """
+        :return: [dict] the index entry of the motor: name, file, manufacturer, impulseClass, totalImpulse [Ns],
+                 burnTime [s], averageThrust [N], maxThrust [N], diameter [m], length [m], propellantMass [kg] and
+                 frameMass [kg]
+        """
+        if name not in self:
+            raise KeyError("No motor '%s' in '%s'." % (name, self.__directory))
+        return dict(self.__entries[name])
+
+    def find(self, **criteria):
+        """
+        Motors of the index matching all criteria, e.g. all 98 mm M motors between 8000 and 10000 Ns:
+        library.find(impulseClass='M', diameter=98e-3, totalImpulse=(8000, 10000))
+
+        :param criteria: entry key (see getEntry) = value (numbers match within 1%) or (minimum, maximum) (either
+                         can be None)
+        :return: [list] names of the matching motors, by increasing total impulse
+        """
+        def matches(entry, key, value):
+            if key not in entry:
+                raise KeyError("Unknown motor property '%s'." % key)
+            if isinstance(value, tuple):
+                low, high = value
+                return (low is None or entry[key] >= low) and (high is None or entry[key] <= high)
+            if isinstance(value, str):
+                return entry[key] == value
+            return abs(entry[key] - value) <= relativeTolerance*abs(value)
+
+        found = [entry for entry in self.__entries.values()
+                 if all(matches(entry, key, value) for key, value in criteria.items())]
+        return [entry['name'] for entry in sorted(found, key=lambda entry: entry['totalImpulse'])]
+
+    def getFile(self, name):
+        """
+        :return: [str] path of the file of the motor
+        """
+        return os.path.join(self.__directory, self.getEntry(name)['file'])
+
+    def getMotor(self, name):
+        """
+        :return: [Motor] the motor, read from its file when first asked for
+        """
+        if name not in self.__motors:
+            path = self.getFile(name)
+            if path.lower().endswith('.eng'):
+                self.__motors[name] = Motor.from_eng(path, name)
+            else:
+                self.__motors[name] = Motor.from_file(path)
+        return self.__motors[name]
+
+    def __getitem__(self, name):
+        return self.getMotor(name)
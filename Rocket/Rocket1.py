@@ -12,8 +12,9 @@ import Forces as Forces
 
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp1d
-from lib.File_utilities import find_parameter
+from lib.File_utilities import read_dot, read_eng
+from AeroTable import AeroTable
+from ThrustCurve import ThrustCurve
 
 # Define some things for plotting
 font = {'family': 'sans-serif', 'weight': 'bold', 'size': 16}
@@ -23,6 +24,10 @@ plt.rcParams['text.latex.preamble'] = [r'\boldmath']
 # Geometry type for nose
 noseTypes = ['cone', 'hemisphere', 'ogive']
 
+# Grid of the drag coefficient table of RocketSimple: Mach number and log10 of the Reynold's number
+dragMachAxis = np.linspace(0, 2, 81)
+dragReynoldsAxis = np.linspace(4, 9, 101)
+
 class Nose:
     # Constructor for conic nose
     def __init__(self, noseType, *args):
@@ -172,18 +177,13 @@ class Nose:
 
     @staticmethod
     def from_file(file):
-        noseType = find_parameter(file, "nose_type")
+        parameters = read_dot(file).parameters
+        noseType = str(parameters["nose_type"])
         if noseType.lower() == noseTypes[0] or noseType.lower() == noseTypes[2]:  # Conic or Ogive
-            diameter = find_parameter(file, "diameter")
-            length = find_parameter(file, "length")
-            density = find_parameter(file, "density")
-            thickness = find_parameter(file, "thickness")
-            return Nose(noseType.lower(), eval(diameter), eval(length), eval(thickness), eval(density))
+            return Nose(noseType.lower(), parameters["diameter"], parameters["length"], parameters["thickness"],
+                        parameters["density"])
         elif noseType.lower() == noseTypes[1]:  # Hemisphere
-            diameter = find_parameter(file, "diameter")
-            thickness = find_parameter(file, "thickness")
-            density = find_parameter(file, "density")
-            return Nose(noseType.lower(), eval(diameter), eval(thickness), eval(density))
+            return Nose(noseType.lower(), parameters["diameter"], parameters["thickness"], parameters["density"])
         else:
             print("ERROR: invalid nose type '" + noseType + "' encountered at initialization. "
                                                             "Please check your spelling.")
@@ -253,11 +253,8 @@ class Body:
 
     @staticmethod
     def from_file(file):
-        diameter = find_parameter(file, "diameter")
-        length = find_parameter(file, "length")
-        density = find_parameter(file, "density")
-        thickness = find_parameter(file, "thickness")
-        return Body(eval(diameter), eval(length), eval(thickness), eval(density))
+        parameters = read_dot(file).parameters
+        return Body(parameters["diameter"], parameters["length"], parameters["thickness"], parameters["density"])
 
 class Fin:
     def __init__(self, *args):
@@ -303,6 +300,9 @@ class Fin:
     def getTopEdgeAngle(self):
         return self.__angle
 
+    def getThickness(self):
+        return self.__thickness
+
     def getMass(self):
         return self.__density*self.getVolume()
 
@@ -327,13 +327,9 @@ class Fin:
 
     @staticmethod
     def from_file(file):
-        semiChord = find_parameter(file, "semi_chord")
-        rootChord = find_parameter(file, "root_chord")
-        tipChord = find_parameter(file, "tip_chord")
-        angle = find_parameter(file, "root_angle")
-        density = find_parameter(file, "density")
-        thickness = find_parameter(file, "thickness")
-        return Fin(eval(semiChord), eval(rootChord), eval(tipChord), eval(angle), eval(thickness), eval(density))
+        parameters = read_dot(file).parameters
+        return Fin(parameters["semi_chord"], parameters["root_chord"], parameters["tip_chord"],
+                   parameters["root_angle"], parameters["thickness"], parameters["density"])
 
 class Motor:
     def __init__(self, *args):
@@ -347,23 +343,14 @@ class Motor:
         self.__initialPropellantMass = args[5]
         self.__frameMass = args[6]
         print("\tInterpolating thrust data...")
-        self.__thrustFunction = interp1d(self.__timeArray, self.__thrustArray, kind='linear')  # Linear Interpolation for thrust curve
+        self.__thrustCurve = ThrustCurve(self.__timeArray, self.__thrustArray)  # Linear Interpolation for thrust curve
+        self.__thrustScale = 1
         self.__totalImpulse = args[2]
         self.__exhaustSpeed = self.__totalImpulse/self.__initialPropellantMass
         self.__burnTime = self.__timeArray[-1]
         self.__avgThrust = round(self.__totalImpulse/self.__burnTime, 4)
-        dt = self.__burnTime/1e4  # This is usually in the order of 100 micro seconds (time step).
-        timeList = np.arange(self.__timeArray[0], self.__burnTime + dt, dt)
-        iterations = len(timeList)
-        propellantMass = self.__initialPropellantMass
-        massFlow = self.__thrustFunction(timeList)/self.__exhaustSpeed
-        self.__propellantMassList = np.zeros(iterations)
-        self.__propellantMassList[0] = propellantMass
-        print("\tCalculating mass loss over the burn time of %1.2f s..." % self.__burnTime)
-        for i in range(iterations - 1):
-            propellantMass -= dt/2*(massFlow[i] + massFlow[i + 1])  # Trapezoid rule for integration of mdot over time
-            self.__propellantMassList[i + 1] = propellantMass
-        self.__propellantMassFunction = interp1d(timeList, self.__propellantMassList)
+        # The mass flow is proportional to the thrust, the propellant mass follows from the impulse
+        self.__finalPropellantMass = self.getPropellantMass(self.__burnTime)
         print("Motor %s initialized!\n" % self.__name)
 
     def __str__(self):
@@ -384,12 +371,11 @@ class Motor:
         return self.__name
 
     def getPropellantMass(self, t):
-        if t <= self.__timeArray[0]:
-            return self.__initialPropellantMass
-        elif t >= self.__timeArray[-1]:
-            return self.__propellantMassList[-1]
-
-        return self.__propellantMassFunction(t)
+        """
+        :param t: [float or np.array] point in time [s]
+        :return: [float or np.array] propellant mass at time t [kg] (exact for the piecewise linear thrust curve)
+        """
+        return self.__initialPropellantMass - self.__thrustCurve.impulse(t)/self.__exhaustSpeed
 
     def getMass(self, t):
         return self.getPropellantMass(t) + self.__frameMass
@@ -404,7 +390,7 @@ class Motor:
         elif t < self.__timeArray[0]:
             propMass = self.__initialPropellantMass
         else:
-            propMass = self.__propellantMassFunction(t)
+            propMass = self.getPropellantMass(t)
 
         r0 = self.getDiameter()/2
         h = self.getLength()
@@ -426,10 +412,10 @@ class Motor:
         if t < self.__timeArray[0]:
             Mtot = propMass + frameMass
         elif t >= self.__timeArray[-1]:
-            propMass = self.__propellantMassList[-1]
+            propMass = self.__finalPropellantMass
             Mtot = frameMass + propMass
         else:
-            propMass = self.__propellantMassFunction(t)
+            propMass = self.getPropellantMass(t)
             Mtot = propMass + frameMass
 
         COM = -1/Mtot*(frameMass + propMass**2/self.__initialPropellantMass)*l/2  # COM relative to top of motor
@@ -455,21 +441,35 @@ class Motor:
     def getBurnTime(self):
         return self.__burnTime
 
+    def getThrustCurve(self):
+        return self.__timeArray, self.__thrustScale*self.__thrustArray
+
+    # Set functions
+    def setThrustScale(self, scale):
+        """
+        Scale the thrust curve (for dispersion analysis). The propellant mass and burn time are unchanged,
+        i.e. the exhaust speed scales with the thrust.
+
+        :param scale: [float] factor multiplied with the thrust curve
+        """
+        self.__thrustScale = scale
+
     # Auxiliary functions
     def thrust(self, t):
-        if t <= self.__burnTime:
-            return self.__thrustFunction(t)
-        else:
-            return 0
+        """
+        :param t: [float or np.array] point in time [s]
+        :return: [float or np.array] thrust at time t [N], zero after the burn time
+        """
+        return self.__thrustScale*self.__thrustCurve(t)
 
     def massFlow(self, t):
-        return self.thrust(t)/self.__exhaustSpeed
+        return self.thrust(t)/(self.__thrustScale*self.__exhaustSpeed)
 
     def plotPerformance(self, show=True):
         dt = self.__burnTime/1e4
         timeList = np.arange(self.__timeArray[0], self.__burnTime + dt, dt)
-        thrustArray = self.__thrustFunction(timeList)
-        propellantMassArray = self.__propellantMassList
+        thrustArray = self.__thrustCurve(timeList)
+        propellantMassArray = self.getPropellantMass(timeList)
         COMarray = np.array([self.getCOM(t)[0] for t in timeList])
         # PLOT FORCE
         plt.figure()
@@ -499,28 +499,50 @@ class Motor:
         """
             Read a file with motor specs.
             ASSUMPTIONS: -
-            :param motorFile: The file with motor specs in proper format
+            :param motorFile: The file with motor specs in proper format (.dot, or a RASP .eng, see from_eng)
             :return: motor
             """
-        name = find_parameter(motorFile, "name")
-        diameter = find_parameter(motorFile, "diameter")
-        length = find_parameter(motorFile, "length")
-        propMass = find_parameter(motorFile, "propellant_mass")
-        frameMass = find_parameter(motorFile, "frame_mass")
-        totalImpulse = find_parameter(motorFile, "total_impulse")
-        motorFile = open(motorFile, 'r')
-
-        thrust = [[0, 0]]
-        with motorFile as fp:
-            for i, line in enumerate(fp):
-                if i > 5:
-                    row = line.split()
-                    t = eval(row[0])
-                    f = eval(row[1])
-                    thrust.append([t, f])
-        thrust = np.array(thrust)
+        if motorFile.lower().endswith('.eng'):
+            return Motor.from_eng(motorFile)
+        motorFile = read_dot(motorFile)
+        parameters = motorFile.parameters
+        # The thrust curve (time, thrust) starts at (0, 0)
+        thrust = np.concatenate(([[0, 0]], motorFile.data[:, 0:2]))
+        name, diameter, length = str(parameters["name"]), parameters["diameter"], parameters["length"]
+        propMass, frameMass = parameters["propellant_mass"], parameters["frame_mass"]
+        totalImpulse = parameters["total_impulse"]
         return Motor(name, thrust, float(totalImpulse), float(diameter), float(length), float(propMass), float(frameMass))
 
+    @staticmethod
+    def from_eng(engFile, name=None):
+        """
+        Read a motor from a RASP engine file (the format of thrustcurve.org). The total impulse is the integral of
+        the thrust curve.
+
+        :param engFile: [str] path of the .eng file
+        :param name: [str] name of the motor in the file (the first motor by default)
+        :return: motor
+        """
+        motors = read_eng(engFile)
+        matching = [motor for motor in motors if name is None or motor['name'] == name]
+        if not matching:
+            raise KeyError("No motor '%s' in '%s'." % (name, engFile))
+        motor = matching[0]
+        thrust = motor['data']
+        totalImpulse = np.trapz(thrust[:, 1], thrust[:, 0])
+        return Motor(motor['name'], thrust, float(totalImpulse), motor['diameter'], motor['length'],
+                     motor['propellant_mass'], motor['total_mass'] - motor['propellant_mass'])
+
+def loadMotor(motor, motorFile):
+    """
+    :param motor: None, a Motor or the path of a motor file (relative to the current path)
+    :param motorFile: [str] path of the motor file of the rocket definition, read when motor is None
+    :return: [Motor]
+    """
+    if motor is None:
+        motor = motorFile
+    return Motor.from_file(motor) if isinstance(motor, str) else motor
+
 class Payload:
     def __init__(self, width):
         self.__mass = 4  # this mass is fixed for all rockets qualified for competition.
@@ -543,8 +565,127 @@ class Payload:
 
     @staticmethod
     def from_file(file=''):
-        width = find_parameter(file, "width")
-        return Payload(eval(width))
+        return Payload(read_dot(file).parameters["width"])
+
+class MassPropertiesTimeline:
+    """
+    Mass, COM and inertia matrix of a rocket over time, tabulated once on a fine uniform grid over
+    the burn phase (piecewise linear interpolation) and constant after burnout.
+    Works for any rocket class with getMotor, getMass(t), getCOM(t) and getInertiaMatrix(t).
+    """
+    def __init__(self, rocket, samples=2001):
+        self.__burnTime = rocket.getMotor().getBurnTime()
+        self.__dt = self.__burnTime/(samples - 1)
+        time = np.linspace(0, self.__burnTime, samples)
+        self.__mass = np.array([float(rocket.getMass(t)) for t in time])
+        self.__COM = np.array([rocket.getCOM(t) for t in time], dtype=float)
+        self.__inertia = np.array([rocket.getInertiaMatrix(t) for t in time], dtype=float)
+        # Slopes of each interval of the grid
+        self.__dMass = np.diff(self.__mass)
+        self.__dCOM = np.diff(self.__COM, axis=0)
+        self.__dInertia = np.diff(self.__inertia, axis=0)
+        # Constant after burnout
+        self.__finalMass = float(rocket.getMass(self.__burnTime))
+        self.__finalCOM = np.array(rocket.getCOM(self.__burnTime), dtype=float)
+        self.__finalInertia = np.array(rocket.getInertiaMatrix(self.__burnTime), dtype=float)
+
+    def evaluate(self, t):
+        """
+        :param t: [float] point in time [s]
+        :return: mass [kg], COM [np.array] and inertia matrix [np.array, 3x3] at time t
+        """
+        if t >= self.__burnTime:
+            return self.__finalMass, self.__finalCOM, self.__finalInertia
+        elif t <= 0:
+            return self.__mass[0], self.__COM[0], self.__inertia[0]
+        s = t/self.__dt
+        i = min(int(s), len(self.__dMass) - 1)  # t/dt may round up to the last grid point just before burnout
+        f = s - i
+        return (self.__mass[i] + f*self.__dMass[i], self.__COM[i] + f*self.__dCOM[i],
+                self.__inertia[i] + f*self.__dInertia[i])
+
+    def getMass(self, t):
+        return self.evaluate(t)[0]
+
+    def getCOM(self, t):
+        return self.evaluate(t)[1]
+
+    def getInertiaMatrix(self, t):
+        return self.evaluate(t)[2]
+
+    def getBurnTime(self):
+        return self.__burnTime
+
+    def getCOMArray(self, t):
+        """
+        :param t: [np.array] points in time [s]
+        :return: [np.array] COM at each point in time (shape of t + (3,))
+        """
+        time = self.__dt*np.arange(len(self.__COM))
+        t = np.asarray(t, dtype=float)
+        return np.stack([np.interp(t, time, self.__COM[:, i]) for i in range(3)], axis=-1)
+
+    def getTables(self):
+        """
+        :return: grid spacing [s], mass, COM and inertia matrices on the grid, with the constant
+                 values after burnout appended as last row
+        """
+        return (self.__dt, np.append(self.__mass, self.__finalMass),
+                np.concatenate((self.__COM, [self.__finalCOM])),
+                np.concatenate((self.__inertia, [self.__finalInertia])))
+
+class AeroCoefficients:
+    """
+    Reference area and the Barrowman normal force coefficient Cn(AoA) and COP Xcp(AoA) of a rocket,
+    tabulated once on a fine uniform AoA grid over [0, pi] (piecewise linear interpolation).
+    """
+    def __init__(self, Aref, CN, Xcp, samples=4001):
+        """
+        :param Aref: [float] reference area (cross section of the body) [m^2]
+        :param CN: (nose, body, fins) normal force coefficients, Cn = CNnose*sin(AoA) + CNbody*sin(AoA)^2 + CNfin*AoA
+        :param Xcp: (nose, body, fins) positions of the COP of the parts relative to nose tip [m]
+        """
+        self.__Aref = Aref
+        self.__dAoA = np.pi/(samples - 1)
+        self.__AoA = np.linspace(0, np.pi, samples)
+        CNnose, CNbody, CNfin = CN[0]*np.sin(self.__AoA), CN[1]*np.sin(self.__AoA)**2, CN[2]*self.__AoA
+        self.__Cn = CNnose + CNbody + CNfin
+        self.__Xcp = np.empty(samples)
+        self.__Xcp[1:] = ((CNnose*Xcp[0] + CNbody*Xcp[1] + CNfin*Xcp[2])[1:])/self.__Cn[1:]
+        # Limit AoA -> 0, where the body term vanishes faster than those of the nose and fins
+        self.__Xcp[0] = (CN[0]*Xcp[0] + CN[2]*Xcp[2])/(CN[0] + CN[2])
+        # Lists for the scalar lookups
+        self.__CnList, self.__XcpList = self.__Cn.tolist(), self.__Xcp.tolist()
+
+    def __interpolate(self, table, tableList, AoA):
+        if np.ndim(AoA) == 0:
+            s = min(max(float(AoA)/self.__dAoA, 0.0), len(tableList) - 1.0)
+            i = min(int(s), len(tableList) - 2)
+            return tableList[i] + (s - i)*(tableList[i + 1] - tableList[i])
+        return np.interp(AoA, self.__AoA, table)
+
+    def getAref(self):
+        return self.__Aref
+
+    def getCn(self, AoA):
+        """
+        :param AoA: [float or np.array] angle of attack [rad]
+        :return: normal force coefficient
+        """
+        return self.__interpolate(self.__Cn, self.__CnList, AoA)
+
+    def getXcp(self, AoA):
+        """
+        :param AoA: [float or np.array] angle of attack [rad]
+        :return: position of COP relative to nose tip [m]
+        """
+        return self.__interpolate(self.__Xcp, self.__XcpList, AoA)
+
+    def getTables(self):
+        """
+        :return: grid spacing [rad], Cn and Xcp on the grid (starting at AoA = 0)
+        """
+        return self.__dAoA, self.__Cn, self.__Xcp
 
 class RocketSimple:
     def __init__(self, nose, body, fin, numberOfFins, motor, payload, partsPlacement):
@@ -610,6 +751,8 @@ class RocketSimple:
         Xr = -SC/np.tan(theta)
         Xf = Xb + Xr/3*(RC + 2*TC)/(RC + TC) - 1/6*((RC + TC) - RC*TC/(RC + TC))
         self.__Xcp_fin = Xf
+        self.__aeroCoefficients = AeroCoefficients(Aref, (self.__CNnose, self.__CNbody, self.__CNfin),
+                                                   (self.__Xcp_nose, self.__Xcp_body, self.__Xcp_fin))
 
         print("\tCalculating inertia matrix of rocket..")
         # MOMENT OF INERTIA (about rocket axes with origin at COM, calculated with parallel axis thm)
@@ -628,8 +771,20 @@ class RocketSimple:
         self.__length = nose.getLength() + body.getLength() + (SC/np.tan(theta)-RC) + TC
         # MAXIMAL WIDTH OF ROCKET
         self.__width = body.getDiameter() + 2*SC
-        # DRAG COEFFICIENT (at some arbitrary speed)
-        self.__Cd = 1
+        # DRAG COEFFICIENT Cd(Mach, log10(Re)) of the component buildup (see Forces.dragCoefficient)
+        print("\tTabulating drag coefficient..")
+        mach, logReynolds = np.meshgrid(dragMachAxis, dragReynoldsAxis, indexing='ij')
+        self.__dragTable = AeroTable(dragMachAxis, dragReynoldsAxis,
+                                     Forces.dragCoefficient(self, mach, 10**logReynolds), 'bilinear')
+        self.__dragScale = 1
+        # Offsets of the structure mass and COM (see setMassOffset and setCOMOffset)
+        self.__massOffset = 0
+        self.__COMOffset = 0
+        # Constant drag coefficient (see setCd) and the files of the rocket (see from_file and getDefinition)
+        self.__Cd = None
+        self.__definitionFiles = None
+        # Tabulated mass properties (created when first needed)
+        self.__massProperties = None
         print("Rocket initialized!\n")
         self.printSpecifications(0, 5*np.pi/180) # Specs at AoA = 5 deg.
 
@@ -665,6 +820,14 @@ class RocketSimple:
         self.__InertiaMatrix = self.__rocketStructureMOI + motorMOI
         return self.__InertiaMatrix
 
+    def getMassProperties(self):
+        """
+        :return: [MassPropertiesTimeline] tabulated mass, COM and inertia matrix of the rocket
+        """
+        if self.__massProperties is None:
+            self.__massProperties = MassPropertiesTimeline(self)
+        return self.__massProperties
+
     def getLength(self):
         return self.__length
 
@@ -683,19 +846,26 @@ class RocketSimple:
         return self.__COMofRocketStructure
 
     # Aerodynamics
-    def getCOP(self, AoA):
+    def getCOP(self, AoA, speed=None, position=None):
         """
         :param AoA: [float] the angle of attack [rad]
+        :param speed, position: the air speed relative to rocket [m/s] and the position in world coordinates (the
+                                COP of this rocket depends on neither)
 
         :return: [np.array] Position of COP relative to nose tip
         """
-        #Nose, Body and Fins Cn
-        CNnose = self.__CNnose*np.sin(AoA)
-        CNfin = self.__CNfin*AoA
-        CNbody = self.__CNbody*np.sin(AoA)**2
-        CNrocket = CNnose + CNbody + CNfin
-        COP0 = (CNnose*self.__Xcp_nose + CNbody*self.__Xcp_body + CNfin*self.__Xcp_fin)/CNrocket
-        return np.array([COP0, 0, 0])
+        return np.array([self.__aeroCoefficients.getXcp(AoA), 0, 0])
+
+    def getCOPArray(self, AoA, speed=None, position=None):
+        """
+        :param AoA: [np.array] angles of attack [rad]
+        :param speed, position: air speeds relative to rocket [m/s] and positions (not used, see getCOP)
+
+        :return: [np.array, Nx3] Position of COP relative to nose tip for each AoA
+        """
+        COP = np.zeros((len(AoA), 3))
+        COP[:, 0] = self.__aeroCoefficients.getXcp(AoA)
+        return COP
 
     def getStabilityMargin(self, AoA, t=0):
         COM = self.getCOM(t)[0]
@@ -713,6 +883,18 @@ class RocketSimple:
         lift = Forces.SAMlift(self, position, velocity, AoA)
         return np.array([drag, lift])
 
+    def getAeroForcesArray(self, AoA, position, velocity):
+        """
+        :param velocity: [np.array, Nx3] velocities of rocket (with wind) relative to world [m/s]
+        :param position: [np.array, Nx3] positions in world coordinates
+        :param AoA: [np.array] the angles of attack [rad]
+
+        :return: drag [np.array, Nx3] in the world frame and lift [np.array] magnitudes [N]
+        """
+        drag = Forces.SAMdrag(self, position, velocity)
+        lift = Forces.SAMlift(self, position, velocity, AoA)
+        return drag, lift
+
     def getMomentAboutCOM(self, position, velocity, AoA):
         """
         :param velocity: [float] the air speed relative to rocket [m/s]
@@ -722,21 +904,95 @@ class RocketSimple:
         """
         #TODO Implement this
 
-    def getCd(self):
-        return self.__Cd
+    def getCd(self, mach=0.3, reynolds=None):
+        """
+        :param mach: [float or np.array] Mach number
+        :param reynolds: [float or np.array] Reynold's number with the rocket length as characteristic length
+                         (at the launch site if None)
+
+        :return: drag coefficient, relative to the cross section of the body
+        """
+        if reynolds is None:
+            density, speedOfSound, viscosity = Forces.getAtmosphere().evaluate(0)[:3]
+            reynolds = mach*speedOfSound*self.__length/viscosity
+        logReynolds = np.log10(np.maximum(reynolds, 1))
+        return self.__dragScale*self.__dragTable(mach, logReynolds)
 
     def getCn(self, AoA):
-        #Nose, Body and Fins Cn
-        CNnose = self.__CNnose*np.sin(AoA)
-        CNfin = self.__CNfin*AoA
-        CNbody = self.__CNbody*np.sin(AoA)**2
-        # FINAL ROCKET COP
-        CNrocket = CNnose + CNbody + CNfin
-        return CNrocket
+        return self.__aeroCoefficients.getCn(AoA)
+
+    def getAref(self):
+        """
+        :return: reference area of the aero coefficients (cross section of the body) [m^2]
+        """
+        return self.__aeroCoefficients.getAref()
+
+    def getAeroCoefficients(self):
+        """
+        :return: [AeroCoefficients] the tabulated Barrowman coefficients of the rocket
+        """
+        return self.__aeroCoefficients
+
+    def getDragTable(self):
+        """
+        :return: [AeroTable] the drag coefficient over Mach number and log10 of the Reynold's number (without the
+                 drag scale, see getDragScale)
+        """
+        return self.__dragTable
+
+    def getDragScale(self):
+        return self.__dragScale
+
+    def getMassOffset(self):
+        return self.__massOffset
+
+    def getCOMOffset(self):
+        return self.__COMOffset
+
+    def getDefinition(self):
+        """
+        :return: [dict] what the flights of the rocket depend on besides its motor: the files it was read from (None
+                 if it was not read from files), the constant drag coefficient (see setCd) and the dispersions
+        """
+        return {'files': self.__definitionFiles, 'Cd': self.__Cd, 'dragScale': self.__dragScale,
+                'massOffset': self.__massOffset, 'COMOffset': self.__COMOffset}
 
     # Set functions
     def setCd(self, Cd):
-        self.__Cd = Cd
+        """
+        :param Cd: [float] constant drag coefficient, replacing the table of the component buildup
+        """
+        self.__Cd = float(Cd)
+        self.__dragTable = AeroTable(dragMachAxis, dragReynoldsAxis,
+                                     np.full((len(dragMachAxis), len(dragReynoldsAxis)), float(Cd)), 'bilinear')
+
+    def setDragScale(self, scale):
+        """
+        :param scale: [float] factor on the drag coefficient (e.g. a dispersion of MonteCarlo)
+        """
+        self.__dragScale = scale
+
+    def setMassOffset(self, massOffset):
+        """
+        :param massOffset: [float] mass added to the rocket structure (at the COM of the structure) [kg]
+        """
+        self.__rocketMass += massOffset - self.__massOffset
+        self.__massOffset = massOffset
+        self.__massProperties = None
+
+    def setCOMOffset(self, COMOffset):
+        """
+        :param COMOffset: [float] shift of the COM of the rocket structure along the rocket axis [m]
+        """
+        self.__rocketStructureCOM += COMOffset - self.__COMOffset
+        self.__COMOffset = COMOffset
+        self.__massProperties = None
+
+    def setDefinitionFiles(self, files):
+        """
+        :param files: [list] paths of the files the rocket was read from, without the motor file (see getDefinition)
+        """
+        self.__definitionFiles = list(files)
 
     # auxiliary
     def printSpecifications(self, t, AoA=0):
@@ -777,7 +1033,7 @@ class RocketSimple:
         print(dots)
 
     @staticmethod
-    def from_file(rocket_file, path_to_file=""):
+    def from_file(rocket_file, path_to_file="", motor=None):
         """
         Creating an instance of a rocket by reading a rocket file that is located in a folder containing files for all
         necessary rocket parts.
@@ -794,26 +1050,26 @@ class RocketSimple:
                           myRocket = RocketSimple.from_file('myRocket.dot', 'myRocket')
         :param path_to_file: [string] a path to the rocket file relative to the current path (empty by default)
         :param rocket_file: [string] name of rocket file
+        :param motor: [Motor or string] a motor (or the path of a motor file relative to the current path) replacing
+                      the motor of the rocket file, e.g. to compare motors for the same airframe
         :return: [RocketSimple class] Rocket instance with specs from rocket file.
         """
         # get file names of each rocket part
         path = path_to_file + rocket_file
-        noseFile = find_parameter(path, "nose")
-        bodyFile = find_parameter(path, "body")
-        finFile = find_parameter(path, "fin")
-        numberOfFins = find_parameter(path, "number_of_fins")
-        motorFile = find_parameter(path, "motor")
-        payloadFile = find_parameter(path, "payload")
-        payloadPlacement = find_parameter(path, "payload_placement")
-        finPlacement = find_parameter(path, "fin_placement")
-        partsPlacement = np.array([eval(finPlacement), eval(payloadPlacement)])
+        parameters = read_dot(path).parameters
+        noseFile, bodyFile, finFile = parameters["nose"], parameters["body"], parameters["fin"]
+        motorFile, payloadFile = parameters["motor"], parameters["payload"]
+        partsPlacement = np.array([parameters["fin_placement"], parameters["payload_placement"]])
 
         # Initialize rocket parts
         path = path_to_file
         nose = Nose.from_file(path + noseFile)
         body = Body.from_file(path + bodyFile)
         fin = Fin.from_file(path + finFile)
-        motor = Motor.from_file(path + motorFile)
+        motor = loadMotor(motor, path + motorFile)
         payload = Payload.from_file(path + payloadFile)
 
-        return RocketSimple(nose, body, fin, eval(numberOfFins), motor, payload, partsPlacement)
+        rocket = RocketSimple(nose, body, fin, parameters["number_of_fins"], motor, payload, partsPlacement)
+        rocket.setDefinitionFiles([path_to_file + rocket_file] +
+                                  [path + file for file in (noseFile, bodyFile, finFile, payloadFile)])
+        return rocket
@@ -6,14 +6,17 @@ Last edit: 17.11.2018
 
 --Propulse NTNU--
 """
+import os
 import sys
 sys.path.append('../Forces/')
 import Forces as Forces
 
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.interpolate import interp2d
-from Rocket1 import Motor
+from Rocket1 import Motor, MassPropertiesTimeline, loadMotor
+from AeroTable import AeroTable
+from AeroDatabase import AeroDatabase
+from AeroFit import aeroTableShape, rotateAeroForces, aeroTables as fitAeroTables
 from lib.File_utilities import find_parameter, unwrap_report1, unwrap_report2
 
 # Define some things for plotting
@@ -21,10 +24,45 @@ font = {'family': 'sans-serif', 'weight': 'bold', 'size': 16}
 plt.rc('font', **font)
 plt.rcParams['text.latex.preamble'] = [r'\boldmath']
 
+epsilon = 1e-10  # avoids division by zero for the direction of a vanishing air velocity
+
+
+def aeroCacheDirectory(sampleReport):
+    """
+    :return: [str] the folder __aerocache__ next to a CFD report, for the fits of its samples
+    """
+    return os.path.join(os.path.dirname(sampleReport), '__aerocache__')
+
+
+def replaceMotor(motorFile, motor, initMass):
+    """
+    :param motorFile: [str] path of the motor file of the init file
+    :param motor: None (the motor of the init file), a Motor or the path of a motor file replacing it
+    :param initMass: [float] initial mass of the rocket with the motor of the init file [kg]
+    :return: the motor and the initial mass of the rocket with it [kg] (the COM and inertia of the init file are
+             kept)
+    """
+    fileMotor = Motor.from_file(motorFile)
+    if motor is None:
+        return fileMotor, initMass
+    motor = loadMotor(motor, motorFile)
+    return motor, initMass + motor.getMass(0) - fileMotor.getMass(0)
+
 
 class Rocket:
 
-    def __init__(self, *args):
+    def __init__(self, *args, fit=None, cacheDirectory=None, aeroTables=None, **fitOptions):
+        """
+        :param args: initMass [kg], initial inertia matrix [kgm^2], initCOM [m], length [m], motor, and the CFD
+                     samples: speeds [Mach], AoA [deg], aero forces (2xn, [drag, lift]) and moments about COM
+        :param fit: None (default) to resample the CFD samples with the interpolating splines of
+                    AeroTable.from_scattered, or a method of AeroFit.fitScattered that smooths the samples onto the
+                    aero tables ('rbf', 'polynomial' or 'spline')
+        :param cacheDirectory: [str] directory where the fits are cached (None: no caching)
+        :param aeroTables: [dict] 'drag', 'lift' and 'moment' -> AeroTable, tables of the samples made before (e.g.
+                           by an AeroDatabase), then nothing is fitted
+        :param fitOptions: further options of AeroFit.fitScattered (smoothing, degree)
+        """
         print('Initializing rocket..')
         self.__initMass = args[0]
         self.__initInertiaMatrix = args[1]
@@ -42,25 +80,32 @@ class Rocket:
         self.__freeAirStreamSpeeds = args[5]
         self.__AoAarray = args[6]
 
-        # Create rotation matrix for all AoA
-        def rotationMatrix(AoA):
-            sa, ca = np.sin(AoA*np.pi/180.0), np.cos(AoA*np.pi/180.0)
-            return np.array([[ca, sa],[-sa, ca]])
-
-        self.__aeroForces = args[7]
         # Initialize aeroforces (a 2xn matrix with drag as row 1 and lift as row 2)
-        for i in range(len(self.__AoAarray)):
-            rotMat = rotationMatrix(self.__AoAarray[i])
-            self.__aeroForces[:,i] = rotMat@self.__aeroForces[:,i]
+        self.__aeroForces = rotateAeroForces(self.__AoAarray, args[7])
 
         self.__momentsArray_CG = args[8]
 
-        print('\tInterpolating the drag force..')
-        self.__Dragforce = interp2d(self.__AoAarray, self.__freeAirStreamSpeeds, self.__aeroForces[0], kind='cubic')
-        print('\tInterpolating the lift force..')
-        self.__Liftforce = interp2d(self.__AoAarray, self.__freeAirStreamSpeeds, self.__aeroForces[1])
-        print('\tInterpolating the moment about COM (component normal to aerodynamic plane)..')
-        self.__MomentAboutCOM = interp2d(self.__AoAarray, self.__freeAirStreamSpeeds, self.__momentsArray_CG)
+        # Tabulated mass properties (created when first needed)
+        self.__massProperties = None
+        # Dispersions (see setDragScale, setMassOffset and setCOMOffset)
+        self.__dragScale = 1
+        self.__massOffset = 0
+        self.__COMOffset = 0
+        # The files of the rocket and options of its constructor (see setDefinitionFiles and getDefinition)
+        self.__definitionFiles = None
+        self.__definitionOptions = {}
+
+        # Tables of the forces and moment on a regular (AoA [deg], speed [Mach]) grid
+        if aeroTables is None:
+            aeroTables, self.__aeroFits = fitAeroTables(self.__AoAarray, self.__freeAirStreamSpeeds, self.__aeroForces,
+                                                        self.__momentsArray_CG, fit, cacheDirectory, aeroTableShape,
+                                                        **fitOptions)
+        else:
+            self.__aeroFits = {}
+        self.__Dragforce = aeroTables['drag']
+        self.__Liftforce = aeroTables['lift']
+        self.__MomentAboutCOM = aeroTables['moment']
+        self.__COP = self.__COPTable()
 
         # Done
         print('Rocket initialized!\n')
@@ -96,21 +141,61 @@ class Rocket:
         """
         return self.__length
 
+    def getMassProperties(self):
+        """
+        :return: [MassPropertiesTimeline] tabulated mass, COM and inertia matrix of the rocket
+        """
+        if self.__massProperties is None:
+            self.__massProperties = MassPropertiesTimeline(self)
+        return self.__massProperties
+
     # Aero dynamics
-    def getAeroForces(self, AoA, position, speed):
+    def getDragLift(self, AoA, position, speed):
         """
         :param speed: [float] the air speed relative to rocket [m/s]
         :param position: [np.array] The position vector in world coordinates
         :param AoA: [float] the angle of attack [rad]
 
-        :return: [np.array] ([drag, lift]) on rocket attacking in COP [N]
+        :return: [np.array] ([drag, lift]) of the CFD data [N], the components of the aero force along the air
+                 velocity (negative: opposing it) and normal to it in the aerodynamic plane
+
+        NOTE: AoA, position and speed may also be arrays (one entry/row per state), giving a 2xN array.
         """
-        z = abs(position[2])  # Vertical position of rocket
-        density_reduction = np.exp(-z/Forces.h)  # Account for decreasing air density
-        drag = self.__Dragforce(AoA, speed)
-        lift = self.__Liftforce(AoA, speed)
+        z = abs(position[..., 2])  # Vertical position of rocket
+        atmosphere = Forces.getAtmosphere()
+        density, speedOfSound = atmosphere.evaluate(z)[:2]
+        density_reduction = density/atmosphere.getDensity(0)  # Account for decreasing air density
+        # The CFD data is tabulated in degrees and Mach
+        AoA, mach = np.rad2deg(AoA), speed/speedOfSound
+        drag = self.__dragScale*self.__Dragforce(AoA, mach)
+        lift = self.__Liftforce(AoA, mach)
         return np.array([drag, lift])*density_reduction
 
+    def getAeroForces(self, AoA, position, velocity):
+        """
+        :param velocity: [np.array] velocity of rocket relative to the air in world coordinates [m/s]
+        :param position: [np.array] The position vector in world coordinates
+        :param AoA: [float] the angle of attack [rad]
+
+        :return: drag [np.array] in the world frame and lift [float] along the lift direction of the equations of
+                 motion (normal to the air velocity, away from the cross flow) [N]
+        """
+        speed = np.linalg.norm(velocity)
+        drag, lift = self.getDragLift(AoA, position, speed)
+        return drag*velocity/(speed + epsilon), -lift
+
+    def getAeroForcesArray(self, AoA, position, velocity):
+        """
+        :param velocity: [np.array, Nx3] velocities of rocket relative to the air in world coordinates [m/s]
+        :param position: [np.array, Nx3] positions in world coordinates
+        :param AoA: [np.array] the angles of attack [rad]
+
+        :return: drag [np.array, Nx3] in the world frame and lift [np.array] (see getAeroForces) [N]
+        """
+        speed = np.linalg.norm(velocity, axis=-1)
+        drag, lift = self.getDragLift(AoA, position, speed)
+        return (drag/(speed + epsilon))[..., np.newaxis]*velocity, -lift
+
     def getMomentAboutCOM(self, AoA, position, speed):
         """
         :param speed: [float] the air speed relative to rocket [m/s]
@@ -119,34 +204,85 @@ class Rocket:
 
         :return: [float] The total moment on rocket about COM (component normal to aerodynamic plane) [Nm]
         """
-        z = abs(position[2])  # Vertical position of rocket
-        density_reduction = np.exp(-z/Forces.h)  # Account for decreasing air density
-        return self.__MomentAboutCOM(AoA, speed)*density_reduction
+        z = abs(position[..., 2])  # Vertical position of rocket
+        atmosphere = Forces.getAtmosphere()
+        density, speedOfSound = atmosphere.evaluate(z)[:2]
+        density_reduction = density/atmosphere.getDensity(0)  # Account for decreasing air density
+        return self.__MomentAboutCOM(np.rad2deg(AoA), speed/speedOfSound)*density_reduction
 
-    def getCOP(self, AoA):
+    def __COPTable(self):
+        """
+        :return: [AeroTable] position of COP relative to nose tip [m] on the grid of the aero tables, from the
+                 moment about the initial COM and the normal force: COP = COM - M/N, limited to the rocket
+        """
+        AoAaxis, speedAxis = self.__Dragforce.getAxes()
+        AoA = np.deg2rad(AoAaxis)[:, np.newaxis]
+        drag, lift = self.__Dragforce.getValues(), self.__Liftforce.getValues()
+        moment = self.__MomentAboutCOM.getValues()
+        normalForce = lift*np.cos(AoA) + drag*np.sin(AoA)
+        # Regularized M/N: the COP of a vanishing normal force goes to the COM instead of infinity
+        epsilon = 1e-3*np.max(np.abs(normalForce))
+        arm = moment*normalForce/(normalForce**2 + epsilon**2)
+        if AoAaxis[0] == 0:
+            # M and N both vanish at AoA = 0, use the limit of their ratio
+            arm[0] = arm[1]
+        # The rocket lies along the negative x-axis from the nose tip
+        COP = np.clip(self.__initCOM - arm, -self.__length, 0)
+        return AeroTable(AoAaxis, speedAxis, COP, 'bilinear')
+
+    @staticmethod
+    def __mach(speed, altitude):
+        # The aero tables are tabulated in Mach, with the speed of sound at the altitude (as getDragLift)
+        return np.asarray(speed)/Forces.getAtmosphere().getSpeedOfSound(altitude)
+
+    def getCOP(self, AoA, speed, position=None):
         """
-        :param position: [np.array] The position vector in world coordinates
         :param AoA: [float] the angle of attack [rad]
+        :param speed: [float] the air speed relative to rocket [m/s]
+        :param position: [np.array] The position vector in world coordinates (None: at the launch site), for the
+                         speed of sound
 
-        :return: [float] The position of COP relative to nose tip [m]
+        :return: [np.array] The position of COP relative to nose tip [m]
         """
-        speed = 240  # TODO check if COP is speed dependent
-        F = self.getAeroForces(AoA, speed)
-        Fd = F[0]
-        Fl = F[1]
-        M = self.getMomentAboutCOM(AoA, speed)
-        COM_0 = self.getCOM(0)
-        COPx = COM_0[0] - M/(Fl*np.cos(AoA) + Fd*np.sin(AoA))
-        COPx = COPx[0]
-        return np.array([COPx, 0, 0])
+        altitude = 0 if position is None else abs(position[..., 2])
+        return np.array([self.__COP(np.rad2deg(AoA), self.__mach(speed, altitude)), 0, 0])
+
+    def getCOPArray(self, AoA, speed, position=None):
+        """
+        :param AoA: [np.array] angles of attack [rad]
+        :param speed: [np.array] air speeds relative to rocket [m/s]
+        :param position: [np.array, Nx3] positions in world coordinates (None: at the launch site)
+
+        :return: [np.array, Nx3] Position of COP relative to nose tip for each AoA and speed
+        """
+        altitude = 0 if position is None else np.abs(np.asarray(position)[..., 2])
+        COPx = self.__COP(np.rad2deg(AoA), self.__mach(speed, altitude))
+        COP = np.zeros(np.shape(COPx) + (3,))
+        COP[..., 0] = COPx
+        return COP
 
     def getAeroData(self):
         return self.__AoAarray, self.__freeAirStreamSpeeds, self.__aeroForces, self.__momentsArray_CG
 
-    def getStabilityMargin(self, AoA, speed, t=0):
-        COM = self.getCOM(t)
-        COP = self.getCOP(AoA, speed)
-        return COM - COP
+    def getAeroFits(self):
+        """
+        :return: [dict] 'drag', 'lift' and 'moment' -> AeroFit of the CFD samples (empty without fitting)
+        """
+        return self.__aeroFits
+
+    def getStabilityMargin(self, AoA, speed, t=0, altitude=0):
+        """
+        :param AoA: [float or np.array] the angle of attack [rad]
+        :param speed: [float or np.array] the air speed relative to rocket [m/s]
+        :param t: [float or np.array] point in time [s]
+        :param altitude: [float or np.array] altitude above the launch site [m], for the speed of sound
+
+        :return: [float or np.array] distance from COP to COM along the rocket [m], AoA, speed, t and altitude are
+                 broadcast (e.g. AoA[:, None, None], speed[None, :, None] and t[None, None, :] give a map over the
+                 first three)
+        """
+        COM = self.getMassProperties().getCOMArray(t)[..., 0]
+        return COM - self.__COP(np.rad2deg(AoA), self.__mach(speed, altitude))
 
     def getInertiaMatrix(self, t):
         """
@@ -170,6 +306,55 @@ class Rocket:
         return I0 + rInitMass*np.diag([0, deltaR**2, deltaR**2]) + (mInertia - mInitInertia) + (
                     mMass - mInitMass)*np.diag([0, deltaM**2, deltaM**2])
 
+    def getDragScale(self):
+        return self.__dragScale
+
+    def getMassOffset(self):
+        return self.__massOffset
+
+    def getCOMOffset(self):
+        return self.__COMOffset
+
+    def getDefinition(self):
+        """
+        :return: [dict] what the flights of the rocket depend on besides its motor: the files it was read from (None
+                 if it was not read from files), the options of its constructor and the dispersions
+        """
+        return {'files': self.__definitionFiles, 'options': dict(self.__definitionOptions),
+                'dragScale': self.__dragScale, 'massOffset': self.__massOffset, 'COMOffset': self.__COMOffset}
+
+    # Set functions
+    def setDragScale(self, scale):
+        """
+        :param scale: [float] factor multiplied with the drag force of the CFD data
+        """
+        self.__dragScale = scale
+
+    def setMassOffset(self, massOffset):
+        """
+        :param massOffset: [float] mass added to the rocket at its initial COM [kg]
+        """
+        self.__initMass += massOffset - self.__massOffset
+        self.__massOffset = massOffset
+        self.__massProperties = None
+
+    def setCOMOffset(self, COMOffset):
+        """
+        :param COMOffset: [float] shift of the initial COM along the rocket axis [m]
+        """
+        self.__initCOM += COMOffset - self.__COMOffset
+        self.__COMOffset = COMOffset
+        self.__massProperties = None
+
+    def setDefinitionFiles(self, files, **options):
+        """
+        :param files: [list] paths of the files the rocket was read from (init file and aero data), without the
+                      motor file (see getDefinition)
+        :param options: options of the constructor changing the rocket made of the files (e.g. the fit)
+        """
+        self.__definitionFiles = list(files)
+        self.__definitionOptions = options
+
     # auxiliary
     def plot(self):
         # Plots of motor performance
@@ -217,7 +402,7 @@ class Rocket:
         print('Plotting done!\n')
 
     @staticmethod
-    def from_file_without_AoAspeed(initFile, sampleReport, path_to_file=''):
+    def from_file_without_AoAspeed(initFile, sampleReport, path_to_file='', motor=None):
         """
         Create an instance of CFDrocket by reading some files
 
@@ -245,6 +430,7 @@ class Rocket:
                                             .
 
         :param path_to_file: The path to the files above relative to current path (none by default)
+        :param motor: a Motor (or the path of a motor file) replacing the motor of initFile, see replaceMotor
 
         return: A rocket instance with specs from initFile and CFD.
         """
@@ -254,7 +440,7 @@ class Rocket:
         initMOI = np.diag(np.array([x.strip() for x in initMOI.split(',')]).astype(float))  # in g*mm^2
         initCOM = find_parameter(path, 'initial_com') # in millimeters
         length = find_parameter(path, 'length') # in millimeters
-        motor = Motor.from_file(path_to_file + find_parameter(path, 'motor'))
+        motor, initMass = replaceMotor(path_to_file + find_parameter(path, 'motor'), motor, float(initMass)/1e3)
 
         path = path_to_file + sampleReport
         T = find_parameter(path, 'period')
@@ -264,12 +450,15 @@ class Rocket:
         alpha, air_speed, drag, lift, moment = unwrap_report1(path,
                                                               int(T), float(alpha_max), float(delta_v), float(v0))
 
-        return Rocket(float(initMass)/1e3, initMOI/1e9, float(initCOM)/1e3, float(length)/1e3, motor, air_speed,
-                      alpha, drag, lift,
-                      moment)
+        rocket = Rocket(initMass, initMOI/1e9, float(initCOM)/1e3, float(length)/1e3, motor, air_speed,
+                        alpha, drag, lift,
+                        moment)
+        rocket.setDefinitionFiles([path_to_file + initFile, path])
+        return rocket
 
     @staticmethod
-    def from_file_with_AoAspeed(initFile, sampleReport, path_to_file=''):
+    def from_file_with_AoAspeed(initFile, sampleReport, path_to_file='', fit=None, motor=None, cacheDirectory=None,
+                                **fitOptions):
         """
                 Create an instance of CFDrocket by reading some files
 
@@ -297,6 +486,13 @@ class Rocket:
                                                     .
 
                 :param path_to_file: The path to the files above relative to current path (none by default)
+                :param fit: None to interpolate the CFD samples (default), or the method of a fit of the samples
+                            (see Rocket)
+                :param motor: a Motor (or the path of a motor file) replacing the motor of initFile, see replaceMotor
+                :param cacheDirectory: [str] directory where the fits are cached, so later runs with the same data
+                                       skip the fitting (e.g. aeroCacheDirectory(path_to_file + sampleReport)), None
+                                       to fit every time
+                :param fitOptions: further options of AeroFit.fitScattered (smoothing, degree)
 
                 return: A rocket instance with specs from initFile and CFD.
                 """
@@ -307,9 +503,45 @@ class Rocket:
         initMOI = np.diag(np.array([x.strip() for x in initMOI.split(',')]).astype(float))  # in g*mm^2
         initCOM = find_parameter(path, 'initial_com')  # in millimeters
         length = find_parameter(path, 'length')  # in millimeters
-        motor = Motor.from_file(path_to_file + find_parameter(path, 'motor'))
+        motor, initMass = replaceMotor(path_to_file + find_parameter(path, 'motor'), motor, float(initMass)/1e3)
 
         path = path_to_file + sampleReport
         alpha, air_speed, aeroForces, moment = unwrap_report2(path)
 
-        return Rocket(float(initMass)/1e3, initMOI/1e9, float(initCOM)/1e3, float(length)/1e3, motor, air_speed, alpha, aeroForces, moment)
+        rocket = Rocket(initMass, initMOI/1e9, float(initCOM)/1e3, float(length)/1e3, motor, air_speed, alpha,
+                        aeroForces, moment, fit=fit, cacheDirectory=cacheDirectory, **fitOptions)
+        rocket.setDefinitionFiles([path_to_file + initFile, path], fit=fit, **fitOptions)
+        return rocket
+
+    @staticmethod
+    def from_database(initFile, database, name, path_to_file='', motor=None):
+        """
+        Create an instance of CFDrocket with the aero data of a configuration in an AeroDatabase. The tables are
+        memory mapped from the database, nothing is read from text or fitted.
+
+        example: myRocket = Rocket.from_database('V13_data.dot', 'rockets.aerodb', 'V13', 'V13/')
+
+        :param initFile: The file with mass, inertia, COM, length and motor (see from_file_with_AoAspeed)
+        :param database: [str or AeroDatabase] the database (a path relative to the current path)
+        :param name: [str] name of the configuration in the database (see AeroDatabase.convertReport)
+        :param path_to_file: The path to initFile relative to current path (none by default)
+        :param motor: a Motor (or the path of a motor file) replacing the motor of initFile, see replaceMotor
+
+        return: A rocket instance with specs from initFile and the database.
+        """
+        path = path_to_file + initFile
+        initMass = find_parameter(path, 'initial_mass')  # in grams
+        initMOI = find_parameter(path, 'initial_moi')
+        initMOI = np.diag(np.array([x.strip() for x in initMOI.split(',')]).astype(float))  # in g*mm^2
+        initCOM = find_parameter(path, 'initial_com')  # in millimeters
+        length = find_parameter(path, 'length')  # in millimeters
+        motor, initMass = replaceMotor(path_to_file + find_parameter(path, 'motor'), motor, float(initMass)/1e3)
+
+        if not isinstance(database, AeroDatabase):
+            database = AeroDatabase(database)
+        alpha, air_speed, aeroForces, moment = database.getSamples(name)
+
+        rocket = Rocket(initMass, initMOI/1e9, float(initCOM)/1e3, float(length)/1e3, motor, air_speed, alpha,
+                        aeroForces, moment, aeroTables=database.getTables(name))
+        rocket.setDefinitionFiles([path, database.getPath()], configuration=name)
+        return rocket
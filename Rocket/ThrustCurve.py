@@ -0,0 +1,84 @@
+"""
+Thrust curve of a motor
+
+A ThrustCurve is the piecewise linear interpolant of a tabulated thrust curve. A scalar lookup remembers the
+segment of the last query: the integrators march forward in time, so the segment is almost always the same one
+or the next, and only other queries search the segment with bisection. Arrays of times are evaluated at once.
+The impulse (the integral of the thrust) is exact: cumulative trapezoid sums at the points of the curve plus the
+trapezoid of the partial segment.
+
+--Propulse NTNU--
+"""
+from bisect import bisect_right
+import numpy as np
+
+class ThrustCurve:
+    def __init__(self, time, value):
+        """
+        :param time: [np.array] increasing points in time of the curve [s]
+        :param value: [np.array] thrust at the points in time [N], there is no thrust outside of the curve
+        """
+        time, value = np.asarray(time, dtype=float), np.asarray(value, dtype=float)
+        if len(time) < 2 or time.shape != value.shape or np.any(np.diff(time) < 0) or time[-1] <= time[0]:
+            raise ValueError("A thrust curve needs increasing points in time (at least 2) and a thrust at each.")
+        self.__time, self.__value = time, value
+        self.__timeList, self.__valueList = time.tolist(), value.tolist()
+        # Impulse at the points of the curve
+        self.__impulse = np.concatenate(([0], np.cumsum(np.diff(time)*(value[1:] + value[:-1])/2)))
+        self.__impulseList = self.__impulse.tolist()
+        self.__segment = 0  # segment of the last scalar lookup
+
+    def __segmentOf(self, t):
+        # Segment i with time[i] <= t < time[i + 1] (t is inside the curve, before its end)
+        times = self.__timeList
+        i = self.__segment
+        if times[i] <= t < times[i + 1]:
+            return i
+        if i + 2 < len(times) and times[i + 1] <= t < times[i + 2]:
+            i += 1
+        else:
+            i = bisect_right(times, t) - 1
+        self.__segment = i
+        return i
+
+    def __call__(self, t):
+        """
+        :param t: [float or np.array] point in time [s]
+        :return: [float or np.array] thrust at time t [N]
+        """
+        if np.ndim(t) == 0:
+            t = float(t)
+            times, values = self.__timeList, self.__valueList
+            if not times[0] <= t < times[-1]:
+                return values[-1] if t == times[-1] else 0.0
+            i = self.__segmentOf(t)
+            t0, t1 = times[i], times[i + 1]
+            return values[i] + (t - t0)/(t1 - t0)*(values[i + 1] - values[i])
+        return np.interp(np.asarray(t, dtype=float), self.__time, self.__value, left=0.0, right=0.0)
+
+    def impulse(self, t):
+        """
+        :param t: [float or np.array] point in time [s]
+        :return: [float or np.array] integral of the thrust from the start of the curve to time t [Ns]
+        """
+        if np.ndim(t) == 0:
+            t = float(t)
+            times = self.__timeList
+            if t <= times[0]:
+                return 0.0
+            if t >= times[-1]:
+                return self.__impulseList[-1]
+            i = self.__segmentOf(t)
+            return self.__impulseList[i] + (t - times[i])*(self.__valueList[i] + self(t))/2
+        t = np.clip(np.asarray(t, dtype=float), self.__time[0], self.__time[-1])
+        i = np.clip(np.searchsorted(self.__time, t, side='right') - 1, 0, len(self.__time) - 2)
+        return self.__impulse[i] + (t - self.__time[i])*(self.__value[i] + self(t))/2
+
+    def getTotalImpulse(self):
+        return self.__impulseList[-1]
+
+    def getTime(self):
+        return self.__time
+
+    def getValues(self):
+        return self.__value
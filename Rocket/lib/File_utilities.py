@@ -3,22 +3,181 @@ This is a module that contains functions for file reading.
 
 Last edit: 16.11.2018
 """
-from numpy import linspace, reshape, flip, loadtxt, sin, pi, unique, stack
+import os
+import json
+import hashlib
+from types import MappingProxyType
+from collections import namedtuple
+from numpy import linspace, reshape, flip, loadtxt, sin, pi, unique, stack, array, zeros, savez
+
+# A parsed .dot file: parameters (key -> int, float or str), the raw text of the parameters (key -> str, spaces
+# removed) and the numeric data block (the rows of numbers, e.g. a thrust curve)
+DotFile = namedtuple('DotFile', ('parameters', 'text', 'data'))
+
+# Parsed files by absolute path: (modification time, DotFile)
+parsed_files = {}
+
+# SHA-1 digests of file contents by absolute path: (modification time, size, digest)
+file_digests = {}
+
+
+def parse_value(text):
+    """
+    :param text: [str] a value of a .dot file
+    :return: the value as int or float if it is a number, else the text
+    """
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def read_dot(file):
+    """
+    Read a .dot file (rocket, part or motor file) in one pass, without evaluating any of its text. Lines
+    'key = value' are parameters (keys in lower case, the first of repeated keys is kept), lines of numbers form the
+    data block and all other lines (headers, comments, blank lines) are skipped. The result is cached until the file
+    is modified.
+
+    :param file: [str] path of the file
+    :return: [DotFile] parameters, text (read-only mappings) and data (read-only np.array, rows x columns) of the
+             file, shared by all readers of the file
+    """
+    path = os.path.abspath(file)
+    mtime = os.stat(path).st_mtime_ns
+    cached = parsed_files.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    parameters, text, rows = {}, {}, []
+    with open(path, 'r') as fp:
+        for number, line in enumerate(fp, 1):
+            if '=' in line:
+                key, value = line.replace(" ", "").strip().split("=", 1)
+                if key.lower() not in text:
+                    text[key.lower()] = value
+                    parameters[key.lower()] = parse_value(value)
+                continue
+            row = line.split()
+            try:
+                row = [float(value) for value in row]
+            except ValueError:
+                continue
+            if row:
+                if rows and len(row) != len(rows[0]):
+                    raise ValueError("Row of %d numbers in a data block of %d columns at line %d of '%s'."
+                                     % (len(row), len(rows[0]), number, file))
+                rows.append(row)
+    data = array(rows, dtype=float) if rows else zeros((0, 0))
+    data.flags.writeable = False  # shared by all readers of the file
+    parsed = DotFile(MappingProxyType(parameters), MappingProxyType(text), data)
+    parsed_files[path] = (mtime, parsed)
+    return parsed
+
+
+def file_digest(file):
+    """
+    :param file: [str] path of a file
+    :return: [str] SHA-1 digest (hex) of the content of the file, cached until the file is modified
+    """
+    path = os.path.abspath(file)
+    stat = os.stat(path)
+    cached = file_digests.get(path)
+    if cached is not None and cached[0:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            digest.update(block)
+    file_digests[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def write_atomic(file, write, binary=True):
+    """
+    Write a file through a temporary file that replaces it when complete, so other processes reading (or memory
+    mapping) the file or writing it at the same time never see a partial file. The temporary file is removed if the
+    writing fails.
+
+    :param file: [str] path of the file
+    :param write: [function] write(fp) writing the content to the open temporary file
+    :param binary: [bool] open the temporary file in binary (True) or text mode
+    """
+    temporary = '%s.%d.tmp' % (file, os.getpid())
+    try:
+        with open(temporary, 'wb' if binary else 'w') as fp:
+            write(fp)
+        os.replace(temporary, file)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save_npz(file, arrays):
+    """
+    Save arrays to an .npz file (see write_atomic).
+
+    :param arrays: [dict] name -> array
+    """
+    write_atomic(file, lambda fp: savez(fp, **arrays))
+
+
+def save_json(file, value, indent=None):
+    """
+    Save a value (dicts, lists, strings and numbers) to a JSON file (see write_atomic).
+    """
+    write_atomic(file, lambda fp: json.dump(value, fp, indent=indent), binary=False)
 
 
 def find_parameter(file, parameter):
-    File = open(file, 'r')
-    arr = ["", ""]
-    while arr[0] != parameter.lower():
-        base = File.readline()
-        if base == '':
-            print("ERROR: Could not find parameter '" + parameter + "' in '" + file + "'.")
-            return False
-        base = base.replace(" ", "")
-        base = base.replace("\n", "")
-        arr = base.split("=")
-    File.close()
-    return arr[1]
+    """
+    :return: [str] the text of a parameter of a .dot file (spaces removed), False if it is missing
+    """
+    text = read_dot(file).text
+    if parameter.lower() not in text:
+        print("ERROR: Could not find parameter '" + parameter + "' in '" + file + "'.")
+        return False
+    return text[parameter.lower()]
+
+
+def read_eng(file):
+    """
+    Read a RASP engine file (.eng): comment lines start with ';', each motor is a header line 'name diameter [mm]
+    length [mm] delays propellant_mass [kg] total_mass [kg] manufacturer' followed by its thrust curve, one
+    'time thrust' pair per line. A file may hold several motors.
+
+    :param file: [str] path of the file
+    :return: [list] of dicts with the name, diameter [m], length [m], delays, propellant_mass [kg],
+             total_mass [kg], manufacturer and data (np.array, time [s] and thrust [N] as columns, starting at
+             (0, 0)) of each motor
+    """
+    motors = []
+    with open(file, 'r') as fp:
+        for number, line in enumerate(fp, 1):
+            row = line.split(';')[0].split()
+            if not row:
+                continue
+            try:
+                values = [float(value) for value in row]
+            except ValueError:
+                values = None
+            if values is None:
+                if len(row) < 7:
+                    raise ValueError("Invalid motor header at line %d of '%s'." % (number, file))
+                motors.append({'name': row[0], 'diameter': float(row[1])*1e-3, 'length': float(row[2])*1e-3,
+                               'delays': row[3], 'propellant_mass': float(row[4]), 'total_mass': float(row[5]),
+                               'manufacturer': ' '.join(row[6:]), 'data': []})
+            elif not motors or len(values) != 2:
+                raise ValueError("Invalid thrust data at line %d of '%s'." % (number, file))
+            else:
+                motors[-1]['data'].append(values)
+    for motor in motors:
+        data = motor['data']
+        if not data or data[0][0] > 0:
+            data.insert(0, [0.0, 0.0])
+        motor['data'] = array(data, dtype=float)
+    return motors
 
 
 def unwrap_report1(file, T, alpha_max, delta_v, v0):
@@ -54,15 +213,18 @@ def unwrap_report2(file):
 
     **Assuming file format is like in the V9 folder on Google Drive.**
 
-    :param file: The CFD file (full-report)
-    :return: AoA, air_speed, lift, drag, total_moment (about CG) as [1D np.array]
+    :param file: The CFD file (full-report), columns: aoa, velocity, drag, lift, x-moment. The drag and lift
+                 columns are found by the names of the header line if it has them.
+    :return: AoA, air_speed, aeroForce (2xn, [drag, lift]), total_moment (about CG) as [np.array]
     """
+    with open(file, 'r') as fp:
+        header = [name.strip('"\'').lower() for name in fp.readline().split()]
     report = loadtxt(file, skiprows=1, dtype=float)
 
     AoA = report[:, 0]
     speed = report[:, 1]
-    lift = report[:, 2]
-    drag = report[:, 3]
+    drag = report[:, header.index('drag') if 'drag' in header else 2]
+    lift = report[:, header.index('lift') if 'lift' in header else 3]
     aeroForce = stack((drag, lift))
     moment = report[:, 4]
 
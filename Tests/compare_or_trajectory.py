@@ -18,8 +18,9 @@ def run(int_inclination, ramp_length, time_step, sim_time):
     rocket = Rocket.from_file_with_AoAspeed(init_file, sample_file, path)
     initialInclination = int_inclination/180.0*np.pi
 
-    (t, position, euler, linearVelocity, angularVelocity, AoA, thrust, gravity, drag, lift) \
-    = Trajectory.calculateTrajectory(rocket, int_inclination, ramp_length, time_step, sim_time)
+    trajectory = Trajectory.calculateTrajectory(rocket, int_inclination, ramp_length, time_step, sim_time,
+                                                stopCondition='groundImpact')
+    position = trajectory.getPosition()
 
     xs, ys, zs = position.T[0], position.T[1], position.T[2]
     hs = -zs
@@ -0,0 +1,53 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+import numpy as np
+import Forces
+from Rocket1 import AeroCoefficients, RocketSimple
+
+def test_AeroCoefficients():
+    CN, Xcp = (2, 5.3, 11.2), (-0.3, -1.2, -2.4)
+    coefficients = AeroCoefficients(0.01, CN, Xcp)
+    AoA = np.linspace(1e-3, np.pi, 777)
+    nose, body, fins = CN[0]*np.sin(AoA), CN[1]*np.sin(AoA)**2, CN[2]*AoA
+    Cn = nose + body + fins
+    assert np.allclose(coefficients.getCn(AoA), Cn, rtol=0, atol=1e-5)
+    assert np.allclose(coefficients.getXcp(AoA), (nose*Xcp[0] + body*Xcp[1] + fins*Xcp[2])/Cn, rtol=0, atol=1e-5)
+    # Scalar and batched lookups agree, the COP is finite at AoA = 0
+    assert np.allclose([coefficients.getCn(a) for a in AoA], coefficients.getCn(AoA))
+    assert np.allclose([coefficients.getXcp(a) for a in AoA], coefficients.getXcp(AoA))
+    assert np.isclose(coefficients.getXcp(0), (CN[0]*Xcp[0] + CN[2]*Xcp[2])/(CN[0] + CN[2]))
+    assert np.isclose(coefficients.getXcp(0), coefficients.getXcp(1e-6), atol=1e-5)
+
+def test_rocket():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    assert np.isclose(rocket.getAref(), np.pi*(rocket.getBody().getDiameter()/2)**2)
+    assert np.all(np.isfinite(rocket.getCOPArray(np.linspace(0, np.pi, 50))))
+    assert np.isclose(rocket.getCOP(0.1)[0], rocket.getAeroCoefficients().getXcp(0.1))
+
+def test_drag():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    # The table reproduces the component buildup
+    mach, reynolds = np.linspace(0.05, 1.9, 37), np.logspace(5, 8.5, 37)
+    Cd = Forces.dragCoefficient(rocket, mach, reynolds)
+    assert np.all((Cd > 0.1) & (Cd < 1))
+    assert np.allclose(rocket.getCd(mach, reynolds), Cd, rtol=5e-3)
+    assert np.isclose(rocket.getCd(mach[3], reynolds[3]), Cd[3], rtol=1e-3)
+    # Drag2 and SAMdrag agree along the rocket axis, for one and many states
+    position, velocity = np.array([0, 0, -1500.0]), np.array([180.0, 0, 0])
+    assert np.allclose(Forces.Drag2(rocket, position, velocity, 0), Forces.SAMdrag(rocket, position, velocity),
+                       rtol=1e-3)
+    positions, velocities = np.tile(position, (4, 1)), np.tile(velocity, (4, 1))
+    assert np.allclose(Forces.SAMdrag(rocket, positions, velocities), Forces.SAMdrag(rocket, position, velocity))
+    # Dispersions scale the table, setCd replaces it
+    rocket.setDragScale(1.1)
+    assert np.isclose(rocket.getCd(0.5, 1e7), 1.1*Forces.dragCoefficient(rocket, 0.5, 1e7), rtol=1e-3)
+    rocket.setCd(0.6)
+    assert np.allclose(rocket.getCd(mach, reynolds), 1.1*0.6)
+
+def main():
+    test_AeroCoefficients()
+    test_rocket()
+    test_drag()
+
+main()
@@ -0,0 +1,46 @@
+import sys
+sys.path.append('../Rocket/')
+import os
+import tempfile
+import numpy as np
+from AeroFit import aeroTables, rotateAeroForces
+from AeroDatabase import AeroDatabase, addCase, caseFromSamples, convertReport, samplesFromReport1
+from lib.File_utilities import unwrap_report2
+
+def test_convertReport():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rockets.aerodb')
+        convertReport(path, 'V13', 'V13/V13_CFD.txt')
+        # A second configuration, on the grid of unwrap_report1
+        alpha, speed = 10*np.sin(np.linspace(0, 1, 5)*np.pi/2), np.linspace(0.1, 0.4, 4)
+        A, S = np.meshgrid(alpha, speed, indexing='ij')
+        samples = samplesFromReport1(alpha, speed, -2 - A**2*S, 3*A*S, -A*S**2)
+        addCase(path, 'grid', *caseFromSamples(*samples, fit='polynomial', shape=(21, 11), degree=(3, 3)))
+
+        database = AeroDatabase(path)
+        assert database.getNames() == ['V13', 'grid'] and 'V13' in database
+        AoA, speed, aeroForces, moment = unwrap_report2('V13/V13_CFD.txt')
+        for array, expected in zip(database.getSamples('V13'), (AoA, speed, aeroForces, moment)):
+            assert isinstance(array, np.memmap)
+            assert np.array_equal(array, expected)
+        tables, fits = aeroTables(AoA, speed, rotateAeroForces(AoA, aeroForces), moment)
+        stored = database.getTables('V13')
+        for name in ('drag', 'lift', 'moment'):
+            assert np.array_equal(stored[name].getValues(), tables[name].getValues())
+            assert isinstance(stored[name].getCoefficients(), np.memmap)
+            assert np.isclose(stored[name](3.3, 0.27), tables[name](3.3, 0.27))
+            assert np.isclose(database.getAttributes('V13')['residuals'][name], fits[name].getRMSResidual())
+        # The polynomial fit reproduces the polynomial forces of the grid configuration
+        assert np.isclose(database.getTables('grid')['moment'](5.0, 0.25), -5.0*0.25**2)
+
+        # Replacing a configuration keeps the others
+        convertReport(path, 'V13', 'V13/V13_CFD.txt', fit=None)
+        database = AeroDatabase(path)
+        assert database.getNames() == ['grid', 'V13']
+        assert database.getAttributes('V13')['methods']['lift'] == 'bilinear'
+        assert np.isclose(database.getTables('grid')['moment'](5.0, 0.25), -5.0*0.25**2)
+
+def main():
+    test_convertReport()
+
+main()
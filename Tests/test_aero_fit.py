@@ -0,0 +1,54 @@
+import sys
+sys.path.append('../Rocket/')
+import os
+import tempfile
+import numpy as np
+from AeroFit import fitScattered, cachedFit
+
+def samples(noise=0.0, seed=0):
+    # sin spaced AoA sweeps at a few speeds, like the CFD reports
+    AoA = 5 - 5*np.cos(np.linspace(0.3, np.pi - 0.3, 6))
+    mach = np.linspace(0.1, 0.45, 8)
+    x, y = [a.ravel() for a in np.meshgrid(AoA, mach, indexing='ij')]
+    values = 3*x + 0.2*x**2 + 10*y*x - 4*y**2
+    return x, y, values + np.random.default_rng(seed).normal(0, noise, len(x)), values
+
+def test_fitScattered():
+    xAxis, yAxis = np.linspace(0, 10, 41), np.linspace(0.1, 0.45, 15)
+    X, Y = np.meshgrid(xAxis, yAxis, indexing='ij')
+    x, y, values, exact = samples()
+    # A least-squares polynomial of high enough degree reproduces a polynomial surface
+    fit = fitScattered(x, y, values, xAxis, yAxis, method='polynomial', degree=(2, 2))
+    assert fit.getRMSResidual() < 1e-9
+    assert np.allclose(fit.getValues(), 3*X + 0.2*X**2 + 10*Y*X - 4*Y**2)
+    # The smoothing rbf fit filters noise: the fitted surface is closer to the truth than the samples
+    x, y, values, exact = samples(noise=1.0)
+    fit = fitScattered(x, y, values, xAxis, yAxis, method='rbf', smoothing=1e-2)
+    table = fit.getTable()
+    print(fit.report('rbf'))
+    assert np.sqrt(np.mean((table(x, y) - exact)**2)) < np.sqrt(np.mean((values - exact)**2))
+    assert np.allclose(fit.getResiduals(), values - table(x, y), atol=0.1)
+    # Odd parity puts the surface through zero at AoA = 0
+    fit = fitScattered(x, y, values - 0.2*x**2, xAxis, yAxis, method='rbf', parity='odd')
+    assert np.allclose(fit.getValues()[0], 0, atol=1e-6)
+
+def test_cachedFit():
+    x, y, values, exact = samples(noise=1.0)
+    xAxis, yAxis = np.linspace(0, 10, 21), np.linspace(0.1, 0.45, 8)
+    with tempfile.TemporaryDirectory() as directory:
+        fit = cachedFit(directory, 'lift', x, y, values, xAxis, yAxis, method='rbf', smoothing=1e-2)
+        assert len(os.listdir(directory)) == 1
+        cached = cachedFit(directory, 'lift', x, y, values, xAxis, yAxis, method='rbf', smoothing=1e-2)
+        assert len(os.listdir(directory)) == 1
+        assert np.array_equal(cached.getValues(), fit.getValues())
+        assert np.array_equal(cached.getResiduals(), fit.getResiduals())
+        # Other settings or data give another fit
+        cachedFit(directory, 'lift', x, y, values, xAxis, yAxis, method='rbf', smoothing=1e-1)
+        cachedFit(directory, 'lift', x, y, values + 1, xAxis, yAxis, method='rbf', smoothing=1e-2)
+        assert len(os.listdir(directory)) == 3
+
+def main():
+    test_fitScattered()
+    test_cachedFit()
+
+main()
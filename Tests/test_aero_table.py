@@ -0,0 +1,61 @@
+import sys
+sys.path.append('../Rocket/')
+import os
+import tempfile
+import numpy as np
+from scipy.interpolate import bisplrep, bisplev
+from AeroTable import AeroTable
+
+def quadratic(x, y):
+    return 1 + 2*x - 3*y + 0.5*x**2 + x*y + 4*y**2
+
+def test_AeroTable():
+    AoA = np.linspace(0, 10, 11)
+    mach = np.linspace(0.1, 0.5, 9)
+    X, Y = np.meshgrid(AoA, mach, indexing='ij')
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(-2, 12, 1000), rng.uniform(0, 0.6, 1000)
+    # Bicubic is exact for quadratic surfaces (also when extrapolating), bilinear for bilinear surfaces
+    table = AeroTable(AoA, mach, quadratic(X, Y), 'bicubic', 'extrapolate')
+    assert np.allclose(table(x, y), quadratic(x, y))
+    table = AeroTable(AoA, mach, 2 + X - Y + 3*X*Y, 'bilinear', 'extrapolate')
+    assert np.allclose(table(x, y), 2 + x - y + 3*x*y)
+    # Scalar and batched queries agree, clamping uses the nearest grid point
+    table = AeroTable(AoA, mach, quadratic(X, Y), 'bicubic', 'clamp')
+    assert np.allclose([table(a, b) for a, b in zip(x, y)], table(x, y))
+    assert np.isclose(table(-5, 0.7), quadratic(0, 0.5))
+    assert table(np.zeros((4, 5)), 0.3).shape == (4, 5)
+
+def test_from_scattered():
+    rng = np.random.default_rng(1)
+    x, y = rng.uniform(0, 10, 60), rng.uniform(0.1, 0.5, 60)
+    values = np.sin(x/3) + y**2
+    AoA, mach = np.linspace(0, 10, 21), np.linspace(0.1, 0.5, 11)
+    table = AeroTable.from_scattered(x, y, values, AoA, mach)
+    spline = bisplrep(x, y, values, kx=3, ky=3, s=0.0)
+    print(np.max(np.abs(table.getValues() - bisplev(AoA, mach, spline))))
+    assert np.allclose(table.getValues(), bisplev(AoA, mach, spline))
+    assert np.allclose(table(AoA[3], mach[4]), bisplev(AoA[3], mach[4], spline))
+
+def test_memmap():
+    # Scalar lookups in memory mapped coefficients (as from an AeroDatabase) read the cells they use
+    AoA, mach = np.linspace(0, 10, 11), np.linspace(0.1, 0.5, 9)
+    X, Y = np.meshgrid(AoA, mach, indexing='ij')
+    table = AeroTable(AoA, mach, quadratic(X, Y))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'coefficients.bin')
+        table.getCoefficients().tofile(path)
+        coefficients = np.memmap(path, dtype=float, mode='r', shape=table.getCoefficients().shape)
+        mapped = AeroTable(AoA, mach, quadratic(X, Y), coefficients=coefficients)
+        rng = np.random.default_rng(2)
+        x, y = rng.uniform(-2, 12, 200), rng.uniform(0, 0.6, 200)
+        assert [mapped(a, b) for a, b in zip(x, y)] == [table(a, b) for a, b in zip(x, y)]
+        assert isinstance(mapped.getCoefficients(), np.memmap)
+        del mapped, coefficients
+
+def main():
+    test_AeroTable()
+    test_from_scattered()
+    test_memmap()
+
+main()
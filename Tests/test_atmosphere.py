@@ -0,0 +1,47 @@
+import sys
+sys.path.append('../Forces/')
+import os
+import tempfile
+import numpy as np
+import Forces
+from Atmosphere import Atmosphere, standardTemperaturePressure
+
+def test_standardAtmosphere():
+    # Tabulated values of the ISA
+    temperature, pressure = standardTemperaturePressure([0, 11000, 20000, 32000, 47000])
+    assert np.allclose(temperature, [288.15, 216.65, 216.65, 228.65, 270.65])
+    assert np.allclose(pressure, [101325, 22632.1, 5474.89, 868.019, 110.906], rtol=1e-3)
+    atmosphere = Atmosphere.standard()
+    density, speedOfSound, viscosity, T, P = atmosphere.evaluate(0)
+    assert np.isclose(density, 1.225, rtol=1e-3) and np.isclose(speedOfSound, 340.29, rtol=1e-3)
+    assert np.isclose(viscosity, 1.461e-5, rtol=1e-3)
+    assert np.isclose(atmosphere.getDensity(11000), 0.36392, rtol=1e-3)
+    # Scalar and batched lookups agree, also above the table
+    z = np.linspace(-10, 45e3, 301)
+    values = atmosphere.evaluate(z.reshape(7, 43))
+    for column in range(5):
+        assert values[column].shape == (7, 43)
+        assert np.allclose(values[column].ravel(), [atmosphere.evaluate(altitude)[column] for altitude in z])
+    # A launch site above sea level
+    assert np.isclose(Atmosphere.standard(groundAltitude=1000).getPressure(500), atmosphere.getPressure(1500))
+
+def test_sounding():
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'sounding.txt')
+        altitude = np.array([3000, 200, 1000, 6000])
+        temperature, pressure = standardTemperaturePressure(altitude)
+        temperature += 5
+        np.savetxt(file, np.column_stack((altitude, temperature, pressure)), header='altitude temperature pressure')
+        atmosphere = Atmosphere.from_sounding(file, groundAltitude=200)
+    assert np.isclose(atmosphere.getTemperature(2800), temperature[0])
+    assert np.isclose(atmosphere.getPressure(800), pressure[2])
+    # Outside of the sounding the pressure follows the hydrostatic equation
+    above = atmosphere.evaluate(np.array([5800, 8000]))
+    ratio = np.exp(-Forces.g*2200/(287.05*temperature[3]))
+    assert np.isclose(above[4][1]/above[4][0], ratio, rtol=1e-3)
+
+def main():
+    test_standardAtmosphere()
+    test_sounding()
+
+main()
@@ -0,0 +1,64 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import numpy as np
+import Trajectory
+import Wind
+from Rocket1 import RocketSimple
+from Rocket2 import Rocket
+
+def randomState(rng, onRamp=False):
+    quaternion = rng.normal(size=4)
+    position = np.array([0, 0, -0.5]) if onRamp else np.append(rng.uniform(-500, 500, 2), -rng.uniform(10, 3000))
+    return np.concatenate((position, quaternion/np.linalg.norm(quaternion), rng.uniform(-200, 300, 3),
+                           rng.uniform(-2, 2, 3)))
+
+def compareRHS(rocket):
+    # equationsMotionInPlace against equationsMotion over random states, times and winds
+    rng = np.random.default_rng(0)
+    launchRampLength = 2*rocket.getLength()
+    wind = Wind.WindField.powerLaw(8, np.pi/4)
+    initialDirection = Trajectory.initialState(rocket, np.deg2rad(4))[1]
+    workspace = Trajectory.MotionWorkspace(rocket, launchRampLength, initialDirection, wind)
+    out = np.zeros(13)
+    for k in range(200):
+        x, t = randomState(rng, onRamp=k % 10 == 0), rng.uniform(0, 20)
+        dx, AoA, forces = Trajectory.equationsMotion(x, t, rocket, launchRampLength, initialDirection, wind)
+        inPlace = Trajectory.equationsMotionInPlace(x, t, out, workspace)
+        assert inPlace[0] is out and np.max(np.abs(out - dx)) <= 1e-10*np.max(np.abs(dx))
+        assert np.isclose(inPlace[1], AoA, rtol=1e-12, atol=1e-12)
+        assert np.max(np.abs(inPlace[2] - forces)) <= 1e-10*np.max(np.abs(forces))
+
+def compareRK4(rocket):
+    # RK4InPlace with equationsMotionInPlace against RK4 with equationsMotion. Both agree to round-off over the
+    # launch and powered ascent. Later the AoA is near zero, and the direction of the (tiny) lift amplifies the
+    # round-off, so the whole flight is compared to a looser tolerance.
+    x0, initialDirection = Trajectory.initialState(rocket, np.deg2rad(4))
+    launchRampLength = 2*rocket.getLength()
+    for simulationTime, stopCondition, tolerance in ((3, None, 1e-9), (None, 'apogee', 1e-6)):
+        (t, x, AoA, forces, events), (tInPlace, xInPlace, AoAInPlace, forcesInPlace, eventsInPlace) = [
+            Trajectory.integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, 0.02, simulationTime,
+                                                stopCondition=stopCondition, backend=backend)
+            for backend in ('reference', 'workspace')]
+        assert len(t) == len(tInPlace) and np.allclose(t, tInPlace, rtol=tolerance, atol=0)
+        assert np.max(np.abs(xInPlace - x)) <= tolerance*np.max(np.abs(x))
+        for name in events:
+            assert np.allclose(eventsInPlace[name], events[name], rtol=tolerance, atol=0)
+    assert np.allclose(AoAInPlace, AoA, rtol=0, atol=1e-5)
+
+def test_rocketSimple():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    compareRHS(rocket)
+    compareRK4(rocket)
+
+def test_rocket():
+    rocket = Rocket.from_file_with_AoAspeed('V13_data.dot', 'V13_CFD.txt', 'V13/')
+    compareRHS(rocket)
+    compareRK4(rocket)
+
+def main():
+    test_rocketSimple()
+    test_rocket()
+
+main()
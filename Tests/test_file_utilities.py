@@ -0,0 +1,90 @@
+import sys
+sys.path.append('../Rocket/')
+import os
+import tempfile
+import numpy as np
+from lib.File_utilities import read_dot, find_parameter, unwrap_report2, write_atomic, save_npz, save_json
+
+def test_read_dot():
+    # Parameters are typed, the thrust curve is the data block (also with the blank line of this file)
+    motor = read_dot('Motors/CesaroniM795.dot')
+    assert motor.parameters['name'] == 'CesaroniM795' and motor.parameters['total_impulse'] == 10133
+    assert motor.parameters['propellant_mass'] == 4892e-3
+    assert motor.data.shape[1] == 2 and np.array_equal(motor.data[-1], [12.76, 0])
+    rocket = read_dot('myRocket1/myRocket.dot').parameters
+    assert rocket['number_of_fins'] == 4 and rocket['motor'] == '../Motors/CesaroniM1450.dot'
+    assert rocket['fin_placement'] == -1740e-3
+    assert find_parameter('V13/V13_data.dot', 'initial_moi') == '0.1133e9,12.857e9,12.857e9'
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'part.dot')
+        with open(file, 'w') as fp:
+            fp.write("Part:\ndensity = 1780\n")
+        assert read_dot(file) is read_dot(file)
+        # A modified file is read again
+        with open(file, 'w') as fp:
+            fp.write("Part:\ndensity = 2000\nthickness = 3e-3\n")
+        os.utime(file, ns=(0, os.stat(file).st_mtime_ns + 1))
+        assert read_dot(file).parameters == {'density': 2000, 'thickness': 3e-3}
+        assert find_parameter(file, 'width') is False
+
+def test_shared():
+    # The parsed file is shared by all its readers and cannot be modified, the first of repeated keys is kept
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'part.dot')
+        with open(file, 'w') as fp:
+            fp.write("Part:\ndensity = 1780\nDensity = 2000\n1 2\n")
+        parsed = read_dot(file)
+        assert parsed.parameters['density'] == 1780 and find_parameter(file, 'density') == '1780'
+        for mapping in (parsed.parameters, parsed.text):
+            try:
+                mapping['density'] = 0
+            except TypeError:
+                pass
+            else:
+                assert False, 'a shared parsed file was modified'
+        assert not parsed.data.flags.writeable and read_dot(file).parameters['density'] == 1780
+
+def test_unwrap_report2():
+    # Drag is the third column of the reports and lift the fourth (at the small AoA of V13 the drag is larger)
+    report = np.loadtxt('V13/V13_CFD.txt', skiprows=1)
+    AoA, speed, aeroForces, moment = unwrap_report2('V13/V13_CFD.txt')
+    assert np.array_equal(aeroForces[0], report[:, 2]) and np.array_equal(aeroForces[1], report[:, 3])
+    assert np.mean(np.abs(aeroForces[0])) > np.mean(np.abs(aeroForces[1])) and np.array_equal(moment, report[:, 4])
+    # The columns are found by the header
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'report.txt')
+        np.savetxt(file, report[:, [0, 1, 3, 2, 4]], header='"aoa" "velocity" "lift" "drag" "x-moment"', comments='')
+        swapped = unwrap_report2(file)[2]
+        assert np.allclose(swapped, aeroForces)
+
+def test_write_atomic():
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'arrays.npz')
+        save_npz(file, {'a': np.arange(3)})
+        # A failed write keeps the previous file and removes the temporary file
+        def write(fp):
+            fp.write(b'partial')
+            raise OSError('disk full')
+        try:
+            write_atomic(file, write)
+        except OSError:
+            pass
+        else:
+            assert False, 'the error of the write was lost'
+        assert os.listdir(directory) == ['arrays.npz']
+        with np.load(file) as data:
+            assert np.array_equal(data['a'], np.arange(3))
+        save_json(os.path.join(directory, 'index.json'), {'files': [1, 2]})
+        with open(os.path.join(directory, 'index.json')) as fp:
+            assert fp.read() == '{"files": [1, 2]}'
+
+def main():
+    test_read_dot()
+    test_cache()
+    test_shared()
+    test_unwrap_report2()
+    test_write_atomic()
+
+main()
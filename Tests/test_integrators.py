@@ -0,0 +1,117 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import copy
+import numpy as np
+import Trajectory
+import Wind
+from Rocket1 import RocketSimple
+
+def projectile(w, t):
+    # State [height, vertical velocity], dropped from 10 m with 5 m/s upwards
+    return np.array([w[1], -9.81]), 0, np.zeros((3, 4))
+
+def test_RK45():
+    w0 = np.array([10.0, 5.0])
+    apogee = Trajectory.FlightEvent('apogee', lambda t, w: -w[1])
+    ground = Trajectory.FlightEvent('groundImpact', lambda t, w: -w[0])
+    t, w, AoA, forces, events = Trajectory.RK45(projectile, 0, 3, 0.1, w0, events=[apogee, ground])
+    exact = w0[0] + w0[1]*t - 9.81/2*t**2
+    print(len(t), np.max(np.abs(w[:, 0] - exact)))
+    print(events)
+    assert np.allclose(w[:, 0], exact)
+    assert abs(events['apogee'][0] - 5/9.81) < 1e-8
+    assert abs(events['groundImpact'][0] - (5 + np.sqrt(25 + 2*9.81*10))/9.81) < 1e-8
+    # The event times are output points of the trajectory
+    assert events['apogee'][0] in t
+
+def test_detectEvents():
+    t = np.linspace(0, 3, 301)
+    w = np.stack((10 + 5*t - 9.81/2*t**2, 5 - 9.81*t), axis=1)
+    ground = Trajectory.FlightEvent('groundImpact', lambda t, w: -w[0])
+    events = Trajectory.detectEvents(t, w, [ground])
+    print(events)
+    assert abs(events['groundImpact'][0] - (5 + np.sqrt(25 + 2*9.81*10))/9.81) < 1e-3
+
+def test_stopCondition():
+    # Both integrators stop exactly at a terminal event, without knowing the flight time in advance
+    w0 = np.array([10.0, 5.0])
+    impactTime = (5 + np.sqrt(25 + 2*9.81*10))/9.81
+    ground = Trajectory.FlightEvent('groundImpact', lambda t, w: -w[0], terminal=True)
+    t, w, AoA, forces, events = Trajectory.RK45(projectile, 0, np.inf, 0.1, w0, events=[ground])
+    print(t[-1], w[-1])
+    assert abs(t[-1] - impactTime) < 1e-8 and abs(w[-1, 0]) < 1e-8
+    t, w, AoA, forces, events = Trajectory.RK4(projectile, 0, np.inf, 2e-4, w0, events=[ground])
+    print(len(t), t[-1], w[-1])
+    assert len(t) > 4096  # the buffers have grown
+    assert abs(t[-1] - impactTime) < 1e-6 and abs(w[-1, 0]) < 1e-6
+
+def test_rocketRK45():
+    # RK45 restarts at the ramp exit and burnout and flies the rocket with far fewer evaluations of the equations of
+    # motion than RK4 at the step of test_trajectory_module. The events of RK4 are interpolated linearly between its
+    # steps, so they agree to about two steps.
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    timeStep = 0.002
+    arguments = (rocket, np.deg2rad(4), 2*rocket.getLength(), timeStep)
+    reference = Trajectory.calculateTrajectory(*arguments, stopCondition='groundImpact')
+    adaptive = Trajectory.calculateTrajectory(*arguments, method='RK45', stopCondition='groundImpact')
+    for name in ('launchRampExit', 'burnout', 'apogee', 'groundImpact'):
+        assert np.allclose(adaptive.getEvents()[name], reference.getEvents()[name], rtol=0, atol=2*timeStep)
+    # apogee and landing point within 0.5 m
+    assert abs(np.min(adaptive.getPosition()[:, 2]) - np.min(reference.getPosition()[:, 2])) < 0.5
+    assert np.linalg.norm(adaptive.getPosition()[-1, 0:2] - reference.getPosition()[-1, 0:2]) < 0.5
+    # the same flight, counting the evaluations (RK4 evaluates four times a step)
+    calls = [0]
+    def RHS(x, t, *args):
+        calls[0] += 1
+        return Trajectory.equationsMotion(x, t, *args)
+    x0, initialDirection = Trajectory.initialState(rocket, np.deg2rad(4))
+    events = Trajectory.flightEvents(rocket, 2*rocket.getLength(), initialDirection, 'groundImpact')
+    t, x = Trajectory.RK45(RHS, 0, Trajectory.maxSimulationTime, timeStep, x0,
+                           RHS_args=(rocket, 2*rocket.getLength(), initialDirection, None), events=events)[0:2]
+    assert np.array_equal(t, adaptive.getTime()) and np.array_equal(x[:, 0:3], adaptive.getPosition())
+    steps = len(reference.getTime()) - 1
+    print(len(t) - 1, calls[0], steps, 4*steps)
+    assert len(t) < steps/10 and calls[0] < 4*steps/5
+
+def test_ensemble():
+    # The ensemble integrator against the single flights of its members: several inclinations of one rocket (its
+    # mass properties and thrust are evaluated once for them) and dispersed copies, in a wind
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    heavy, draggy = copy.deepcopy(rocket), copy.deepcopy(rocket)
+    heavy.setMassOffset(0.8)
+    heavy.setCOMOffset(-0.05)
+    draggy.setDragScale(1.15)
+    draggy.getMotor().setThrustScale(0.95)
+    rockets = [rocket, rocket, heavy, draggy]
+    inclinations = np.deg2rad([2, 6, 4, 5])
+    rampLengths = np.array([4.0, 4.0, 5.0, 3.0])
+    wind = Wind.WindField.powerLaw(6, np.pi/4)
+    timeStep, simulationTime = 0.01, 10
+    t, position, euler, AoA, velocity, angularVelocity, drag, lift, gravity, thrust = \
+        Trajectory.calculateEnsembleTrajectory(rockets, inclinations, rampLengths, timeStep, simulationTime, wind)
+    assert position.shape == (4, len(t), 3) and drag.shape == (4, len(t), 3)
+    for i in range(4):
+        flight = Trajectory.calculateTrajectory(rockets[i], inclinations[i], rampLengths[i], timeStep, simulationTime,
+                                                wind=wind)
+        print(np.max(np.abs(position[i] - flight.getPosition())), np.max(np.abs(AoA[i] - flight.getAoA())))
+        assert np.allclose(t, flight.getTime())
+        assert np.max(np.abs(position[i] - flight.getPosition())) < 1e-5
+        assert np.allclose(AoA[i], flight.getAoA(), rtol=0, atol=1e-6)
+        for ensemble, single in ((drag, flight.getDrag()), (gravity, flight.getGravity()),
+                                 (thrust, flight.getThrust())):
+            assert np.max(np.abs(ensemble[i] - single)) <= 1e-6*np.max(np.abs(single))
+        # near AoA 0 the direction of the (tiny) lift is ill-conditioned and its magnitude follows the round-off of
+        # the AoA, compare the magnitude to a looser tolerance
+        liftMagnitude = np.linalg.norm(flight.getLift(), axis=1)
+        assert np.max(np.abs(np.linalg.norm(lift[i], axis=1) - liftMagnitude)) <= 1e-4*np.max(liftMagnitude)
+
+def main():
+    test_RK45()
+    test_detectEvents()
+    test_stopCondition()
+    test_rocketRK45()
+    test_ensemble()
+
+main()
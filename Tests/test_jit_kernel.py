@@ -0,0 +1,100 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import warnings
+import numpy as np
+import Forces
+import Trajectory
+import JitKernel
+import Wind
+from Rocket1 import RocketSimple
+from Rocket2 import Rocket
+
+def test_jit_kernel():
+    # The kernel (compiled or not) against the reference equations of motion
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    launchRampLength = 2*rocket.getLength()
+    x0, initialDirection = Trajectory.initialState(rocket, 4/180*np.pi)
+    reference = Trajectory.integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, 0.01,
+                                                    stopCondition='groundImpact')
+    jit = JitKernel.integrateRK4(rocket, x0, launchRampLength, initialDirection, 0.01, Trajectory.maxSimulationTime,
+                                 'groundImpact', Forces.g, Forces.getAtmosphere(), Trajectory.epsilon, chunkSize=1000)
+    print(reference[0][-1], jit[0][-1], np.max(np.abs(reference[1] - jit[1])))
+    assert len(reference[0]) == len(jit[0])
+    assert abs(reference[0][-1] - jit[0][-1]) < 1e-5
+    assert np.max(np.abs(reference[1] - jit[1])) < 1e-4
+    for name in reference[4]:
+        assert np.allclose(reference[4][name], jit[4][name], atol=1e-5)
+
+def test_wind():
+    # Wind over altitude and time: the same for the kernel and the other backends
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    wind = Wind.WindField.powerLaw(7, np.pi/3, exponent=0.15)
+    wind.setGusts(Wind.drydenGusts(1.5, 60, seed=2), 0.05)
+    x0, initialDirection = Trajectory.initialState(rocket, 4/180*np.pi)
+    reference = Trajectory.integrateEquationsMotion(rocket, x0, 2*rocket.getLength(), initialDirection, 0.01,
+                                                    stopCondition='apogee', wind=wind)
+    workspace = Trajectory.integrateEquationsMotion(rocket, x0, 2*rocket.getLength(), initialDirection, 0.01,
+                                                    stopCondition='apogee', backend='workspace', wind=wind)
+    jit = JitKernel.integrateRK4(rocket, x0, 2*rocket.getLength(), initialDirection, 0.01, Trajectory.maxSimulationTime,
+                                 'apogee', Forces.g, Forces.getAtmosphere(), Trajectory.epsilon, wind)
+    assert np.allclose(reference[1], workspace[1])
+    assert len(reference[0]) == len(jit[0])
+    assert np.max(np.abs(reference[1] - jit[1])) < 1e-4
+
+def test_backend():
+    # calculateTrajectory with backend='jit': compiled with numba if it is installed, else the reference backend
+    # with a RuntimeWarning
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    reference = Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 2*rocket.getLength(), 0.01,
+                                               stopCondition='apogee')
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        jit = Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 2*rocket.getLength(), 0.01, stopCondition='apogee',
+                                             backend='jit')
+    fallback = [warning for warning in caught if issubclass(warning.category, RuntimeWarning)]
+    if JitKernel.isAvailable():
+        # The kernel functions are numba dispatchers, compiled by the flight
+        assert not fallback and hasattr(JitKernel.RK4Chunk, 'signatures') and JitKernel.RK4Chunk.signatures
+        assert len(jit.getTime()) == len(reference.getTime())
+        assert np.max(np.abs(jit.getPosition() - reference.getPosition())) < 1e-4
+    else:
+        assert len(fallback) == 1 and 'numba' in str(fallback[0].message)
+        assert np.array_equal(jit.getPosition(), reference.getPosition())
+    # RK45 with the kernel as right-hand side (through calculateTrajectory if numba is installed, else called
+    # directly): the adaptive steps may differ by round-off, so the events and apogee agree to the tolerance
+    reference = Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 2*rocket.getLength(), 0.01, method='RK45',
+                                               stopCondition='apogee')
+    x0, initialDirection = Trajectory.initialState(rocket, 4/180*np.pi)
+    RHS = JitKernel.equationsMotionFunction(rocket, 2*rocket.getLength(), initialDirection, Forces.g,
+                                            Forces.getAtmosphere(), Trajectory.epsilon)
+    events = Trajectory.flightEvents(rocket, 2*rocket.getLength(), initialDirection, 'apogee')
+    t, x, AoA, forces, jitEvents = Trajectory.RK45(RHS, 0, Trajectory.maxSimulationTime, 0.01, x0, events=events)
+    flights = [(x[-1, 0:3], jitEvents)]
+    if JitKernel.isAvailable():
+        jit = Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 2*rocket.getLength(), 0.01, method='RK45',
+                                             stopCondition='apogee', backend='jit')
+        flights.append((jit.getPosition()[-1], jit.getEvents()))
+    for position, jitEvents in flights:
+        assert np.max(np.abs(position - reference.getPosition()[-1])) < 1e-2
+        for name in ('launchRampExit', 'burnout', 'apogee'):
+            assert np.allclose(jitEvents[name], reference.getEvents()[name], rtol=0, atol=1e-4)
+
+def test_unsupportedRocket():
+    # The CFD rocket has no Barrowman model, with or without numba
+    rocket = Rocket.from_file_with_AoAspeed('V13_data.dot', 'V13_CFD.txt', 'V13/')
+    try:
+        Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 5.2, 0.02, 5, backend='jit')
+    except ValueError as error:
+        assert 'Barrowman' in str(error)
+    else:
+        raise AssertionError("The jit backend flew a rocket without the Barrowman model.")
+
+def main():
+    test_jit_kernel()
+    test_wind()
+    test_backend()
+    test_unsupportedRocket()
+
+main()
@@ -31,7 +31,39 @@ def test():
     H = Kinematics.TransformationMatrix(w.T)
     print(H)
 
+def test_array():
+    # The array versions must agree with the single state versions row by row
+    angles = np.array([[np.pi/3, -np.pi/7, np.pi/4], [0.1, 0.2, -0.3], [-80*np.pi/180, 0, 0]])
+    q = np.array([Kinematics.euler2quaternion(*angle) for angle in angles])
+    R = Kinematics.RquaternionArray(q)
+    T = Kinematics.quaternionGradientArray(q)
+    euler = Kinematics.quaternion2eulerArray(q)
+    for i in range(len(q)):
+        print(R[i] - Kinematics.Rquaternion(q[i]))
+        assert np.allclose(R[i], Kinematics.Rquaternion(q[i]))
+        assert np.allclose(T[i], Kinematics.quaternionGradient(q[i]))
+        assert np.allclose(euler[i], Kinematics.quaternion2euler(q[i]))
+
+def test_array_batch():
+    # Random orientations, also with a leading batch axis
+    rng = np.random.default_rng(0)
+    angles = np.stack((rng.uniform(-np.pi, np.pi, 500), rng.uniform(-1.5, 1.5, 500), rng.uniform(-np.pi, np.pi, 500)),
+                      axis=1)
+    R = Kinematics.RyzxArray(angles)
+    q = Kinematics.euler2quaternionArray(angles)
+    for i in range(len(angles)):
+        assert np.allclose(R[i], Kinematics.Ryzx(*angles[i]))
+        assert np.allclose(q[i], Kinematics.euler2quaternion(*angles[i]))
+    assert np.allclose(Kinematics.rotation2quaternionArray(R), q)
+    assert np.allclose(Kinematics.quaternion2eulerArray(q), angles)
+    batch = q.reshape(50, 10, 4)
+    assert Kinematics.RquaternionArray(batch).shape == (50, 10, 3, 3)
+    assert np.allclose(Kinematics.quaternion2eulerArray(batch), angles.reshape(50, 10, 3))
+    assert np.allclose(Kinematics.quaternionGradientArray(batch).reshape(500, 4, 3), Kinematics.quaternionGradientArray(q))
+
 def main():
     test()
+    test_array()
+    test_array_batch()
 
 main()
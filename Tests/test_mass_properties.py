@@ -0,0 +1,48 @@
+import sys
+sys.path.append('../Rocket/')
+import numpy as np
+from Rocket1 import MassPropertiesTimeline
+
+class LinearRocket:
+    # Mass, COM and inertia decreasing linearly until burnout
+    class Motor:
+        def __init__(self, burnTime):
+            self.__burnTime = burnTime
+
+        def getBurnTime(self):
+            return self.__burnTime
+
+    def __init__(self, burnTime):
+        self.__motor = LinearRocket.Motor(burnTime)
+
+    def getMotor(self):
+        return self.__motor
+
+    def getMass(self, t):
+        return 30 - min(t, self.__motor.getBurnTime())
+
+    def getCOM(self, t):
+        return np.array([-1.5 + 0.01*min(t, self.__motor.getBurnTime()), 0, 0])
+
+    def getInertiaMatrix(self, t):
+        return np.diag([0.1, 10, 10])*self.getMass(t)
+
+def test_evaluate():
+    # Exact for linear properties, also just before burnout where t/dt rounds to the last grid point
+    for burnTime in (15.70368568343543, 3.2, 7):
+        rocket = LinearRocket(burnTime)
+        timeline = MassPropertiesTimeline(rocket)
+        for t in (-1, 0, 1e-3, burnTime/3, np.nextafter(burnTime, 0), burnTime, burnTime + 1):
+            mass, COM, inertia = timeline.evaluate(t)
+            t = max(t, 0)
+            assert np.isclose(mass, rocket.getMass(t))
+            assert np.allclose(COM, rocket.getCOM(t)) and np.allclose(inertia, rocket.getInertiaMatrix(t))
+    # Random burn times
+    for burnTime in np.random.default_rng(0).uniform(1, 20, 300):
+        timeline = MassPropertiesTimeline(LinearRocket(burnTime), samples=11)
+        assert np.isclose(timeline.getMass(np.nextafter(burnTime, 0)), 30 - burnTime)
+
+def main():
+    test_evaluate()
+
+main()
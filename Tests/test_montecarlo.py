@@ -0,0 +1,66 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import numpy as np
+import Trajectory
+import MonteCarlo
+from Rocket1 import RocketSimple
+
+def test_dispersionEllipse():
+    rng = np.random.default_rng(0)
+    covariance = np.array([[400, 150], [150, 100]])
+    points = rng.multivariate_normal([100, -50], covariance, 20000)
+    ellipse = MonteCarlo.dispersionEllipse(np.mean(points, axis=0), np.cov(points, rowvar=False), 0.9)
+    print(ellipse)
+    # Fraction of the points inside the ellipse
+    d = points - ellipse['center']
+    c, s = np.cos(ellipse['angle']), np.sin(ellipse['angle'])
+    major, minor = ellipse['semiAxes']
+    inside = ((c*d[:, 0] + s*d[:, 1])/major)**2 + ((-s*d[:, 0] + c*d[:, 1])/minor)**2 <= 1
+    assert abs(np.mean(inside) - 0.9) < 0.01
+
+def test_montecarlo():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    Cd, mass = rocket.getCd(), rocket.getMass(0)
+    inclination = MonteCarlo.Normal(4/180*np.pi, 1/180*np.pi)
+    kwargs = dict(processes=1, seed=1, dragScale=MonteCarlo.Uniform(0.9, 1.1), massOffset=MonteCarlo.Normal(0, 0.5),
+                  windSpeed=MonteCarlo.Uniform(0, 8), windDirection=MonteCarlo.Uniform(0, 2*np.pi),
+                  windExponent=1/7, gustIntensity=MonteCarlo.Uniform(0, 2))
+    result = Trajectory.montecarlo(rocket, 4, 0.025, inclination, 2*rocket.getLength(), keepTrajectories=[2],
+                                   **kwargs)
+    print(result['apogee'], result['landing'], result['statistics']['apogee'])
+    assert result['landing'].shape == (4, 2) and np.all(result['apogee'] > 0)
+    assert np.isclose(result['statistics']['apogee']['mean'], np.mean(result['apogee']))
+    assert np.allclose(result['ellipse']['center'], np.mean(result['landing'], axis=0))
+    # Only the selected trajectory is kept
+    assert list(result['trajectories']) == [2]
+    assert np.allclose(result['trajectories'][2].getPosition()[-1, 0:2], result['landing'][2])
+    # Same seed, same flights; the nominal rocket is not modified
+    assert np.array_equal(Trajectory.montecarlo(rocket, 4, 0.025, inclination, 2*rocket.getLength(),
+                                                **kwargs)['landing'], result['landing'])
+    assert rocket.getCd() == Cd and rocket.getMass(0) == mass
+
+def test_processes():
+    # A pool of processes flies the same flights as one process, reduced in the same order
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    kwargs = dict(seed=3, thrustScale=MonteCarlo.Normal(1, 0.02), dragScale=MonteCarlo.Uniform(0.9, 1.1),
+                  windSpeed=MonteCarlo.Uniform(0, 8), windDirection=MonteCarlo.Uniform(0, 2*np.pi),
+                  gustIntensity=1, keepTrajectories=[1, 3])
+    inclination = MonteCarlo.Normal(4/180*np.pi, 1/180*np.pi)
+    serial, pool = [Trajectory.montecarlo(rocket, 4, 0.025, inclination, 2*rocket.getLength(), processes=processes,
+                                          **kwargs) for processes in (1, 2)]
+    for name in ('apogee', 'maxVelocity', 'landing'):
+        assert np.array_equal(pool[name], serial[name])
+    assert pool['statistics']['apogee'] == serial['statistics']['apogee']
+    assert np.array_equal(pool['ellipse']['center'], serial['ellipse']['center'])
+    assert list(pool['trajectories']) == [1, 3]
+    for index in (1, 3):
+        assert np.array_equal(pool['trajectories'][index].getData(), serial['trajectories'][index].getData())
+
+def main():
+    test_dispersionEllipse()
+    test_montecarlo()
+    test_processes()
+
+main()
@@ -0,0 +1,61 @@
+import sys
+sys.path.append('../Rocket/')
+import os
+import shutil
+import tempfile
+import numpy as np
+from Rocket1 import Motor
+from MotorLibrary import MotorLibrary, impulseClass, indexName
+from lib.File_utilities import read_dot
+
+def writeEng(path, dotFile):
+    # The motor of a .dot file in the RASP format
+    motor = read_dot(dotFile)
+    parameters = motor.parameters
+    with open(path, 'w') as file:
+        file.write("; converted from %s\n" % os.path.basename(dotFile))
+        file.write("M1450 %g %g P %g %g Cesaroni\n" % (parameters['diameter']*1e3, parameters['length']*1e3,
+                                                      parameters['propellant_mass'],
+                                                      parameters['propellant_mass'] + parameters['frame_mass']))
+        for t, thrust in motor.data:
+            file.write("   %g %g\n" % (t, thrust))
+        file.write(";\n")
+
+def test_impulseClass():
+    assert [impulseClass(I) for I in (1, 2.5, 2.6, 9955, 10240, 10241)] == ['A', 'A', 'B', 'M', 'M', 'N']
+
+def test_MotorLibrary():
+    with tempfile.TemporaryDirectory() as directory:
+        for file in os.listdir('Motors'):
+            shutil.copy(os.path.join('Motors', file), directory)
+        writeEng(os.path.join(directory, 'M1450.eng'), 'Motors/CesaroniM1450.dot')
+        library = MotorLibrary(directory)
+        assert len(library) == 5 and os.path.exists(os.path.join(directory, indexName))
+        found = library.find(impulseClass='M', diameter=98e-3, totalImpulse=(8000, 10000))
+        assert sorted(found) == ['CesaroniM1450', 'CesaroniM1800', 'M1450']
+        assert np.all(np.diff([library.getEntry(name)['totalImpulse'] for name in found]) >= 0)
+        assert library.find(burnTime=(10, None)) == ['CesaroniM795']
+        entry = library.getEntry('M1450')
+        assert np.isclose(entry['totalImpulse'], library.getEntry('CesaroniM1450')['totalImpulse'], rtol=0.01)
+        # The .eng motor is the .dot motor
+        motor, reference = library.getMotor('M1450'), library.getMotor('CesaroniM1450')
+        assert library['M1450'] is motor and isinstance(motor, Motor)
+        t = np.linspace(0, 8, 101)
+        assert np.allclose(motor.thrust(t), reference.thrust(t))
+        assert np.allclose(motor.getMass(t), reference.getMass(t), atol=0.05)
+        # The index is reused, modified files are indexed again
+        stamp = os.stat(os.path.join(directory, indexName)).st_mtime_ns
+        assert MotorLibrary(directory).getNames() == library.getNames()
+        assert os.stat(os.path.join(directory, indexName)).st_mtime_ns == stamp
+        os.remove(os.path.join(directory, 'CesaroniM795.dot'))
+        with open(os.path.join(directory, 'M1450.eng'), 'a') as file:
+            file.write("M2000 98 700 P 5 8 Cesaroni\n 0.5 2000\n 5 0\n")
+        library = MotorLibrary(directory)
+        assert 'CesaroniM795' not in library and library.getEntry('M2000')['impulseClass'] == 'L'
+        assert library.getMotor('M2000').getBurnTime() == 5
+
+def main():
+    test_impulseClass()
+    test_MotorLibrary()
+
+main()
@@ -0,0 +1,100 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import os
+import shutil
+import tempfile
+import numpy as np
+import Forces
+import Trajectory
+from Rocket2 import Rocket, aeroCacheDirectory
+from AeroTable import AeroTable
+
+rockets = {}
+
+def v13Rocket():
+    # The CFD rocket of V13 with smoothed aero tables (the raw samples have drag along the air velocity at a few
+    # points), built once for all tests and not cached on disk (see test_aeroTables for the cache)
+    if 'V13' not in rockets:
+        rockets['V13'] = Rocket.from_file_with_AoAspeed('V13_data.dot', 'V13_CFD.txt', 'V13/', fit='rbf')
+    return rockets['V13']
+
+def test_COP(rocket=None):
+    rocket = rocket or v13Rocket()
+    AoA, speed = np.deg2rad(np.linspace(0.5, 9.5, 7)), np.linspace(40, 150, 5)
+    COP = rocket.getCOPArray(AoA[:, np.newaxis], speed[np.newaxis, :])
+    assert COP.shape == (7, 5, 3)
+    assert np.allclose(COP[2, 3], rocket.getCOP(AoA[2], speed[3]))
+    # The COP lies on the rocket
+    assert np.all((COP[..., 0] >= -rocket.getLength()) & (COP[..., 0] <= 0))
+    # At altitude the table is read at the local Mach number, as the forces
+    position = np.array([0, 0, -10e3])
+    speedOfSound = Forces.getAtmosphere().getSpeedOfSound(np.array([0, 10e3]))
+    launchSite = rocket.getCOP(AoA[2], speed[3]*speedOfSound[0]/speedOfSound[1])
+    assert np.allclose(rocket.getCOP(AoA[2], speed[3], position), launchSite)
+    assert np.allclose(rocket.getCOPArray(AoA, np.full(7, speed[3]), np.tile(position, (7, 1)))[2], launchSite)
+
+def test_stabilityMargin(rocket=None):
+    rocket = rocket or v13Rocket()
+    AoA, speed, t = np.deg2rad(np.linspace(0, 10, 11)), np.linspace(34, 150, 6), np.linspace(0, 10, 9)
+    margin = rocket.getStabilityMargin(AoA[:, None, None], speed[None, :, None], t[None, None, :])
+    assert margin.shape == (11, 6, 9)
+    for i, j, k in ((0, 0, 0), (4, 2, 3), (10, 5, 8)):
+        expected = rocket.getMassProperties().getCOM(t[k])[0] - rocket.getCOP(AoA[i], speed[j])[0]
+        assert np.isclose(margin[i, j, k], expected)
+    margin = rocket.getStabilityMargin(AoA[4], speed[2], t[3], altitude=10e3)
+    assert np.isclose(margin, rocket.getMassProperties().getCOM(t[3])[0] -
+                      rocket.getCOP(AoA[4], speed[2], np.array([0, 0, -10e3]))[0])
+
+def test_trajectory(rocket=None):
+    rocket = rocket or v13Rocket()
+    # The CFD rocket flies with the COP of its table, with the same result for both backends
+    trajectory = Trajectory.calculateTrajectory(rocket, np.deg2rad(5), 5.2, 0.02, 10)
+    workspace = Trajectory.calculateTrajectory(rocket, np.deg2rad(5), 5.2, 0.02, 10, backend='workspace')
+    assert np.allclose(trajectory.getPosition(), workspace.getPosition())
+    speed = np.linalg.norm(trajectory.getAirVelocity(), axis=1)
+    margin = rocket.getStabilityMargin(trajectory.getAoA(), speed, trajectory.getTime(),
+                                       np.abs(trajectory.getPosition()[:, 2]))
+    assert np.allclose(trajectory.getStabilityMargin(), margin)
+    # drag opposes the air velocity
+    drag = np.einsum('nij,nj->ni', Trajectory.Kinematics.RquaternionArray(trajectory.getQuaternion()),
+                     trajectory.getDrag())
+    assert np.all(np.einsum('ij,ij->i', drag, trajectory.getAirVelocity())[1:] <= 0)
+
+def test_aeroTables():
+    # By default the CFD samples are interpolated (the splines of interp2d) and nothing is written to disk, fits
+    # and their cache are opt-in
+    with tempfile.TemporaryDirectory() as root:
+        directory = os.path.join(root, 'V13')
+        os.makedirs(directory)
+        os.makedirs(os.path.join(root, 'Motors'))
+        for file in ('V13_data.dot', 'V13_CFD.txt'):
+            shutil.copy(os.path.join('V13', file), directory)
+        shutil.copy('Motors/CesaroniM1450.dot', os.path.join(root, 'Motors'))
+        path = directory + '/'
+        rocket = Rocket.from_file_with_AoAspeed('V13_data.dot', 'V13_CFD.txt', path)
+        assert sorted(os.listdir(directory)) == ['V13_CFD.txt', 'V13_data.dot'] and rocket.getAeroFits() == {}
+        AoA, speed, aeroForces, moment = rocket.getAeroData()
+        drag = AeroTable.from_scattered(AoA, speed, aeroForces[0], np.linspace(AoA.min(), AoA.max(), 101),
+                                        np.linspace(speed.min(), speed.max(), 71), order=3, method='bicubic')
+        rng = np.random.default_rng(0)
+        x, y = rng.uniform(AoA.min(), AoA.max(), 50), rng.uniform(speed.min(), speed.max(), 50)
+        # At sea level (no density reduction), with the speed in m/s
+        seaLevel = np.zeros((50, 3))
+        speedOfSound = Forces.getAtmosphere().getSpeedOfSound(0)
+        assert np.allclose(rocket.getDragLift(np.deg2rad(x), seaLevel, y*speedOfSound)[0], drag(x, y))
+        fitted = Rocket.from_file_with_AoAspeed('V13_data.dot', 'V13_CFD.txt', path, fit='rbf',
+                                                cacheDirectory=aeroCacheDirectory(path + 'V13_CFD.txt'))
+        assert sorted(fitted.getAeroFits()) == ['drag', 'lift', 'moment']
+        assert len(os.listdir(aeroCacheDirectory(path + 'V13_CFD.txt'))) == 3
+
+def main():
+    test_aeroTables()
+    rocket = v13Rocket()
+    test_COP(rocket)
+    test_stabilityMargin(rocket)
+    test_trajectory(rocket)
+
+if __name__ == '__main__':
+    main()
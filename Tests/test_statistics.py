@@ -0,0 +1,66 @@
+import sys
+sys.path.append('../Trajectory/')
+import numpy as np
+import Statistics
+
+def test_RunningMoments():
+    rng = np.random.default_rng(0)
+    x = rng.multivariate_normal([1, -2, 3], [[2, 0.5, 0], [0.5, 1, 0.2], [0, 0.2, 3]], 1000)
+    moments = Statistics.RunningMoments(3)
+    for row in x:
+        moments.update(row)
+    assert moments.getCount() == 1000
+    assert np.allclose(moments.getMean(), np.mean(x, axis=0))
+    assert np.allclose(moments.getCovariance(), np.cov(x, rowvar=False))
+    assert np.array_equal(moments.getMin(), np.min(x, axis=0)) and np.array_equal(moments.getMax(), np.max(x, axis=0))
+
+def test_P2Quantile():
+    rng = np.random.default_rng(1)
+    x = rng.lognormal(0, 0.5, 20000)
+    for p in (0.05, 0.5, 0.95):
+        quantile = Statistics.P2Quantile(p)
+        for value in x:
+            quantile.update(value)
+        print(p, quantile.getQuantile(), np.percentile(x, 100*p))
+        assert abs(quantile.getQuantile() - np.percentile(x, 100*p)) < 0.02*np.percentile(x, 100*p)
+    # Exact for less than five values
+    quantile = Statistics.P2Quantile(0.5)
+    for value in (3, 1, 2):
+        quantile.update(value)
+    assert quantile.getQuantile() == 2
+
+def test_OutputStatistics():
+    rng = np.random.default_rng(2)
+    apogee = rng.normal(3000, 100, 500)
+    landing = rng.normal(0, 50, (500, 2))
+    statistics = Statistics.OutputStatistics(['apogee', 'landing'])
+    sampler = Statistics.TrajectorySampler([3])
+    for i in range(500):
+        outputs = {'apogee': apogee[i], 'landing': landing[i]}
+        statistics.update(i, {}, outputs, 'trajectory' if i in sampler.getIndices() else None)
+        sampler.update(i, {}, outputs, 'trajectory' if i in sampler.getIndices() else None)
+    result = statistics.getResult()
+    assert np.isclose(result['apogee']['mean'], np.mean(apogee)) and result['apogee']['max'] == np.max(apogee)
+    assert np.allclose(result['landing']['covariance'], np.cov(landing, rowvar=False))
+    assert abs(result['apogee']['quantiles'][0.5] - np.median(apogee)) < 10
+    assert sampler.getResult() == {3: 'trajectory'}
+
+def test_Reducer():
+    # A reducer must implement both methods of the interface
+    class Counter(Statistics.Reducer):
+        def update(self, index, sample, outputs, trajectory):
+            pass
+    try:
+        Counter()
+    except TypeError:
+        pass
+    else:
+        assert False, 'a reducer without getResult was instantiated'
+
+def main():
+    test_RunningMoments()
+    test_P2Quantile()
+    test_OutputStatistics()
+    test_Reducer()
+
+main()
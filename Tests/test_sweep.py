@@ -0,0 +1,66 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Trajectory/')
+import os
+import shutil
+import tempfile
+import numpy as np
+import Trajectory
+import Sweep
+from Rocket1 import RocketSimple
+from MotorLibrary import MotorLibrary
+
+def test_motorOverride():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/', motor='Motors/CesaroniM1520.dot')
+    assert rocket.getMotor().getName() == 'CesaroniM1520'
+    assert rocket.getMass(0) < RocketSimple.from_file('myRocket.dot', 'myRocket1/').getMass(0)
+
+def test_motorSweep():
+    airframe = Sweep.Airframe.simple('myRocket.dot', 'myRocket1/')
+    library = MotorLibrary('Motors')
+    motors = library.find(impulseClass='M', diameter=98e-3, burnTime=(None, 8))
+    table = Trajectory.motorSweep(airframe, motors, 0.025, 4/180*np.pi, 2*2.32, library=library, processes=2)
+    print(Sweep.formatTable(table))
+    assert sorted(table['motor']) == sorted(motors) and np.all(np.diff(table['apogee']) <= 0)
+    assert np.all(table['railExitVelocity'] > 10) and np.all(table['railExitStability'] > 0)
+    # The same flight as the rocket with the motor
+    rocket = airframe.build(library.getMotor('CesaroniM1450'))
+    trajectory = Trajectory.calculateTrajectory(rocket, 4/180*np.pi, 2*2.32, 0.025, stopCondition='apogee')
+    row = table[table['motor'] == 'CesaroniM1450'][0]
+    assert np.isclose(row['apogee'], Sweep.apogee(trajectory)) and np.isclose(row['maxMach'], Sweep.maxMach(trajectory))
+
+def test_gridSweep():
+    airframe = Sweep.Airframe.simple('myRocket.dot', 'myRocket1/')
+    with tempfile.TemporaryDirectory() as directory:
+        kwargs = dict(timeStep=0.025, stopCondition='apogee', processes=1, cacheDirectory=directory,
+                      outputs=Sweep.defaultOutputs)
+        grid = {'inclination': np.deg2rad([2, 6]), 'rampLength': [2, 5]}
+        sweep = Trajectory.gridSweep(airframe, grid, **kwargs)
+        assert sweep['outputs']['apogee'].shape == (2, 2) and not np.any(sweep['cached'])
+        assert sweep['outputs']['apogee'][0, 0] > sweep['outputs']['apogee'][1, 0]
+        # Extending the sweep only flies the new points
+        grid['inclination'] = np.deg2rad([2, 4, 6])
+        extended = Trajectory.gridSweep(airframe, grid, **kwargs)
+        assert np.array_equal(extended['cached'], [[True, True], [False, False], [True, True]])
+        assert np.array_equal(extended['outputs']['apogee'][[0, 2]], sweep['outputs']['apogee'])
+        trajectory = Trajectory.calculateTrajectory(airframe.build(), np.deg2rad(4), 5, 0.025, stopCondition='apogee')
+        assert np.isclose(extended['outputs']['apogee'][1, 1], Sweep.apogee(trajectory))
+        # Another motor or thrust scale is another point
+        other = Trajectory.gridSweep(airframe, {'thrustScale': [1, 0.9]}, inclination=np.deg2rad(2), rampLength=2,
+                                     **kwargs)
+        assert np.array_equal(other['cached'], [True, False]) and np.diff(other['outputs']['apogee'])[0] < 0
+        # The key depends on the content of the rocket files
+        shutil.copytree('myRocket1', os.path.join(directory, 'myRocket1'))
+        shutil.copytree('Motors', os.path.join(directory, 'Motors'))
+        copy = Sweep.Airframe.simple('myRocket.dot', os.path.join(directory, 'myRocket1/'))
+        assert copy.getDigest() == airframe.getDigest()
+        with open(os.path.join(directory, 'myRocket1', 'myFin.dot'), 'a') as file:
+            file.write("\n")
+        assert copy.getDigest() != airframe.getDigest()
+
+def main():
+    test_motorOverride()
+    test_motorSweep()
+    test_gridSweep()
+
+main()
@@ -0,0 +1,38 @@
+import sys
+sys.path.append('../Rocket/')
+import numpy as np
+from ThrustCurve import ThrustCurve
+
+def test_ThrustCurve():
+    motor = np.loadtxt('Motors/CesaroniM1450.dot', skiprows=6)
+    time, thrust = np.concatenate(([0], motor[:, 0])), np.concatenate(([0], motor[:, 1]))
+    curve = ThrustCurve(time, thrust)
+    # Forward marching (as in the integrators), random queries and the batched lookup agree with np.interp
+    rng = np.random.default_rng(0)
+    for t in (np.arange(-0.1, 7.5, 0.01), rng.uniform(-1, 8, 1000), time):
+        expected = np.interp(t, time, thrust, left=0, right=0)
+        values = [curve(value) for value in t]
+        assert all(isinstance(value, float) for value in values)
+        assert np.allclose(values, expected)
+        assert np.allclose(curve(t.reshape(-1, 1)).ravel(), expected)
+    assert curve(time[-1]) == thrust[-1] and curve(100) == 0 and curve(-1) == 0
+
+def test_impulse():
+    motor = np.loadtxt('Motors/CesaroniM795.dot', skiprows=7)
+    time, thrust = np.concatenate(([0], motor[:, 0])), np.concatenate(([0], motor[:, 1]))
+    curve = ThrustCurve(time, thrust)
+    # Exact at the points of the curve, the derivative of the impulse is the thrust
+    expected = [np.trapz(thrust[:k + 1], time[:k + 1]) for k in range(len(time))]
+    assert np.allclose([curve.impulse(t) for t in time], expected)
+    assert np.isclose(curve.getTotalImpulse(), np.trapz(thrust, time))
+    t = np.random.default_rng(1).uniform(0.01, time[-1] - 0.01, 500)
+    h = 1e-6
+    assert np.allclose((curve.impulse(t + h) - curve.impulse(t - h))/(2*h), curve(t), rtol=1e-4, atol=1e-3)
+    assert np.allclose([curve.impulse(value) for value in t], curve.impulse(t))
+    assert curve.impulse(-1) == 0 and curve.impulse(20) == curve.getTotalImpulse()
+
+def main():
+    test_ThrustCurve()
+    test_impulse()
+
+main()
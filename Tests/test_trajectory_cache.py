@@ -0,0 +1,66 @@
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Trajectory/')
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+import Trajectory
+import TrajectoryCache as trajectoryCache
+from TrajectoryCache import TrajectoryCache
+from Rocket1 import RocketSimple
+
+def test_cache():
+    rocket = RocketSimple.from_file('myRocket.dot', 'myRocket1/')
+    arguments = (rocket, 4/180*np.pi, 2*2.32, 0.025)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = TrajectoryCache(directory)
+        flown = Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', cache=cache)
+        assert len(cache) == 1
+        start = time.perf_counter()
+        loaded = Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', cache=cache)
+        print('Loaded in %.1f ms' % (1e3*(time.perf_counter() - start)))
+        assert np.array_equal(loaded.getData(), flown.getData()) and loaded.getEvents() == flown.getEvents()
+        assert np.allclose(loaded.getStabilityMargin(), flown.getStabilityMargin())
+        # Other parameters, dispersions or motors are other flights
+        Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', wind=np.array([5, 0, 0]), cache=cache)
+        rocket.setDragScale(1.1)
+        Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', cache=cache)
+        rocket.setDragScale(1)
+        rocket.getMotor().setThrustScale(1.05)
+        Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', cache=cache)
+        rocket.getMotor().setThrustScale(1)
+        entries = cache.inspect()
+        assert len(entries) == 4 and cache.getSize() == sum(entry['size'] for entry in entries)
+        # The least recently used entries are removed beyond the maximal size
+        Trajectory.calculateTrajectory(*arguments, stopCondition='apogee', cache=cache)
+        key = cache.key(*arguments, stopCondition='apogee')
+        assert cache.inspect()[0]['key'] == key
+        cache.evict(entries[0]['size'] + 1)
+        assert [entry['key'] for entry in cache.inspect()] == [key]
+        cache.clear()
+        assert len(cache) == 0 and cache.getSize() == 0
+
+def test_codeVersion():
+    # Every module of the simulation is part of the code version (also the file readers of lib)
+    root, digest = trajectoryCache.root, trajectoryCache.codeDigest
+    with tempfile.TemporaryDirectory() as directory:
+        for name in trajectoryCache.codeDirectories:
+            shutil.copytree(os.path.join(root, name), os.path.join(directory, name))
+        try:
+            trajectoryCache.root, trajectoryCache.codeDigest = directory, None
+            version = trajectoryCache.codeVersion()
+            assert trajectoryCache.codeVersion() == version
+            with open(os.path.join(directory, 'Rocket', 'lib', 'File_utilities.py'), 'a') as file:
+                file.write('\n')
+            trajectoryCache.codeDigest = None
+            assert trajectoryCache.codeVersion() != version
+        finally:
+            trajectoryCache.root, trajectoryCache.codeDigest = root, digest
+
+def main():
+    test_cache()
+    test_codeVersion()
+
+main()
@@ -25,8 +25,9 @@ def test_trajectory_module():
     timeStep = 0.002
     simulationTime= 30
     #AoA, thrust, gravity, drag, lift
-    (t, position, euler, linearVelocity, angularVelocity) = \
-    Trajectory.calculateTrajectory(rocket1, initialInclination, launchRampLength, timeStep, simulationTime)
+    trajectory = Trajectory.calculateTrajectory(rocket1, initialInclination, launchRampLength, timeStep, simulationTime)
+    t, position, euler = trajectory.getTime(), trajectory.getPosition(), trajectory.getEuler()
+    AoA, linearVelocity, angularVelocity = trajectory.getAoA(), trajectory.getVelocity(), trajectory.getAngularVelocity()
 
     plt.figure()
     ax1 = plt.subplot(311, xlabel='time [s]', ylabel='x [m]')
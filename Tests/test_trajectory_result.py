@@ -0,0 +1,41 @@
+import sys
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import numpy as np
+import Kinematics
+import Forces
+from TrajectoryResult import TrajectoryResult
+
+def test_TrajectoryResult():
+    n = 50
+    rng = np.random.default_rng(0)
+    t = np.linspace(0, 1, n)
+    x = rng.normal(size=(n, 13))
+    x[:, 3:7] /= np.linalg.norm(x[:, 3:7], axis=1)[:, np.newaxis]
+    AoA = rng.uniform(0, 0.1, n)
+    forces = rng.normal(size=(n, 3, 4))
+    wind = np.array([3.0, -1.0, 0])
+    result = TrajectoryResult(t, x, AoA, forces, {'apogee': [0.5]}, wind=wind)
+    # Columns are views of the structured array
+    assert np.shares_memory(result.getPosition(), result.getData())
+    assert np.array_equal(result['position'], x[:, 0:3]) and np.array_equal(result.getLift(), forces[:, :, 1])
+    # Legacy tuple
+    (t_, position, euler, AoA_, velocity, angularVelocity, drag, lift, gravity, thrust) = result
+    assert np.array_equal(t_, t) and np.array_equal(thrust, forces[:, :, 3]) and np.array_equal(result[3], AoA)
+    for i in range(n):
+        R = Kinematics.Rquaternion(x[i, 3:7])
+        assert np.allclose(euler[i], Kinematics.quaternion2euler(x[i, 3:7]))
+        assert np.allclose(velocity[i], R @ x[i, 7:10])
+    # Derived quantities are kept
+    assert result.getEuler() is euler
+    airSpeed = np.linalg.norm(velocity - wind, axis=1)
+    atmosphere = Forces.getAtmosphere()
+    assert np.allclose(result.getMach(), airSpeed/[atmosphere.getSpeedOfSound(abs(z)) for z in x[:, 2]])
+    density = np.array([atmosphere.getDensity(abs(z)) for z in x[:, 2]])
+    assert np.allclose(result.getDynamicPressure(), 1/2*density*airSpeed**2)
+    assert result.getEvents() == {'apogee': [0.5]}
+
+def main():
+    test_TrajectoryResult()
+
+main()
@@ -0,0 +1,44 @@
+import sys
+sys.path.append('../Forces/')
+import os
+import tempfile
+import numpy as np
+from Wind import WindField, drydenGusts, windField
+
+def test_profiles():
+    direction = np.deg2rad(30)
+    unit = np.array([np.cos(direction), np.sin(direction), 0])
+    powerLaw = WindField.powerLaw(6, direction, exponent=0.2)
+    assert np.allclose(powerLaw.getVelocity(10, 0), 6*unit)
+    assert np.allclose(powerLaw.getVelocity(1000, 5), 6*100**0.2*unit)
+    logLaw = WindField.logLaw(6, direction, roughness=0.1)
+    assert np.allclose(logLaw.getVelocity(100, 0), 6*np.log(1000)/np.log(100)*unit)
+    # Above the table the wind at the top is used
+    assert np.allclose(powerLaw.getVelocity(1e6, 0), powerLaw.getVelocity(40e3, 0))
+    assert np.allclose(windField(None).getVelocity(500, 3), 0)
+    assert np.allclose(windField([1, 2, 0]).getVelocity(500, 3), [1, 2, 0])
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'sounding.txt')
+        np.savetxt(file, [[1000, 10, 90], [0, 2, 0]], header='altitude speed direction')
+        sounding = WindField.from_sounding(file)
+    assert np.allclose(sounding.getVelocity(500, 0), [1, 5, 0])
+
+def test_gusts():
+    gusts = drydenGusts([2, 2, 1], 5000, 0.05, lengthScale=300, airspeed=100, seed=3)
+    assert gusts.shape == (100001, 3)
+    assert np.allclose(np.std(gusts, axis=0), [2, 2, 1], rtol=0.1)
+    # The same seed gives the same realization
+    assert np.array_equal(drydenGusts(1, 10, seed=4), drydenGusts(1, 10, seed=4))
+    assert not np.array_equal(drydenGusts(1, 10, seed=4), drydenGusts(1, 10, seed=5))
+    # Scalar and batched lookups agree
+    wind = WindField.powerLaw(5, 0)
+    wind.setGusts(gusts, 0.05)
+    z, t = np.linspace(0, 3000, 57), np.linspace(0, 100, 57)
+    assert np.allclose(wind.getVelocity(z, t), [wind.getVelocity(a, b) for a, b in zip(z, t)])
+    assert np.allclose(wind.getVelocity(0, 0.05), [0, 0, 0] + gusts[1])
+
+def main():
+    test_profiles()
+    test_gusts()
+
+main()
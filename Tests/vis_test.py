@@ -24,8 +24,9 @@ def run(int_inclination, ramp_length, time_step, sim_time):
     sim_time = 15
 
 
-    (t, position, euler, linearVelocity, angularVelocity, AoA, thrust, gravity, drag, lift) \
-    = Trajectory.calculateTrajectory(rocket1, int_inclination, ramp_length, time_step, sim_time)
+    trajectory = Trajectory.calculateTrajectory(rocket1, int_inclination, ramp_length, time_step, sim_time)
+    position, euler, AoA = trajectory.getPosition(), trajectory.getEuler(), trajectory.getAoA()
+    thrust, gravity, drag, lift = trajectory.getThrust(), trajectory.getGravity(), trajectory.getDrag(), trajectory.getLift()
 
     sample_rate = 1 / time_step
 
@@ -0,0 +1,393 @@
+"""
+JIT compiled right hand side and RK4 loop of the 6-DOF equations of motion (backend 'jit' of Trajectory)
+
+The rocket, motor and aero data are passed to the kernel as flat arrays (see flattenRocket).
+The kernel is compiled with numba if it is installed, Trajectory falls back to the reference
+backend otherwise.
+
+--Propulse NTNU--
+"""
+import sys
+sys.path.append('../Forces/')
+import math
+import numpy as np
+import Wind
+from Atmosphere import DENSITY, SPEED_OF_SOUND, KINEMATIC_VISCOSITY
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def jit(function):
+    if numba is None:
+        return function
+    return numba.njit(cache=True)(function)
+
+
+def isAvailable():
+    return numba is not None
+
+
+def checkRocket(rocket):
+    """
+    Raise a ValueError if the rocket can not be flattened for the kernel (see flattenRocket), with or without numba.
+    """
+    if not (hasattr(rocket, 'getAeroCoefficients') and hasattr(rocket, 'getDragTable')):
+        raise ValueError("The jit backend needs a rocket with the Barrowman aero model (RocketSimple).")
+
+
+# Indices of the constants array
+RAMP_END = 0
+DIRECTION = 1  # 3 components
+BURN_TIME = 4
+MASS_DT = 5
+AERO_DAOA = 6
+DRAG_K = 7
+LIFT_K = 8
+ATMOSPHERE_DZ = 9
+GRAVITY = 10
+EPSILON = 11
+DESCENT_ALTITUDE = 12
+WIND_DZ = 13
+GUST_DT = 14
+DRAG_DMACH = 15
+DRAG_LOGRE0 = 16
+DRAG_DLOGRE = 17
+REYNOLDS_K = 18
+N_CONSTANTS = 19
+
+# Events in the order of Trajectory.flightEvents
+EVENT_NAMES = ('launchRampExit', 'burnout', 'apogee', 'groundImpact', 'descent')
+
+
+def flattenRocket(rocket, launchRampLength, initialDirection, g, atmosphere, epsilon, wind=None):
+    """
+    Tabulate a rocket as flat arrays for the kernel. Only rockets with the Barrowman model
+    (Forces.SAMdrag and Forces.SAMlift with getDragTable and the tables of getAeroCoefficients) can be flattened.
+
+    :param atmosphere: [Atmosphere] the air (see Forces.getAtmosphere)
+    :param wind: None, a constant wind velocity [np.array, m/s] or a Wind.WindField
+    :return: (constants, thrustTime, thrustValue, massTable, COMTable, inertiaTable, CnTable, COPTable, CdTable,
+              atmosphereTable, windTable, gustTable)
+    """
+    checkRocket(rocket)
+    motor = rocket.getMotor()
+    massDt, massTable, COMTable, inertiaTable = rocket.getMassProperties().getTables()
+    # Cn and COP on a uniform AoA grid (the same tables as the other backends)
+    aeroCoefficients = rocket.getAeroCoefficients()
+    dAoA, CnTable, COPTable = aeroCoefficients.getTables()
+    Aref = aeroCoefficients.getAref()
+    # Cd over Mach number and log10 of the Reynold's number (starting at Mach 0)
+    dragTable = rocket.getDragTable()
+    machAxis, logReynoldsAxis = dragTable.getAxes()
+    # density, speed of sound and kinematic viscosity over altitude
+    atmosphereDz, atmosphereTable = atmosphere.getTables()
+    # mean wind over altitude and gusts over time
+    windDz, windTable, gustDt, gustTable = Wind.windField(wind).getTables()
+    constants = np.zeros(N_CONSTANTS)
+    constants[RAMP_END] = launchRampLength + rocket.getLength()
+    constants[DIRECTION:DIRECTION + 3] = initialDirection
+    constants[BURN_TIME] = motor.getBurnTime()
+    constants[MASS_DT] = massDt
+    constants[AERO_DAOA] = dAoA
+    constants[DRAG_K] = 1/2*Aref*rocket.getDragScale()
+    constants[LIFT_K] = 1/2*Aref
+    constants[ATMOSPHERE_DZ] = atmosphereDz
+    constants[GRAVITY] = g
+    constants[EPSILON] = epsilon
+    constants[WIND_DZ] = windDz
+    constants[GUST_DT] = gustDt
+    constants[DRAG_DMACH] = machAxis[1] - machAxis[0]
+    constants[DRAG_LOGRE0] = logReynoldsAxis[0]
+    constants[DRAG_DLOGRE] = logReynoldsAxis[1] - logReynoldsAxis[0]
+    constants[REYNOLDS_K] = rocket.getLength()
+    thrustTime, thrustValue = motor.getThrustCurve()
+    return (constants, np.array(thrustTime, dtype=float), np.array(thrustValue, dtype=float), massTable,
+            COMTable, inertiaTable, CnTable, COPTable, np.array(dragTable.getValues()),
+            np.ascontiguousarray(atmosphereTable[:, [DENSITY, SPEED_OF_SOUND, KINEMATIC_VISCOSITY]]),
+            np.ascontiguousarray(windTable), np.ascontiguousarray(gustTable))
+
+
+@jit
+def interpolateUniform(table, dx, x):
+    # Linear interpolation in a table with uniform spacing dx starting at 0 (clamped at the ends)
+    s = x/dx
+    if s <= 0:
+        return table[0]
+    i = int(s)
+    if i >= len(table) - 1:
+        return table[len(table) - 1]
+    return table[i] + (s - i)*(table[i + 1] - table[i])
+
+
+@jit
+def interpolateColumn(table, dx, x, column):
+    # Linear interpolation in a column of a table with uniform row spacing dx starting at 0 (clamped at the ends)
+    s = min(max(x/dx, 0.0), table.shape[0] - 1.0)
+    i = min(int(s), table.shape[0] - 2)
+    return table[i, column] + (s - i)*(table[i + 1, column] - table[i, column])
+
+
+@jit
+def interpolateBilinear(table, dx, y0, dy, x, y):
+    # Bilinear interpolation in a table with uniform spacing dx (starting at 0) and dy (starting at y0), clamped
+    s = min(max(x/dx, 0.0), table.shape[0] - 1.0)
+    r = min(max((y - y0)/dy, 0.0), table.shape[1] - 1.0)
+    i = min(int(s), table.shape[0] - 2)
+    j = min(int(r), table.shape[1] - 2)
+    t, u = s - i, r - j
+    return ((1 - t)*((1 - u)*table[i, j] + u*table[i, j + 1]) +
+            t*((1 - u)*table[i + 1, j] + u*table[i + 1, j + 1]))
+
+
+@jit
+def equationsMotionJit(x, t, out, forces, constants, thrustTime, thrustValue, massTable, COMTable, inertiaTable,
+                       CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable):
+    """
+    The equations of motion of Trajectory.equationsMotionInPlace on flat arrays.
+    Writes dx into out and the forces (drag, lift, gravity, thrust as columns) into forces.
+
+    :return: AoA
+    """
+    px, py, pz = x[0], x[1], x[2]
+    vx, vy, vz = x[7], x[8], x[9]
+    wx, wy, wz = x[10], x[11], x[12]
+    stillAtLaunchRamp = (px*constants[DIRECTION] + py*constants[DIRECTION + 1] + pz*constants[DIRECTION + 2]
+                         <= constants[RAMP_END])
+    norm = math.sqrt(x[3]*x[3] + x[4]*x[4] + x[5]*x[5] + x[6]*x[6])
+    q0, q1, q2, q3 = x[3]/norm, x[4]/norm, x[5]/norm, x[6]/norm
+    R00, R01, R02 = 1 - 2*(q2*q2 + q3*q3), 2*(q1*q2 - q0*q3), 2*(q1*q3 + q0*q2)
+    R10, R11, R12 = 2*(q1*q2 + q0*q3), 1 - 2*(q1*q1 + q3*q3), 2*(q2*q3 - q0*q1)
+    R20, R21, R22 = 2*(q1*q3 - q0*q2), 2*(q2*q3 + q0*q1), 1 - 2*(q1*q1 + q2*q2)
+    dpx = R00*vx + R01*vy + R02*vz
+    dpy = R10*vx + R11*vy + R12*vz
+    dpz = R20*vx + R21*vy + R22*vz
+    out[0], out[1], out[2] = dpx, dpy, dpz
+    out[3] = 0.5*(-q1*wx - q2*wy - q3*wz)
+    out[4] = 0.5*(q0*wx - q3*wy + q2*wz)
+    out[5] = 0.5*(q3*wx + q0*wy - q1*wz)
+    out[6] = 0.5*(-q2*wx + q1*wy + q0*wz)
+    # mass properties (last row of the tables is the value after burnout)
+    n = len(massTable) - 1
+    if t >= constants[BURN_TIME]:
+        i, f = n, 0.0
+    elif t <= 0:
+        i, f = 0, 0.0
+    else:
+        s = t/constants[MASS_DT]
+        i = int(s)
+        f = s - i
+    j = min(i + 1, n)
+    m = massTable[i] + f*(massTable[j] - massTable[i])
+    rx = COMTable[i, 0] + f*(COMTable[j, 0] - COMTable[i, 0])
+    ry = COMTable[i, 1] + f*(COMTable[j, 1] - COMTable[i, 1])
+    rz = COMTable[i, 2] + f*(COMTable[j, 2] - COMTable[i, 2])
+    I = inertiaTable[i] + f*(inertiaTable[j] - inertiaTable[i])
+    # forces in the body frame
+    thrust = np.interp(t, thrustTime, thrustValue) if t <= constants[BURN_TIME] else 0.0
+    gravity = m*constants[GRAVITY]
+    gbx, gby, gbz = R20*gravity, R21*gravity, R22*gravity
+    # aerodynamic forces (Barrowman model, see Forces.SAMdrag and Forces.SAMlift)
+    # wind at the altitude and time (see Wind.WindField.getVelocity)
+    avx = dpx - (interpolateColumn(windTable, constants[WIND_DZ], abs(pz), 0) +
+                 interpolateColumn(gustTable, constants[GUST_DT], t, 0))
+    avy = dpy - (interpolateColumn(windTable, constants[WIND_DZ], abs(pz), 1) +
+                 interpolateColumn(gustTable, constants[GUST_DT], t, 1))
+    avz = dpz - (interpolateColumn(windTable, constants[WIND_DZ], abs(pz), 2) +
+                 interpolateColumn(gustTable, constants[GUST_DT], t, 2))
+    speed = math.sqrt(avx*avx + avy*avy + avz*avz)
+    airSpeed = speed + constants[EPSILON]
+    ux, uy, uz = avx/airSpeed, avy/airSpeed, avz/airSpeed
+    AoA = math.acos(min(1.0, max(-1.0, ux*R00 + uy*R10 + uz*R20)))
+    ddy = -(R01*ux + R11*uy + R21*uz)
+    ddz = -(R02*ux + R12*uy + R22*uz)
+    projected = math.sqrt(ddy*ddy + ddz*ddz) + constants[EPSILON]
+    sinAoA, cosAoA = math.sin(AoA), math.cos(AoA)
+    dlx, dly, dlz = sinAoA, cosAoA*ddy/projected, cosAoA*ddz/projected
+    # air at the altitude (see Atmosphere.evaluate)
+    density = interpolateColumn(atmosphereTable, constants[ATMOSPHERE_DZ], abs(pz), 0)
+    speedOfSound = interpolateColumn(atmosphereTable, constants[ATMOSPHERE_DZ], abs(pz), 1)
+    viscosity = interpolateColumn(atmosphereTable, constants[ATMOSPHERE_DZ], abs(pz), 2)
+    logReynolds = math.log10(max(speed*constants[REYNOLDS_K]/viscosity, 1.0))
+    Cd = interpolateBilinear(CdTable, constants[DRAG_DMACH], constants[DRAG_LOGRE0], constants[DRAG_DLOGRE],
+                             speed/speedOfSound, logReynolds)
+    k = constants[DRAG_K]*Cd*density*speed
+    dwx, dwy, dwz = -k*avx, -k*avy, -k*avz
+    liftMagnitude = constants[LIFT_K]*interpolateUniform(CnTable, constants[AERO_DAOA], AoA)*density*speed**2
+    dbx = R00*dwx + R10*dwy + R20*dwz
+    dby = R01*dwx + R11*dwy + R21*dwz
+    dbz = R02*dwx + R12*dwy + R22*dwz
+    lbx, lby, lbz = liftMagnitude*dlx, liftMagnitude*dly, liftMagnitude*dlz
+    forces[0, 0], forces[1, 0], forces[2, 0] = dbx, dby, dbz
+    forces[0, 1], forces[1, 1], forces[2, 1] = lbx, lby, lbz
+    forces[0, 2], forces[1, 2], forces[2, 2] = 0.0, 0.0, gravity
+    forces[0, 3], forces[1, 3], forces[2, 3] = thrust, 0.0, 0.0
+    # total force and moment about COM
+    Fx = thrust + gbx + dbx + lbx
+    if stillAtLaunchRamp:
+        Fy, Fz = 0.0, 0.0
+        Mx, My, Mz = 0.0, 0.0, 0.0
+    else:
+        Fy = gby + dby + lby
+        Fz = gbz + dbz + lbz
+        ax = interpolateUniform(COPTable, constants[AERO_DAOA], AoA) - rx
+        ay, az = -ry, -rz
+        fx, fy, fz = dbx + lbx, dby + lby, dbz + lbz
+        Mx, My, Mz = ay*fz - az*fy, az*fx - ax*fz, ax*fy - ay*fx
+    # Closed form solution of the IBody system (see Trajectory.equationsMotionInPlace)
+    hx = I[0, 0]*wx + I[0, 1]*wy + I[0, 2]*wz
+    hy = I[1, 0]*wx + I[1, 1]*wy + I[1, 2]*wz
+    hz = I[2, 0]*wx + I[2, 1]*wy + I[2, 2]*wz
+    bx, by, bz = Mx + hy*wz - hz*wy, My + hz*wx - hx*wz, Mz + hx*wy - hy*wx
+    C00, C01, C02 = I[1, 1]*I[2, 2] - I[1, 2]*I[2, 1], I[0, 2]*I[2, 1] - I[0, 1]*I[2, 2], I[0, 1]*I[1, 2] - I[0, 2]*I[1, 1]
+    C10, C11, C12 = I[1, 2]*I[2, 0] - I[1, 0]*I[2, 2], I[0, 0]*I[2, 2] - I[0, 2]*I[2, 0], I[0, 2]*I[1, 0] - I[0, 0]*I[1, 2]
+    C20, C21, C22 = I[1, 0]*I[2, 1] - I[1, 1]*I[2, 0], I[0, 1]*I[2, 0] - I[0, 0]*I[2, 1], I[0, 0]*I[1, 1] - I[0, 1]*I[1, 0]
+    det = I[0, 0]*C00 + I[0, 1]*C10 + I[0, 2]*C20
+    awx = (C00*bx + C01*by + C02*bz)/det
+    awy = (C10*bx + C11*by + C12*bz)/det
+    awz = (C20*bx + C21*by + C22*bz)/det
+    sx, sy, sz = vx + ry*wz - rz*wy, vy + rz*wx - rx*wz, vz + rx*wy - ry*wx
+    out[7] = Fx/m - (wy*sz - wz*sy) - (ry*awz - rz*awy)
+    out[8] = Fy/m - (wz*sx - wx*sz) - (rz*awx - rx*awz)
+    out[9] = Fz/m - (wx*sy - wy*sx) - (rx*awy - ry*awx)
+    out[10], out[11], out[12] = awx, awy, awz
+    return AoA
+
+
+@jit
+def eventValues(t, x, constants, g):
+    # Values of the event functions of Trajectory.flightEvents, written into g
+    norm = math.sqrt(x[3]*x[3] + x[4]*x[4] + x[5]*x[5] + x[6]*x[6])
+    q0, q1, q2, q3 = x[3]/norm, x[4]/norm, x[5]/norm, x[6]/norm
+    g[0] = x[0]*constants[DIRECTION] + x[1]*constants[DIRECTION + 1] + x[2]*constants[DIRECTION + 2] \
+        - constants[RAMP_END]
+    g[1] = t - constants[BURN_TIME]
+    g[2] = 2*(q1*q3 - q0*q2)*x[7] + 2*(q2*q3 + q0*q1)*x[8] + (1 - 2*(q1*q1 + q2*q2))*x[9]
+    g[3] = x[2]
+    g[4] = x[2] + constants[DESCENT_ALTITUDE]
+
+
+@jit
+def RK4StepJit(w, t, h, s1, s2, s3, s4, wStage, out, stageForces, constants, thrustTime, thrustValue, massTable,
+               COMTable, inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable):
+    # RK4 step of length h from w into out, with s1 already evaluated (see Trajectory.RK4)
+    wStage[:] = w + h/2*s1
+    equationsMotionJit(wStage, t + h/2, s2, stageForces, constants, thrustTime, thrustValue, massTable, COMTable,
+                       inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable)
+    wStage[:] = w + h/2*s2
+    equationsMotionJit(wStage, t + h/2, s3, stageForces, constants, thrustTime, thrustValue, massTable, COMTable,
+                       inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable)
+    wStage[:] = w + h*s3
+    equationsMotionJit(wStage, t + h, s4, stageForces, constants, thrustTime, thrustValue, massTable, COMTable,
+                       inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable)
+    out[:] = w + h/6*(s1 + 2*s2 + 2*s3 + s4)
+
+
+@jit
+def RK4Chunk(w, tmin, dt, firstStep, lastStep, gOld, active, terminal, constants, thrustTime, thrustValue,
+             massTable, COMTable, inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable,
+             outT, outX, outAoA, outForces, eventIndex, eventTime):
+    """
+    Steps firstStep, ..., lastStep - 1 of Trajectory.RK4 (state w and event values gOld are updated in place).
+    The rows are written to the out arrays and the located events to eventIndex/eventTime.
+
+    :return: number of rows written, number of events located and whether a terminal event was reached
+    """
+    n = len(w)
+    s1, s2, s3, s4 = np.empty(n), np.empty(n), np.empty(n), np.empty(n)
+    wStage, wNew = np.empty(n), np.empty(n)
+    forces, stageForces = np.zeros((3, 4)), np.zeros((3, 4))
+    gNew = np.empty(len(gOld))
+    events = 0
+    for i in range(firstStep, lastStep):
+        row = i - firstStep
+        t = tmin + i*dt
+        AoA = equationsMotionJit(w, t, s1, forces, constants, thrustTime, thrustValue, massTable, COMTable,
+                                 inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable)
+        RK4StepJit(w, t, dt, s1, s2, s3, s4, wStage, wNew, stageForces, constants, thrustTime, thrustValue,
+                   massTable, COMTable, inertiaTable, CnTable, COPTable, CdTable, atmosphereTable, windTable, gustTable)
+        eventValues(t, wNew, constants, gNew)
+        stopTime = np.inf
+        for j in range(len(gOld)):
+            if active[j] and gOld[j] < 0 and gNew[j] >= 0:
+                eventTimeJ = t - dt*gNew[j]/(gNew[j] - gOld[j])
+                if events < len(eventIndex):
+                    eventIndex[events] = j
+                    eventTime[events] = eventTimeJ
+                    events += 1
+                if terminal[j] and eventTimeJ < stopTime:
+                    stopTime = eventTimeJ
+        outAoA[row] = AoA
+        outForces[row] = forces
+        if stopTime < np.inf:
+            # Last step ends at the terminal event
+            RK4StepJit(w, t, stopTime - (t - dt), s1, s2, s3, s4, wStage, wNew, stageForces, constants,
+                       thrustTime, thrustValue, massTable, COMTable, inertiaTable, CnTable, COPTable, CdTable,
+                       atmosphereTable, windTable, gustTable)
+            outT[row] = stopTime
+            outX[row] = wNew
+            w[:] = wNew
+            return row + 1, events, True
+        outT[row] = t
+        outX[row] = wNew
+        w[:] = wNew
+        gOld[:] = gNew
+    return lastStep - firstStep, events, False
+
+
+def integrateRK4(rocket, x0, launchRampLength, initialDirection, timeStep, simulationTime, stopCondition,
+                 g, atmosphere, epsilon, wind=None, chunkSize=4096):
+    """
+    Trajectory.RK4 of Trajectory.equationsMotion with the compiled kernel.
+
+    :return: times, states, AoA and forces (np.arrays) and a dict with event times, like Trajectory.RK4
+    """
+    tables = flattenRocket(rocket, launchRampLength, initialDirection, g, atmosphere, epsilon, wind)
+    constants = tables[0]
+    active = np.array([True, True, True, True, False])
+    terminal = np.array([False, False, stopCondition == 'apogee', stopCondition == 'groundImpact', False])
+    if stopCondition is not None and not isinstance(stopCondition, str):
+        constants[DESCENT_ALTITUDE] = float(stopCondition)
+        active[4] = terminal[4] = True
+    steps = math.ceil((simulationTime + timeStep)/timeStep) if np.isfinite(simulationTime) else np.iinfo(np.int64).max
+    w = np.array(x0, dtype=float)
+    gOld = np.zeros(len(EVENT_NAMES))
+    eventValues(0.0, w, constants, gOld)
+    t, x, AoA, forces = [np.zeros(1)], [w.copy()[np.newaxis]], [np.zeros(1)], [np.zeros((1, 3, 4))]
+    eventTimes = {name: [] for name, isActive in zip(EVENT_NAMES, active) if isActive}
+    eventIndex = np.zeros(64, dtype=np.int64)
+    eventTime = np.zeros(64)
+    firstStep = 1
+    while firstStep < steps:
+        lastStep = min(steps, firstStep + chunkSize)
+        outT, outX = np.zeros(lastStep - firstStep), np.zeros((lastStep - firstStep, len(w)))
+        outAoA, outForces = np.zeros(lastStep - firstStep), np.zeros((lastStep - firstStep, 3, 4))
+        rows, events, stopped = RK4Chunk(w, 0.0, timeStep, firstStep, lastStep, gOld, active, terminal, *tables,
+                                         outT, outX, outAoA, outForces, eventIndex, eventTime)
+        t.append(outT[:rows])
+        x.append(outX[:rows])
+        AoA.append(outAoA[:rows])
+        forces.append(outForces[:rows])
+        for k in range(events):
+            eventTimes[EVENT_NAMES[eventIndex[k]]].append(eventTime[k])
+        if stopped:
+            break
+        firstStep = lastStep
+    t = np.concatenate(t)
+    for name in eventTimes:
+        eventTimes[name] = [time for time in eventTimes[name] if time <= t[-1]]
+    return t, np.concatenate(x), np.concatenate(AoA), np.concatenate(forces), eventTimes
+
+
+def equationsMotionFunction(rocket, launchRampLength, initialDirection, g, atmosphere, epsilon, wind=None):
+    """
+    :return: RHS(x, t) with the compiled kernel, returning (dx, AoA, forces) like Trajectory.equationsMotion
+    """
+    tables = flattenRocket(rocket, launchRampLength, initialDirection, g, atmosphere, epsilon, wind)
+    def RHS(x, t):
+        dx = np.zeros(len(x))
+        forces = np.zeros((3, 4))
+        AoA = equationsMotionJit(x, t, dx, forces, *tables)
+        return dx, AoA, forces
+    return RHS
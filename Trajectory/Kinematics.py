@@ -80,3 +80,98 @@ def TransformationMatrix(positionVector):
     H = np.eye(6)
     H[0:3,3:6] = S
     return H
+
+# Array versions (one row per state, used by the ensemble integrator and the post processing).
+# The functions broadcast over leading axes, e.g. quaternions of shape (N, 4) or (flights, steps, 4).
+def CrossProductMatrixArray(v):
+    """
+    :param v: [np.array, Nx3] vectors
+    :return: [np.array, Nx3x3] cross product matrix of each vector
+    """
+    S = np.zeros(v.shape[:-1] + (3, 3))
+    S[..., 0, 1] = -v[..., 2]
+    S[..., 0, 2] = v[..., 1]
+    S[..., 1, 0] = v[..., 2]
+    S[..., 1, 2] = -v[..., 0]
+    S[..., 2, 0] = -v[..., 1]
+    S[..., 2, 1] = v[..., 0]
+    return S
+
+def RyzxArray(euler):
+    """
+    :param euler: [np.array, Nx3] pitch, yaw and roll [rad]
+    :return: [np.array, Nx3x3] rotation matrix Ry(pitch) Rz(yaw) Rx(roll) of each angle set
+    """
+    cp, cy, cr = np.cos(euler[..., 0]), np.cos(euler[..., 1]), np.cos(euler[..., 2])
+    sp, sy, sr = np.sin(euler[..., 0]), np.sin(euler[..., 1]), np.sin(euler[..., 2])
+    R = np.empty(euler.shape[:-1] + (3, 3))
+    R[..., 0, 0], R[..., 0, 1], R[..., 0, 2] = cp*cy, sp*sr - cp*sy*cr, sp*cr + cp*sy*sr
+    R[..., 1, 0], R[..., 1, 1], R[..., 1, 2] = sy, cy*cr, -cy*sr
+    R[..., 2, 0], R[..., 2, 1], R[..., 2, 2] = -sp*cy, cp*sr + sp*sy*cr, cp*cr - sp*sy*sr
+    return R
+
+def RquaternionArray(q):
+    """
+    :param q: [np.array, Nx4] quaternions
+    :return: [np.array, Nx3x3] rotation matrix (body to world) of each quaternion
+    """
+    q = q/np.linalg.norm(q, axis=-1)[..., np.newaxis]
+    q0, q1, q2, q3 = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    R = np.empty(q.shape[:-1] + (3, 3))
+    R[..., 0, 0], R[..., 0, 1], R[..., 0, 2] = 1 - 2*(q2*q2 + q3*q3), 2*(q1*q2 - q0*q3), 2*(q1*q3 + q0*q2)
+    R[..., 1, 0], R[..., 1, 1], R[..., 1, 2] = 2*(q1*q2 + q0*q3), 1 - 2*(q1*q1 + q3*q3), 2*(q2*q3 - q0*q1)
+    R[..., 2, 0], R[..., 2, 1], R[..., 2, 2] = 2*(q1*q3 - q0*q2), 2*(q2*q3 + q0*q1), 1 - 2*(q1*q1 + q2*q2)
+    return R
+
+def rotation2quaternionArray(R):
+    """
+    Same algorithm as rotation2quaternion: the component with the largest magnitude is found from the
+    diagonal and trace, and the others are calculated from it.
+
+    :param R: [np.array, Nx3x3] rotation matrices
+    :return: [np.array, Nx4] unit quaternion of each rotation matrix
+    """
+    trace = R[..., 0, 0] + R[..., 1, 1] + R[..., 2, 2]
+    temp = np.stack((R[..., 0, 0], R[..., 1, 1], R[..., 2, 2], trace), axis=-1)
+    index = np.argmax(temp, axis=-1)
+    p_i = np.sqrt(1 + 2*np.take_along_axis(temp, index[..., np.newaxis], axis=-1)[..., 0] - trace)
+    s10, s02, s21 = R[..., 1, 0] + R[..., 0, 1], R[..., 0, 2] + R[..., 2, 0], R[..., 2, 1] + R[..., 1, 2]
+    d21, d02, d10 = R[..., 2, 1] - R[..., 1, 2], R[..., 0, 2] - R[..., 2, 0], R[..., 1, 0] - R[..., 0, 1]
+    # p1, p2, p3 and p4 (scalar part) for each choice of index
+    candidates = np.stack((np.stack((p_i, s10/p_i, s02/p_i, d21/p_i), axis=-1),
+                           np.stack((s10/p_i, p_i, s21/p_i, d02/p_i), axis=-1),
+                           np.stack((s02/p_i, s21/p_i, p_i, d10/p_i), axis=-1),
+                           np.stack((d21/p_i, d02/p_i, d10/p_i, p_i), axis=-1)), axis=-2)
+    p = np.take_along_axis(candidates, index[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+    q = 0.5*p[..., [3, 0, 1, 2]]
+    return q/np.linalg.norm(q, axis=-1)[..., np.newaxis]
+
+def euler2quaternionArray(euler):
+    return rotation2quaternionArray(RyzxArray(euler))
+
+def rotation2eulerArray(R):
+    """
+    :param R: [np.array, Nx3x3] rotation matrices
+    :return: [np.array, Nx3] pitch, yaw and roll of each rotation matrix
+    """
+    pitch = np.arctan2(-R[..., 2, 0], R[..., 0, 0])
+    yaw = np.arcsin(np.clip(R[..., 1, 0], -1, 1))
+    roll = np.arctan2(-R[..., 1, 2], R[..., 1, 1])
+    return np.stack((pitch, yaw, roll), axis=-1)
+
+def quaternion2eulerArray(q):
+    return rotation2eulerArray(RquaternionArray(q))
+
+def quaternionGradientArray(q):
+    """
+    :param q: [np.array, Nx4] quaternions
+    :return: [np.array, Nx4x3] quaternion gradient of each quaternion
+    """
+    q = q/np.linalg.norm(q, axis=-1)[..., np.newaxis]
+    q0, q1, q2, q3 = q[..., 0], q[..., 1], q[..., 2], q[..., 3]
+    T = np.empty(q.shape[:-1] + (4, 3))
+    T[..., 0, 0], T[..., 0, 1], T[..., 0, 2] = -q1, -q2, -q3
+    T[..., 1, 0], T[..., 1, 1], T[..., 1, 2] = q0, -q3, q2
+    T[..., 2, 0], T[..., 2, 1], T[..., 2, 2] = q3, q0, -q1
+    T[..., 3, 0], T[..., 3, 1], T[..., 3, 2] = -q2, q1, q0
+    return 0.5*T
@@ -0,0 +1,197 @@
+"""
+Monte Carlo dispersion analysis of a rocket flight
+
+The launch and rocket parameters are sampled from declared distributions and the flights are
+simulated with Trajectory.calculateTrajectory in a pool of processes. The outputs of each flight
+(apogee, maximal velocity, landing point, ...) are reduced to streaming statistics as the flights
+finish (see Statistics), with the dispersion ellipse of the landing points.
+
+--Propulse NTNU--
+"""
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import copy
+import multiprocessing
+import numpy as np
+import Trajectory
+import Statistics
+import Wind
+
+# Distributions
+class Constant:
+    def __init__(self, value):
+        self.__value = value
+
+    def sample(self, rng, n):
+        return np.full(n, self.__value, dtype=float)
+
+class Normal:
+    def __init__(self, mean, std):
+        self.__mean = mean
+        self.__std = std
+
+    def sample(self, rng, n):
+        return rng.normal(self.__mean, self.__std, n)
+
+class Uniform:
+    def __init__(self, low, high):
+        self.__low = low
+        self.__high = high
+
+    def sample(self, rng, n):
+        return rng.uniform(self.__low, self.__high, n)
+
+# Dispersed parameters and their default values
+parameterNames = ('inclination', 'rampLength', 'thrustScale', 'dragScale', 'massOffset', 'COMOffset', 'windSpeed',
+                  'windDirection', 'windExponent', 'gustIntensity')
+defaultParameters = {'thrustScale': 1, 'dragScale': 1, 'massOffset': 0, 'COMOffset': 0, 'windSpeed': 0,
+                     'windDirection': 0, 'windExponent': 0, 'gustIntensity': 0}
+gustDuration = 600  # Length of the gust series of a flight [s]
+gustStep = 0.05  # Time step of the gust series [s]
+
+def montecarlo(rocket, samples, timeStep, inclination, rampLength, method='RK4', backend='reference', processes=None,
+               seed=None, probability=0.95, outputs=None, quantiles=(0.05, 0.5, 0.95), keepTrajectories=(),
+               reducers=(), **parameters):
+    """
+    :param rocket: [rocket class] the nominal rocket (not modified, every flight uses a copy)
+    :param samples: [int] number of flights
+    :param timeStep: [float] time step of the integration [s]
+    :param inclination: launch inclination [rad], a distribution or a number
+    :param rampLength: length of the launch ramp [m], a distribution or a number
+    :param parameters: distributions (or numbers) of thrustScale, dragScale, massOffset [kg], COMOffset [m],
+                       windSpeed [m/s, at 10 m], windDirection [rad, from the x-axis towards the y-axis],
+                       windExponent (of the power law wind profile, 0: the same wind at all altitudes) and
+                       gustIntensity [m/s] (standard deviation of the Dryden gusts, each flight gets its own
+                       realization, see windField)
+    :param processes: [int] number of processes (None: one per cpu, 1: run in this process)
+    :param seed: seed of the random generator
+    :param probability: [float] probability of the landing point inside the dispersion ellipse
+    :param outputs: [dict] name -> function(trajectory, sample) of the scalar (or vector) outputs of each flight,
+                    where trajectory is the TrajectoryResult of the flight (default: defaultOutputs). The functions
+                    must be defined at module level to be sent to the processes.
+    :param quantiles: the quantiles of the outputs estimated while streaming
+    :param keepTrajectories: indices of the flights whose full trajectories are kept
+    :param reducers: [list] additional Statistics.Reducers, updated with every finished flight
+
+    :return: [dict] the samples, the outputs of every flight (one array per output), statistics of the outputs
+             (see Statistics.OutputStatistics), the landing ellipse (see dispersionEllipse) and the kept
+             trajectories (index -> trajectory)
+    """
+    for name in parameters:
+        if name not in defaultParameters:
+            raise ValueError("Unknown parameter '%s', use one of %s." % (name, ', '.join(parameterNames)))
+    if outputs is None:
+        outputs = defaultOutputs
+    distributions = dict(defaultParameters, inclination=inclination, rampLength=rampLength, **parameters)
+    rng = np.random.default_rng(seed)
+    sampled = {}
+    for name in parameterNames:
+        distribution = distributions[name]
+        if not hasattr(distribution, 'sample'):
+            distribution = Constant(distribution)
+        sampled[name] = distribution.sample(rng, samples)
+    # Seeds of the gusts of each flight
+    sampled['gustSeed'] = rng.integers(0, 2**32, samples)
+    statistics = Statistics.OutputStatistics(list(outputs), quantiles)
+    collector = Statistics.OutputCollector(samples)
+    sampler = Statistics.TrajectorySampler(keepTrajectories)
+    reducers = [statistics, collector, sampler] + list(reducers)
+    tasks = [(i, {name: sampled[name][i] for name in sampled}, timeStep, method, backend, outputs,
+              i in sampler.getIndices()) for i in range(samples)]
+    # The flights are reduced as they finish, only the kept trajectories are sent back from the processes
+    if processes == 1:
+        initializeWorker(rocket)
+        reduceFlights(map(simulateFlight, tasks), tasks, reducers)
+    else:
+        chunksize = max(1, samples//(8*(processes or multiprocessing.cpu_count())))
+        with multiprocessing.Pool(processes, initializer=initializeWorker, initargs=(rocket,)) as pool:
+            reduceFlights(pool.imap(simulateFlight, tasks, chunksize), tasks, reducers)
+    result = dict(collector.getResult(), samples=sampled, statistics=statistics.getResult(),
+                  trajectories=sampler.getResult())
+    if 'landing' in result['statistics']:
+        landing = result['statistics']['landing']
+        result['ellipse'] = dispersionEllipse(landing['mean'], landing['covariance'], probability)
+    return result
+
+def reduceFlights(flights, tasks, reducers):
+    for (flightOutputs, trajectory), task in zip(flights, tasks):
+        for reducer in reducers:
+            reducer.update(task[0], task[1], flightOutputs, trajectory)
+
+# The nominal rocket of each worker process
+workerRocket = None
+
+def initializeWorker(rocket):
+    global workerRocket
+    workerRocket = rocket
+
+def dispersedRocket(rocket, sample):
+    """
+    :return: copy of the rocket with the thrust, drag and mass dispersions of the sample
+    """
+    rocket = copy.deepcopy(rocket)
+    rocket.getMotor().setThrustScale(sample['thrustScale'])
+    rocket.setDragScale(sample['dragScale'])
+    rocket.setMassOffset(sample['massOffset'])
+    rocket.setCOMOffset(sample['COMOffset'])
+    return rocket
+
+def windField(sample):
+    """
+    :return: [Wind.WindField] the power law wind profile of the sample, with the Dryden gusts of its seed
+    """
+    wind = Wind.WindField.powerLaw(sample['windSpeed'], sample['windDirection'], exponent=sample['windExponent'])
+    if sample['gustIntensity'] > 0:
+        wind.setGusts(Wind.drydenGusts(sample['gustIntensity'], gustDuration, gustStep, seed=sample['gustSeed']),
+                      gustStep)
+    return wind
+
+def simulateFlight(task):
+    """
+    :return: the outputs of one flight and its trajectory (None if it is not kept)
+    """
+    index, sample, timeStep, method, backend, outputs, keep = task
+    rocket = dispersedRocket(workerRocket, sample)
+    trajectory = Trajectory.calculateTrajectory(rocket, sample['inclination'], sample['rampLength'], timeStep,
+                                                method=method, stopCondition='groundImpact', backend=backend,
+                                                wind=windField(sample))
+    flightOutputs = {name: function(trajectory, sample) for name, function in outputs.items()}
+    return flightOutputs, (trajectory if keep else None)
+
+# Outputs of a flight (trajectory is a TrajectoryResult)
+def apogee(trajectory, sample):
+    return -np.min(trajectory.getPosition()[:, 2])
+
+def maxVelocity(trajectory, sample):
+    return np.max(np.linalg.norm(trajectory.getVelocity(), axis=1))
+
+def landing(trajectory, sample):
+    return trajectory.getPosition()[-1, 0:2]
+
+def flightTime(trajectory, sample):
+    return trajectory.getTime()[-1]
+
+def maxDynamicPressure(trajectory, sample):
+    return np.max(trajectory.getDynamicPressure())
+
+defaultOutputs = {'apogee': apogee, 'maxVelocity': maxVelocity, 'landing': landing, 'flightTime': flightTime,
+                  'maxDynamicPressure': maxDynamicPressure}
+
+def dispersionEllipse(center, covariance, probability=0.95):
+    """
+    Ellipse of a bivariate normal distribution containing the given probability.
+
+    :param center: [np.array] mean of the points in the plane
+    :param covariance: [np.array] covariance matrix (2x2) of the points
+    :return: [dict] center, covariance, semiAxes (major, minor) [m], angle of the major axis from the x-axis [rad]
+             and probability
+    """
+    # The squared Mahalanobis distance is chi-square distributed with 2 degrees of freedom
+    scale = np.sqrt(-2*np.log(1 - probability))
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    semiAxes = scale*np.sqrt(np.maximum(eigenvalues[::-1], 0))
+    angle = np.arctan2(eigenvectors[1, 1], eigenvectors[0, 1])
+    return {'center': center, 'covariance': covariance, 'semiAxes': semiAxes, 'angle': angle,
+            'probability': probability}
@@ -0,0 +1,203 @@
+"""
+Streaming statistics of dispersion runs (see MonteCarlo)
+
+The reducers are updated once per flight as it finishes, so a run of thousands of flights only keeps
+the running statistics of the chosen outputs and not the trajectories.
+
+--Propulse NTNU--
+"""
+import abc
+import numpy as np
+
+class RunningMoments:
+    """
+    Mean and covariance of a stream of vectors (Welford's algorithm), and the component wise min and max
+    """
+    def __init__(self, dimension):
+        self.__count = 0
+        self.__mean = np.zeros(dimension)
+        self.__M2 = np.zeros((dimension, dimension))  # sum of outer products of the deviations
+        self.__min = np.full(dimension, np.inf)
+        self.__max = np.full(dimension, -np.inf)
+
+    def update(self, x):
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        self.__count += 1
+        delta = x - self.__mean
+        self.__mean += delta/self.__count
+        self.__M2 += np.outer(delta, x - self.__mean)
+        np.minimum(self.__min, x, out=self.__min)
+        np.maximum(self.__max, x, out=self.__max)
+
+    def getCount(self):
+        return self.__count
+
+    def getMean(self):
+        return self.__mean.copy()
+
+    def getCovariance(self):
+        """
+        :return: [np.array] sample covariance matrix (nan for less than 2 values)
+        """
+        if self.__count < 2:
+            return np.full(self.__M2.shape, np.nan)
+        return self.__M2/(self.__count - 1)
+
+    def getMin(self):
+        return self.__min.copy()
+
+    def getMax(self):
+        return self.__max.copy()
+
+class P2Quantile:
+    """
+    Streaming estimate of the p-quantile of a stream of numbers with the P-square algorithm
+    (Jain and Chlamtac, 1985): five markers whose heights are adjusted with piecewise parabolic
+    interpolation, O(1) memory and time per value.
+    """
+    def __init__(self, p):
+        self.__p = p
+        self.__heights = []
+        self.__positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.__desired = [1.0, 1 + 2*p, 1 + 4*p, 3 + 2*p, 5.0]
+        self.__increments = [0.0, p/2, p, (1 + p)/2, 1.0]
+
+    def update(self, x):
+        x = float(x)
+        h = self.__heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+        n = self.__positions
+        # cell of x, the extreme markers follow the min and max
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= h[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.__desired[i] += self.__increments[i]
+        # adjust the heights of the middle markers
+        for i in range(1, 4):
+            d = self.__desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = h[i] + d/(n[i + 1] - n[i - 1])*((n[i] - n[i - 1] + d)*(h[i + 1] - h[i])/(n[i + 1] - n[i]) +
+                                                            (n[i + 1] - n[i] - d)*(h[i] - h[i - 1])/(n[i] - n[i - 1]))
+                if h[i - 1] < parabolic < h[i + 1]:
+                    h[i] = parabolic
+                else:
+                    h[i] = h[i] + d*(h[i + d] - h[i])/(n[i + d] - n[i])
+                n[i] += d
+
+    def getQuantile(self):
+        if len(self.__heights) < 5:
+            # exact for the first values
+            return np.percentile(self.__heights, 100*self.__p) if self.__heights else np.nan
+        return self.__heights[2]
+
+class Reducer(abc.ABC):
+    """
+    Interface of the reducers of a dispersion run. update is called once per flight, in the order of the samples.
+    """
+    @abc.abstractmethod
+    def update(self, index, sample, outputs, trajectory):
+        """
+        :param index: [int] index of the flight
+        :param sample: [dict] the sampled parameters of the flight
+        :param outputs: [dict] the scalar (or vector) outputs of the flight
+        :param trajectory: [TrajectoryResult] the trajectory of the flight if it is kept, otherwise None
+        """
+
+    @abc.abstractmethod
+    def getResult(self):
+        """
+        :return: the result of the reducer after the last flight
+        """
+
+class OutputStatistics(Reducer):
+    """
+    Running mean, covariance, min, max and quantiles of chosen outputs
+    """
+    def __init__(self, names, quantiles=(0.05, 0.5, 0.95)):
+        self.__names = names
+        self.__quantiles = quantiles
+        self.__moments = {}
+        self.__estimators = {}
+
+    def update(self, index, sample, outputs, trajectory):
+        for name in self.__names:
+            value = np.atleast_1d(np.asarray(outputs[name], dtype=float))
+            if name not in self.__moments:
+                self.__moments[name] = RunningMoments(len(value))
+                self.__estimators[name] = [[P2Quantile(p) for p in self.__quantiles] for _ in value]
+            self.__moments[name].update(value)
+            for estimators, component in zip(self.__estimators[name], value):
+                for estimator in estimators:
+                    estimator.update(component)
+
+    def getResult(self):
+        """
+        :return: [dict] output name -> dict with count, mean, std, covariance, min, max and quantiles
+                 (quantile -> value). Scalar outputs give floats, vector outputs arrays.
+        """
+        result = {}
+        for name, moments in self.__moments.items():
+            covariance = moments.getCovariance()
+            statistics = {'count': moments.getCount(), 'mean': moments.getMean(),
+                          'std': np.sqrt(np.diag(covariance)), 'covariance': covariance,
+                          'min': moments.getMin(), 'max': moments.getMax(),
+                          'quantiles': {p: np.array([estimators[j].getQuantile()
+                                                     for estimators in self.__estimators[name]])
+                                        for j, p in enumerate(self.__quantiles)}}
+            if len(statistics['mean']) == 1:
+                for key in ('mean', 'std', 'min', 'max'):
+                    statistics[key] = float(statistics[key][0])
+                statistics['covariance'] = float(covariance[0, 0])
+                statistics['quantiles'] = {p: float(q[0]) for p, q in statistics['quantiles'].items()}
+            result[name] = statistics
+        return result
+
+class OutputCollector(Reducer):
+    """
+    The outputs of every flight (small arrays, one row per flight)
+    """
+    def __init__(self, samples):
+        self.__samples = samples
+        self.__outputs = {}
+
+    def update(self, index, sample, outputs, trajectory):
+        for name, value in outputs.items():
+            value = np.asarray(value, dtype=float)
+            if name not in self.__outputs:
+                self.__outputs[name] = np.full((self.__samples,) + value.shape, np.nan)
+            self.__outputs[name][index] = value
+
+    def getResult(self):
+        return self.__outputs
+
+class TrajectorySampler(Reducer):
+    """
+    The full trajectories of the selected flights
+    """
+    def __init__(self, indices):
+        self.__indices = set(indices)
+        self.__trajectories = {}
+
+    def getIndices(self):
+        return self.__indices
+
+    def update(self, index, sample, outputs, trajectory):
+        if index in self.__indices:
+            self.__trajectories[index] = trajectory
+
+    def getResult(self):
+        return self.__trajectories
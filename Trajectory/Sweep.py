@@ -0,0 +1,360 @@
+"""
+Sweeps of rocket flights
+
+gridSweep flies a rocket at every point of a grid of launch, integration and rocket parameters (e.g. inclination x
+ramp length x motor), in a pool of processes. The outputs of each point are cached on disk under a content hash of
+the rocket files and the parameters of the point, so a sweep that is extended or run again only flies the new
+points. motorSweep flies an airframe with each of a set of candidate motors and ranks the motors by the outputs
+of their flights (apogee, velocity at the end of the launch ramp, maximal Mach and stability margin at the end of
+the launch ramp). The rocket is described by its files (see Airframe), every process builds the rocket of its
+flights.
+
+--Propulse NTNU--
+"""
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import os
+import hashlib
+import itertools
+import multiprocessing
+import numpy as np
+import Trajectory
+import MonteCarlo
+import TrajectoryCache
+from Rocket1 import Motor, RocketSimple
+from Rocket2 import Rocket
+from AeroDatabase import AeroDatabase
+from MotorLibrary import MotorLibrary
+from lib.File_utilities import read_dot, find_parameter, file_digest, save_npz
+
+cacheVersion = 1  # part of the keys of the cached points, increased when the simulation gives other results
+
+# Parameters of a point of a sweep: inputs of Trajectory.calculateTrajectory, the motor, the dispersions of the
+# rocket and the wind of MonteCarlo (see MonteCarlo.dispersedRocket and MonteCarlo.windField)
+trajectoryParameters = ('inclination', 'rampLength', 'timeStep', 'simulationTime', 'method', 'stopCondition',
+                        'backend')
+rocketParameters = ('motor', 'thrustScale', 'dragScale', 'massOffset', 'COMOffset')
+windParameters = ('windSpeed', 'windDirection', 'windExponent', 'gustIntensity', 'gustSeed')
+requiredParameters = ('inclination', 'rampLength', 'timeStep')
+defaultPoint = dict(MonteCarlo.defaultParameters, simulationTime=None, method='RK4', stopCondition='groundImpact',
+                    backend='reference', motor=None, gustSeed=0)
+
+class Airframe:
+    """
+    A rocket definition whose motor can be replaced: a RocketSimple rocket file (see Airframe.simple) or the init
+    file and aero data of a CFD Rocket (see Airframe.cfd and Airframe.database).
+    """
+    def __init__(self, constructor, *args, **kwargs):
+        """
+        :param constructor: [str] name of the from_file constructor of RocketSimple ('RocketSimple.from_file') or
+                            Rocket ('Rocket.from_file_with_AoAspeed', 'Rocket.from_database', ...)
+        :param args, kwargs: arguments of the constructor, without the motor
+        """
+        rocketClass, method = constructor.split('.')
+        if rocketClass not in ('RocketSimple', 'Rocket') or not method.startswith('from_'):
+            raise ValueError("Unknown rocket constructor '%s'." % constructor)
+        self.__constructor = constructor
+        self.__args = args
+        self.__kwargs = kwargs
+
+    def __repr__(self):
+        arguments = [repr(arg) for arg in self.__args] + ['%s=%r' % item for item in sorted(self.__kwargs.items())]
+        return '%s(%s)' % (self.__constructor, ', '.join(arguments))
+
+    def build(self, motor=None):
+        """
+        :param motor: [Motor or str] the motor (or the path of a motor file), None for the motor of the rocket file
+        :return: the rocket
+        """
+        rocketClass, method = self.__constructor.split('.')
+        constructor = getattr(RocketSimple if rocketClass == 'RocketSimple' else Rocket, method)
+        return constructor(*self.__args, motor=motor, **self.__kwargs)
+
+    def getConstructor(self):
+        return self.__constructor
+
+    def getArguments(self):
+        return self.__args, dict(self.__kwargs)
+
+    def __arguments(self):
+        # Arguments of the constructor by name
+        if self.__constructor == 'RocketSimple.from_file':
+            names = ('rocket_file', 'path_to_file')
+        elif self.__constructor == 'Rocket.from_database':
+            names = ('initFile', 'database', 'name', 'path_to_file')
+        else:
+            names = ('initFile', 'sampleReport', 'path_to_file')
+        return dict(dict(zip(names, self.__args)), **self.__kwargs)
+
+    def getFiles(self):
+        """
+        :return: [list] paths of the files of the rocket: the rocket (or init) file, the files it refers to (parts
+                 and motor) and the aero data
+        """
+        arguments = self.__arguments()
+        path = arguments.get('path_to_file', '')
+        if self.__constructor == 'RocketSimple.from_file':
+            parameters = read_dot(path + arguments['rocket_file']).parameters
+            parts = ('nose', 'body', 'fin', 'motor', 'payload')
+            return [path + arguments['rocket_file']] + [path + parameters[part] for part in parts]
+        initFile = path + arguments['initFile']
+        if self.__constructor == 'Rocket.from_database':
+            database = arguments['database']
+            dataFile = database.getPath() if isinstance(database, AeroDatabase) else database
+        else:
+            dataFile = path + arguments['sampleReport']
+        return [initFile, path + find_parameter(initFile, 'motor'), dataFile]
+
+    def getDigest(self):
+        """
+        :return: [str] SHA-1 digest (hex) of the constructor, its options and the content of the files of the rocket
+        """
+        key = hashlib.sha1(self.__constructor.encode())
+        # The options, not the paths of the files
+        files = ('rocket_file', 'path_to_file', 'initFile', 'sampleReport', 'database')
+        options = sorted((name, value) for name, value in self.__arguments().items() if name not in files)
+        key.update(repr(options).encode())
+        for file in self.getFiles():
+            key.update(file_digest(file).encode())
+        return key.hexdigest()
+
+    @staticmethod
+    def simple(rocketFile, path=''):
+        """
+        :return: [Airframe] the RocketSimple of the rocket file (see RocketSimple.from_file)
+        """
+        return Airframe('RocketSimple.from_file', rocketFile, path)
+
+    @staticmethod
+    def cfd(initFile, sampleReport, path='', fit=None, **fitOptions):
+        """
+        :return: [Airframe] the CFD Rocket of the init file and CFD report (see Rocket.from_file_with_AoAspeed)
+        """
+        return Airframe('Rocket.from_file_with_AoAspeed', initFile, sampleReport, path, fit=fit, **fitOptions)
+
+    @staticmethod
+    def database(initFile, database, name, path=''):
+        """
+        :return: [Airframe] the CFD Rocket of the init file and a configuration of an AeroDatabase (see
+                 Rocket.from_database)
+        """
+        return Airframe('Rocket.from_database', initFile, database, name, path)
+
+def gridSweep(airframe, grid, library=None, outputs=None, processes=None, cacheDirectory=None, trajectoryCache=None,
+              **parameters):
+    """
+    Flights of the rocket at every point of the grid, e.g. all inclinations and ramp lengths:
+    gridSweep(airframe, {'inclination': [...], 'rampLength': [...]}, timeStep=0.02, cacheDirectory='sweeps')
+
+    :param airframe: [Airframe] the rocket
+    :param grid: [dict] name -> values of the swept parameters (see trajectoryParameters, rocketParameters and
+                 windParameters), the points are all combinations of the values
+    :param library: [MotorLibrary] the library of motor names given as motor
+    :param outputs: [dict] name -> function(trajectory) of the scalar (or vector) outputs of each flight (default:
+                    gridOutputs), defined at module level to be sent to the processes
+    :param processes: [int] number of processes (None: one per cpu, 1: run in this process)
+    :param cacheDirectory: [str] directory of the cached points (created if missing), None to fly every point
+    :param trajectoryCache: cache of the trajectories of the flights (see Trajectory.calculateTrajectory), so the
+                            points that are flown again for other outputs load their trajectories
+    :param parameters: values of the parameters that are not swept (inclination [rad], rampLength [m] and
+                       timeStep [s] are required, the others default to defaultPoint), a motor is a Motor, the path
+                       of a motor file or a name in library
+    :return: [dict] the grid, the points (parameters of each point), the outputs (name -> array of the grid
+             shape and the shape of the output) and cached (the points that were loaded from the cache)
+    """
+    if outputs is None:
+        outputs = gridOutputs
+    known = trajectoryParameters + rocketParameters + windParameters
+    for name in list(grid) + list(parameters):
+        if name not in known:
+            raise ValueError("Unknown parameter '%s', use one of %s." % (name, ', '.join(known)))
+        if name in grid and name in parameters:
+            raise ValueError("The parameter '%s' is both swept and fixed." % name)
+    missing = [name for name in requiredParameters if name not in grid and name not in parameters]
+    if missing:
+        raise ValueError("Give the values of %s." % ', '.join(missing))
+    names = list(grid)
+    shape = tuple(len(grid[name]) for name in names)
+    points = [dict(defaultPoint, **parameters, **dict(zip(names, values)))
+              for values in itertools.product(*(grid[name] for name in names))]
+    # Motors, resolved once for all points
+    motors = {}
+    for point in points:
+        motor = point['motor']
+        if isinstance(motor, str) and motor not in motors:
+            motors[motor] = library.getMotor(motor) if library is not None and motor in library else \
+                Motor.from_file(motor)
+    airframeDigest = airframe.getDigest() if cacheDirectory is not None else None
+    results, keys, tasks = [None]*len(points), [None]*len(points), []
+    for index, point in enumerate(points):
+        if cacheDirectory is not None:
+            keys[index] = pointKey(airframeDigest, point, library, outputs)
+            results[index] = loadPoint(cacheDirectory, keys[index], outputs)
+        if results[index] is None:
+            motor = motors[point['motor']] if isinstance(point['motor'], str) else point['motor']
+            tasks.append((index, dict(point, motor=motor), outputs))
+    cached = np.array([result is not None for result in results]).reshape(shape)
+
+    def store(flights):
+        # The points are cached as they finish, an interrupted sweep keeps its finished points
+        for index, flightOutputs in flights:
+            results[index] = flightOutputs
+            if cacheDirectory is not None:
+                savePoint(cacheDirectory, keys[index], flightOutputs)
+
+    if tasks and processes == 1:
+        initializeWorker(airframe, trajectoryCache)
+        store(map(simulatePoint, tasks))
+    elif tasks:
+        chunksize = max(1, len(tasks)//(8*(processes or multiprocessing.cpu_count())))
+        with multiprocessing.Pool(processes, initializer=initializeWorker,
+                                  initargs=(airframe, trajectoryCache)) as pool:
+            store(pool.imap_unordered(simulatePoint, tasks, chunksize))
+    values = {name: np.array([result[name] for result in results], dtype=float) for name in outputs}
+    return {'grid': grid, 'points': points, 'cached': cached,
+            'outputs': {name: array.reshape(shape + array.shape[1:]) for name, array in values.items()}}
+
+def motorSweep(airframe, motors, timeStep, inclination, rampLength, library=None, rankBy='apogee', outputs=None,
+               **kwargs):
+    """
+    :param airframe: [Airframe] the rocket, its motor is replaced
+    :param motors: the candidate motors: a MotorLibrary (all its motors), or a list of Motors, paths of motor files
+                   and names of motors in library (e.g. library.find(impulseClass='M', diameter=98e-3))
+    :param timeStep: [float] time step of the integration [s]
+    :param inclination: [float] launch inclination [rad]
+    :param rampLength: [float] length of the launch ramp [m]
+    :param library: [MotorLibrary] the library of the motor names
+    :param rankBy: [str] output ranking the motors (decreasing), e.g. 'apogee' or 'railExitVelocity'
+    :param outputs: [dict] name -> function(trajectory) of the scalar outputs of each flight (default:
+                    defaultOutputs), defined at module level to be sent to the processes
+    :param kwargs: see gridSweep (e.g. processes, cacheDirectory, backend), the flights stop at apogee by default
+    :return: [np.array] the ranked table, a structured array with the name of the motor and the outputs of its
+             flight (see formatTable)
+    """
+    if outputs is None:
+        outputs = defaultOutputs
+    if rankBy not in outputs:
+        raise ValueError("Unknown output '%s', use one of %s." % (rankBy, ', '.join(outputs)))
+    if isinstance(motors, MotorLibrary):
+        motors, library = motors.getNames(), motors
+    motors = [library.getMotor(motor) if isinstance(motor, str) and library is not None and motor in library else
+              (Motor.from_file(motor) if isinstance(motor, str) else motor) for motor in motors]
+    kwargs.setdefault('stopCondition', 'apogee')
+    sweep = gridSweep(airframe, {'motor': motors}, outputs=outputs, timeStep=timeStep, inclination=inclination,
+                      rampLength=rampLength, **kwargs)
+    table = np.zeros(len(motors), dtype=[('motor', 'U64')] + [(name, float) for name in outputs])
+    table['motor'] = [motor.getName() for motor in motors]
+    for name in outputs:
+        table[name] = sweep['outputs'][name]
+    # Decreasing, failed flights (nan) last
+    return table[np.argsort(-np.nan_to_num(table[rankBy], nan=-np.inf), kind='stable')]
+
+# The airframe and trajectory cache of each worker process
+workerAirframe = None
+workerTrajectoryCache = None
+
+def initializeWorker(airframe, trajectoryCache=None):
+    global workerAirframe, workerTrajectoryCache
+    workerAirframe = airframe
+    workerTrajectoryCache = TrajectoryCache.trajectoryCache(trajectoryCache)
+
+def simulatePoint(task):
+    """
+    :return: the index of the point and the outputs of its flight
+    """
+    index, point, outputs = task
+    rocket = MonteCarlo.dispersedRocket(workerAirframe.build(point['motor']), point)
+    trajectory = Trajectory.calculateTrajectory(rocket, point['inclination'], point['rampLength'], point['timeStep'],
+                                                point['simulationTime'], point['method'],
+                                                stopCondition=point['stopCondition'], backend=point['backend'],
+                                                wind=MonteCarlo.windField(point), cache=workerTrajectoryCache)
+    return index, {name: function(trajectory) for name, function in outputs.items()}
+
+# Cache of the points
+def motorDigest(motor, library):
+    """
+    :return: [str] digest of the motor of a point: its file, or its thrust curve and properties
+    """
+    if motor is None:
+        return 'None'  # the motor of the rocket files
+    if isinstance(motor, str):
+        if library is not None and motor in library:
+            return file_digest(library.getFile(motor)) + motor
+        return file_digest(motor)
+    return TrajectoryCache.motorDigest(motor)
+
+def pointKey(airframeDigest, point, library, outputs):
+    """
+    :return: [str] SHA-1 digest (hex) of everything the outputs of the point depend on
+    """
+    key = hashlib.sha1(('%d %s %s' % (cacheVersion, airframeDigest,
+                                      motorDigest(point['motor'], library))).encode())
+    values = [(name, np.asarray(value).tolist()) for name, value in sorted(point.items()) if name != 'motor']
+    functions = [(name, function.__module__, function.__qualname__) for name, function in sorted(outputs.items())]
+    key.update(repr((values, functions)).encode())
+    return key.hexdigest()
+
+def loadPoint(cacheDirectory, key, outputs):
+    """
+    :return: [dict] the cached outputs of the point, None if it is not cached
+    """
+    path = os.path.join(cacheDirectory, '%s.npz' % key)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if not all(name in data for name in outputs):
+            return None
+        return {name: data[name] for name in outputs}
+
+def savePoint(cacheDirectory, key, flightOutputs):
+    os.makedirs(cacheDirectory, exist_ok=True)
+    # Sweeps running at the same time may save the same point
+    save_npz(os.path.join(cacheDirectory, '%s.npz' % key),
+             {name: np.asarray(value, dtype=float) for name, value in flightOutputs.items()})
+
+# Outputs of a flight (trajectory is a TrajectoryResult)
+def apogee(trajectory):
+    return -np.min(trajectory.getPosition()[:, 2])
+
+def railExit(trajectory, values):
+    """
+    :return: the values (one per point in time of the trajectory) at the end of the launch ramp, nan if the rocket
+             did not leave it
+    """
+    exits = trajectory.getEvents().get('launchRampExit', [])
+    return np.interp(exits[0], trajectory.getTime(), values) if exits else np.nan
+
+def railExitVelocity(trajectory):
+    return railExit(trajectory, np.linalg.norm(trajectory.getVelocity(), axis=1))
+
+def maxMach(trajectory):
+    return np.max(trajectory.getMach())
+
+def railExitStability(trajectory):
+    return railExit(trajectory, trajectory.getStabilityMargin())
+
+defaultOutputs = {'apogee': apogee, 'railExitVelocity': railExitVelocity, 'maxMach': maxMach,
+                  'railExitStability': railExitStability}
+
+# Outputs of a flight until ground impact
+def landing(trajectory):
+    return trajectory.getPosition()[-1, 0:2]
+
+def flightTime(trajectory):
+    return trajectory.getTime()[-1]
+
+gridOutputs = dict(defaultOutputs, landing=landing, flightTime=flightTime)
+
+def formatTable(table):
+    """
+    :param table: [np.array] a table of motorSweep
+    :return: [str] the table as text, one motor per line
+    """
+    names = table.dtype.names
+    width = max([len(names[0])] + [len(motor) for motor in table[names[0]]])
+    lines = ['%-*s' % (width, names[0]) + ''.join('%18s' % name for name in names[1:])]
+    for row in table:
+        lines.append('%-*s' % (width, row[0]) + ''.join('%18.3f' % value for value in list(row)[1:]))
+    return '\n'.join(lines)
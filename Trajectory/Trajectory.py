@@ -2,33 +2,68 @@ import sys
 sys.path.append('../Rocket/')
 sys.path.append('../Forces/')
 sys.path.append('../Trajectory/')
+import warnings
 import numpy as np
 import math
 import scipy.linalg as splinalg
 import scipy.integrate as spintegrate
 import Kinematics
 import Forces
+import Wind
+import JitKernel
+import TrajectoryCache
+from TrajectoryResult import TrajectoryResult
 
 epsilon = 1e-10
+maxSimulationTime = 3600  # Upper bound of the simulation time when integrating until a stop condition [s]
 
-def calculateTrajectory(rocket, initialInclination, launchRampLength, timeStep, simulationTime):
+def calculateTrajectory(rocket, initialInclination, launchRampLength, timeStep, simulationTime=None, method='RK4',
+                        rtol=1e-6, atol=1e-6, stopCondition=None, backend='reference', wind=None, cache=None):
     # x is the state of the vector
     # x = [position, quaternion, linear velocity, angular velocity]
+    # method is 'RK4' (fixed timeStep) or 'RK45' (adaptive, timeStep is the initial step)
+    # stopCondition is None (integrate to simulationTime), 'groundImpact', 'apogee' or an altitude [m]
+    # at which to stop during descent. simulationTime may be None when a stop condition is given.
+    # backend is 'reference' (equationsMotion), 'workspace' (equationsMotionInPlace) or 'jit' (JitKernel,
+    # compiled with numba if it is installed, only for rockets with the Barrowman aero model)
+    # wind is None, a constant wind velocity in the world frame [np.array, m/s] or a Wind.WindField (wind over
+    # altitude and time)
+    # cache is None (no caching), True (the default cache), the directory of a cache or a
+    # TrajectoryCache.TrajectoryCache: a trajectory of the same rocket files, motor and parameters is loaded from the
+    # cache instead of integrated (see TrajectoryCache)
+    # Returns a TrajectoryResult (unpacks as t, position, euler, AoA, velocity, angularVelocity, drag, lift,
+    # gravity, thrust)
+    wind = Wind.windField(wind)
+    cache = TrajectoryCache.trajectoryCache(cache)
+    key = None
+    if cache is not None:
+        key = cache.key(rocket, initialInclination, launchRampLength, timeStep, simulationTime, method, rtol, atol,
+                        stopCondition, backend, wind)
+        result = cache.load(key, rocket, wind) if key is not None else None
+        if result is not None:
+            return result
     (x0, initialDirection) = initialState(rocket, initialInclination)
-    t, x, AoA, forces = integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, timeStep, simulationTime)
-    (position, euler, linearVelocity, angularVelocity) = unwrapState(x)
-    n = len(t)
-    drag = np.array([forces[i][:,0] for i in range(n)])
-    lift = np.array([forces[i][:,1] for i in range(n)])
-    gravity = np.array([forces[i][:,2] for i in range(n)])
-    thrust = np.array([forces[i][:,3] for i in range(n)])
-    # Transform velocity to world frame for plot
-    velocity = np.zeros(shape=(len(t),3)) # in world frame
-    for i in range(len(t)):
-        RotationBody2Inertial = Kinematics.Ryzx(euler[i][0], euler[i][1], euler[i][2])
-        velocity[i] = RotationBody2Inertial @ linearVelocity[i]
+    t, x, AoA, forces, events = integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, timeStep,
+                                                         simulationTime, method, rtol, atol, stopCondition,
+                                                         backend, wind)
+    if key is not None:
+        cache.save(key, t, x, AoA, forces, events)
+    return TrajectoryResult(t, x, AoA, forces, events, rocket, wind)
 
-    return t, position, euler, AoA, velocity, angularVelocity, drag, lift, gravity, thrust
+def montecarlo(rocket, samples, timeStep, inclination, rampLength, **kwargs):
+    # Monte Carlo dispersion analysis, see MonteCarlo.montecarlo
+    import MonteCarlo
+    return MonteCarlo.montecarlo(rocket, samples, timeStep, inclination, rampLength, **kwargs)
+
+def gridSweep(airframe, grid, **kwargs):
+    # Flights at every point of a grid of parameters, cached on disk, see Sweep.gridSweep
+    import Sweep
+    return Sweep.gridSweep(airframe, grid, **kwargs)
+
+def motorSweep(airframe, motors, timeStep, inclination, rampLength, **kwargs):
+    # Flights of an airframe with each of a set of motors, ranked, see Sweep.motorSweep
+    import Sweep
+    return Sweep.motorSweep(airframe, motors, timeStep, inclination, rampLength, **kwargs)
 
 def initialState(rocket, initialInclination):
     initialPitch = np.pi/2-initialInclination
@@ -42,14 +77,103 @@ def initialState(rocket, initialInclination):
     initialLinearVelocity, initialAngularVelocity))
     return (x0, initialDirection)
 
-def integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, timeStep, simulationTime):
-    N = math.ceil(simulationTime/timeStep)
-    t = np.arange(0, simulationTime + timeStep, timeStep)
-    x = np.zeros(shape=(N,len(x0)))
-    sol, AoA, force = RK4(equationsMotion, 0, simulationTime, timeStep, x0, RHS_args=(rocket, launchRampLength, initialDirection))
-    return t, sol, AoA, force
+def integrateEquationsMotion(rocket, x0, launchRampLength, initialDirection, timeStep, simulationTime=None,
+                             method='RK4', rtol=1e-6, atol=1e-6, stopCondition=None, backend='reference',
+                             wind=None):
+    if simulationTime is None:
+        if stopCondition is None:
+            raise ValueError("Give either a simulationTime or a stopCondition.")
+        simulationTime = maxSimulationTime
+    if method not in ('RK4', 'RK45'):
+        raise ValueError("Unknown integration method '%s', use 'RK4' or 'RK45'." % method)
+    wind = Wind.windField(wind)
+    events = flightEvents(rocket, launchRampLength, initialDirection, stopCondition)
+    if backend == 'jit':
+        JitKernel.checkRocket(rocket)
+        if not JitKernel.isAvailable():
+            warnings.warn("numba is not installed, using the reference backend.", RuntimeWarning)
+            backend = 'reference'
+        elif method == 'RK4':
+            return JitKernel.integrateRK4(rocket, x0, launchRampLength, initialDirection, timeStep, simulationTime,
+                                          stopCondition, Forces.g, Forces.getAtmosphere(), epsilon, wind)
+        else:
+            RHS = JitKernel.equationsMotionFunction(rocket, launchRampLength, initialDirection, Forces.g,
+                                                    Forces.getAtmosphere(), epsilon, wind)
+            return RK45(RHS, 0, simulationTime, timeStep, x0, events=events, rtol=rtol, atol=atol)
+    if backend == 'workspace':
+        workspace = MotionWorkspace(rocket, launchRampLength, initialDirection, wind)
+        if method == 'RK4':
+            return RK4InPlace(equationsMotionInPlace, 0, simulationTime, timeStep, x0, RHS_args=(workspace,),
+                              events=events)
+        def RHS(x, t):
+            dx, AoA, forces = equationsMotionInPlace(x, t, np.zeros(len(x)), workspace)
+            return dx, AoA, forces.copy()
+        return RK45(RHS, 0, simulationTime, timeStep, x0, events=events, rtol=rtol, atol=atol)
+    elif backend != 'reference':
+        raise ValueError("Unknown backend '%s', use 'reference', 'workspace' or 'jit'." % backend)
+    RHS_args = (rocket, launchRampLength, initialDirection, wind)
+    if method == 'RK45':
+        return RK45(equationsMotion, 0, simulationTime, timeStep, x0, RHS_args=RHS_args, events=events,
+                    rtol=rtol, atol=atol)
+    return RK4(equationsMotion, 0, simulationTime, timeStep, x0, RHS_args=RHS_args, events=events)
+
+class FlightEvent:
+    """
+    An event of the flight, marked by a zero crossing of the scalar function g(t, x).
+    Only crossings from negative to positive values are events.
+    """
+    def __init__(self, name, function, terminal=False):
+        self.__name = name
+        self.__function = function
+        self.__terminal = terminal
+
+    def __call__(self, t, x):
+        return self.__function(t, x)
+
+    def getName(self):
+        return self.__name
+
+    def isTerminal(self):
+        return self.__terminal
+
+def flightEvents(rocket, launchRampLength, initialDirection, stopCondition=None):
+    """
+    :param stopCondition: None, 'groundImpact', 'apogee' or an altitude [m]. The matching event is terminal.
+    :return: [list] launch ramp exit, motor burnout, apogee and ground impact (and descent to the altitude
+                    of the stop condition) as FlightEvents
+    """
+    rampEnd = launchRampLength + rocket.getLength()
+    burnTime = rocket.getMotor().getBurnTime()
+    def launchRampExit(t, x): return np.dot(x[0:3], initialDirection) - rampEnd
+    def burnout(t, x): return t - burnTime
+    def apogee(t, x): return (Kinematics.Rquaternion(x[3:7]) @ x[7:10])[2]  # vertical velocity (z points down)
+    def groundImpact(t, x): return x[2]
+    events = [FlightEvent('launchRampExit', launchRampExit), FlightEvent('burnout', burnout),
+              FlightEvent('apogee', apogee, stopCondition == 'apogee'),
+              FlightEvent('groundImpact', groundImpact, stopCondition == 'groundImpact')]
+    if stopCondition is None or isinstance(stopCondition, str):
+        if stopCondition not in (None, 'apogee', 'groundImpact'):
+            raise ValueError("Unknown stop condition '%s'." % stopCondition)
+        return events
+    altitude = float(stopCondition)
+    def descent(t, x): return x[2] + altitude  # only crosses zero from below when descending
+    return events + [FlightEvent('descent', descent, True)]
+
+def detectEvents(timelist, stateMatrix, events):
+    """
+    Locate events in an already integrated trajectory by linear interpolation between the time steps.
 
-def equationsMotion(x, t, rocket, launchRampLength, initialDirection):
+    :return: [dict] event name -> list of event times
+    """
+    eventTimes = {event.getName(): [] for event in events}
+    for event in events:
+        g = np.array([event(timelist[i], stateMatrix[i]) for i in range(len(timelist))])
+        for i in np.nonzero((g[:-1] < 0) & (g[1:] >= 0))[0]:
+            eventTimes[event.getName()].append(timelist[i] - g[i]*(timelist[i + 1] - timelist[i])/(g[i + 1] - g[i]))
+    return eventTimes
+
+def equationsMotion(x, t, rocket, launchRampLength, initialDirection, wind=None):
+    # wind is None or a Wind.WindField
     position = x[0:3]
     quaternion = x[3:7]
     linearVelocity = x[7:10]
@@ -65,14 +189,16 @@ def equationsMotion(x, t, rocket, launchRampLength, initialDirection):
     RotationInertial2Body = RotationBody2Inertial.T
     dPosition = RotationBody2Inertial @ linearVelocity.T
     dQuaternion = Kinematics.quaternionGradient(quaternion) @ angularVelocity.T
+    # mass properties
+    m, COM, I = rocket.getMassProperties().evaluate(t)
     # forces in the body frame
     thrust = np.array([rocket.getMotor().thrust(t), 0, 0])
-    gravityWorld = np.array([0, 0, rocket.getMass(t)*Forces.g])
+    gravityWorld = np.array([0, 0, m*Forces.g])
     gravityBody = RotationInertial2Body @ gravityWorld
     # aerodynamic forces
-    windVelocity = np.array([0, 0, 0])
-    # Add wind to current rocket velocity to get total air velocity
-    airVelocity = dPosition + windVelocity
+    windVelocity = np.zeros(3) if wind is None else wind.getVelocity(abs(position[2]), t)
+    # Subtract wind from current rocket velocity to get velocity relative to the air
+    airVelocity = dPosition - windVelocity
     airSpeed = np.linalg.norm(airVelocity)
     xAxisBody = RotationBody2Inertial[:,0]
     dirWindVelocity = (airVelocity/(np.linalg.norm(airVelocity) + epsilon))
@@ -86,9 +212,7 @@ def equationsMotion(x, t, rocket, launchRampLength, initialDirection):
     lift = aeroForces[1]*dirLiftBody
     # inertia matrix and coriolis matrix for equations of motion
     # seen from origin of body frame, not from center of mass (See Fossen)
-    H = Kinematics.TransformationMatrix(rocket.getCOM(t))
-    m = rocket.getMass(t)
-    I = rocket.getInertiaMatrix(t)
+    H = Kinematics.TransformationMatrix(COM)
     IBody = H.T @ splinalg.block_diag(m,m,m,I) @ H
     S1 = Kinematics.CrossProductMatrix(m*angularVelocity)
     S2 = Kinematics.CrossProductMatrix(I @ angularVelocity.T)
@@ -100,7 +224,7 @@ def equationsMotion(x, t, rocket, launchRampLength, initialDirection):
         totalForce = np.array([totalForce[0], 0, 0])
         totalMoment = np.array([0, 0, 0])
     else:
-        arm = rocket.getCOP(AoA) - rocket.getCOM(t)
+        arm = rocket.getCOP(AoA, airSpeed, position) - COM
         totalMoment = np.cross(arm, drag + lift)
     genForceBody = H.T @ np.concatenate((totalForce, totalMoment))
     # find dx
@@ -111,8 +235,161 @@ def equationsMotion(x, t, rocket, launchRampLength, initialDirection):
 
     return dx, AoA, forceMatrix
 
+class MotionWorkspace:
+    """
+    Preallocated buffers and constants of one flight for equationsMotionInPlace
+    """
+    def __init__(self, rocket, launchRampLength, initialDirection, wind=None):
+        self.rocket = rocket
+        self.motor = rocket.getMotor()
+        self.massProperties = rocket.getMassProperties()
+        self.rampEnd = launchRampLength + rocket.getLength()
+        self.initialDirection = [float(d) for d in initialDirection]
+        self.wind = Wind.windField(wind)
+        self.airVelocity = np.zeros(3)
+        self.forces = np.zeros((3, 4))
+
+def equationsMotionInPlace(x, t, out, workspace):
+    """
+    Same equations as equationsMotion, written with scalar arithmetic: dx, the air velocity and the forces go to
+    preallocated buffers, and no matrices are built or solved. It still allocates small arrays and lists: the
+    state and wind as lists, and the results of massProperties.evaluate, getAeroForces and getCOP of the rocket.
+    The 6x6 system of IBody (see Fossen) is solved in closed form with its Schur complement:
+    with r = COM, IBody = [[m*1, m*S(r)], [-m*S(r), I - m*S(r)^2]], and the solution is
+        dAngularVelocity = I^-1 (M + (I w) x w)
+        dLinearVelocity = (F - m w x (v + r x w))/m - r x dAngularVelocity
+    where F and M are the total force and moment about COM.
+
+    :param out: [np.array] dx is written here (length 13)
+    :param workspace: [MotionWorkspace] buffers and constants of the flight
+    :return: dx (out), AoA and forces (buffer of the workspace, copy it to keep it)
+    """
+    px, py, pz, q0, q1, q2, q3, vx, vy, vz, wx, wy, wz = x.tolist()
+    # determine if whether at launch ramp or not
+    d = workspace.initialDirection
+    stillAtLaunchRamp = px*d[0] + py*d[1] + pz*d[2] <= workspace.rampEnd
+    # rotation matrix from normalized quaternion
+    norm = math.sqrt(q0*q0 + q1*q1 + q2*q2 + q3*q3)
+    q0, q1, q2, q3 = q0/norm, q1/norm, q2/norm, q3/norm
+    R00, R01, R02 = 1 - 2*(q2*q2 + q3*q3), 2*(q1*q2 - q0*q3), 2*(q1*q3 + q0*q2)
+    R10, R11, R12 = 2*(q1*q2 + q0*q3), 1 - 2*(q1*q1 + q3*q3), 2*(q2*q3 - q0*q1)
+    R20, R21, R22 = 2*(q1*q3 - q0*q2), 2*(q2*q3 + q0*q1), 1 - 2*(q1*q1 + q2*q2)
+    # dPosition and dQuaternion
+    dpx = R00*vx + R01*vy + R02*vz
+    dpy = R10*vx + R11*vy + R12*vz
+    dpz = R20*vx + R21*vy + R22*vz
+    out[0], out[1], out[2] = dpx, dpy, dpz
+    out[3] = 0.5*(-q1*wx - q2*wy - q3*wz)
+    out[4] = 0.5*(q0*wx - q3*wy + q2*wz)
+    out[5] = 0.5*(q3*wx + q0*wy - q1*wz)
+    out[6] = 0.5*(-q2*wx + q1*wy + q0*wz)
+    # mass properties
+    m, COM, I = workspace.massProperties.evaluate(t)
+    rx, ry, rz = COM.tolist()
+    (I00, I01, I02), (I10, I11, I12), (I20, I21, I22) = I.tolist()
+    # forces in the body frame
+    thrust = workspace.motor.thrust(t)
+    gravity = m*Forces.g
+    gbx, gby, gbz = R20*gravity, R21*gravity, R22*gravity
+    # aerodynamic forces
+    wind = workspace.wind.getVelocity(abs(pz), t).tolist()
+    avx, avy, avz = dpx - wind[0], dpy - wind[1], dpz - wind[2]
+    airVelocity = workspace.airVelocity
+    airVelocity[0], airVelocity[1], airVelocity[2] = avx, avy, avz
+    airSpeed = math.sqrt(avx*avx + avy*avy + avz*avz) + epsilon
+    ux, uy, uz = avx/airSpeed, avy/airSpeed, avz/airSpeed
+    AoA = math.acos(min(1.0, max(-1.0, ux*R00 + uy*R10 + uz*R20)))
+    # direction of drag in the body frame, projected on the body yz-plane
+    ddy = -(R01*ux + R11*uy + R21*uz)
+    ddz = -(R02*ux + R12*uy + R22*uz)
+    projected = math.sqrt(ddy*ddy + ddz*ddz) + epsilon
+    sinAoA, cosAoA = math.sin(AoA), math.cos(AoA)
+    dlx, dly, dlz = sinAoA, cosAoA*ddy/projected, cosAoA*ddz/projected
+    aeroForces = workspace.rocket.getAeroForces(AoA, x[0:3], airVelocity)
+    dwx, dwy, dwz = aeroForces[0].tolist()
+    liftMagnitude = float(aeroForces[1])
+    dbx = R00*dwx + R10*dwy + R20*dwz
+    dby = R01*dwx + R11*dwy + R21*dwz
+    dbz = R02*dwx + R12*dwy + R22*dwz
+    lbx, lby, lbz = liftMagnitude*dlx, liftMagnitude*dly, liftMagnitude*dlz
+    forces = workspace.forces
+    forces[0, 0], forces[1, 0], forces[2, 0] = dbx, dby, dbz
+    forces[0, 1], forces[1, 1], forces[2, 1] = lbx, lby, lbz
+    forces[0, 2], forces[1, 2], forces[2, 2] = 0, 0, gravity
+    forces[0, 3], forces[1, 3], forces[2, 3] = thrust, 0, 0
+    # total force and moment about COM
+    Fx = thrust + gbx + dbx + lbx
+    if stillAtLaunchRamp:
+        Fy = Fz = 0
+        Mx = My = Mz = 0
+    else:
+        Fy = gby + dby + lby
+        Fz = gbz + dbz + lbz
+        ax, ay, az = workspace.rocket.getCOP(AoA, airSpeed, x[0:3]).tolist()
+        ax, ay, az = ax - rx, ay - ry, az - rz
+        ax_, ay_, az_ = dbx + lbx, dby + lby, dbz + lbz
+        Mx, My, Mz = ay*az_ - az*ay_, az*ax_ - ax*az_, ax*ay_ - ay*ax_
+    # dAngularVelocity = I^-1 (M + (I w) x w)
+    hx, hy, hz = I00*wx + I01*wy + I02*wz, I10*wx + I11*wy + I12*wz, I20*wx + I21*wy + I22*wz
+    bx, by, bz = Mx + hy*wz - hz*wy, My + hz*wx - hx*wz, Mz + hx*wy - hy*wx
+    C00, C01, C02 = I11*I22 - I12*I21, I02*I21 - I01*I22, I01*I12 - I02*I11
+    C10, C11, C12 = I12*I20 - I10*I22, I00*I22 - I02*I20, I02*I10 - I00*I12
+    C20, C21, C22 = I10*I21 - I11*I20, I01*I20 - I00*I21, I00*I11 - I01*I10
+    det = I00*C00 + I01*C10 + I02*C20
+    awx = (C00*bx + C01*by + C02*bz)/det
+    awy = (C10*bx + C11*by + C12*bz)/det
+    awz = (C20*bx + C21*by + C22*bz)/det
+    # dLinearVelocity = (F - m w x (v + r x w))/m - r x dAngularVelocity
+    sx, sy, sz = vx + ry*wz - rz*wy, vy + rz*wx - rx*wz, vz + rx*wy - ry*wx
+    out[7] = Fx/m - (wy*sz - wz*sy) - (ry*awz - rz*awy)
+    out[8] = Fy/m - (wz*sx - wx*sz) - (rz*awx - rx*awz)
+    out[9] = Fz/m - (wx*sy - wy*sx) - (rx*awy - ry*awx)
+    out[10], out[11], out[12] = awx, awy, awz
+
+    return out, AoA, forces
+
+class TrajectoryBuffer:
+    """
+    Storage for time, state, AoA and forces of the integrators. The arrays grow in chunks,
+    so memory and runtime follow the length of the actual flight and not a guessed upper bound.
+    """
+    def __init__(self, stateSize, capacity=4096):
+        self.__length = 0
+        self.__t = np.zeros(capacity)
+        self.__states = np.zeros((capacity, stateSize))
+        self.__AoA = np.zeros(capacity)
+        self.__forces = np.zeros((capacity, 3, 4))
+
+    def __len__(self):
+        return self.__length
+
+    def append(self, t, state, AoA, force):
+        if self.__length == len(self.__t):
+            self.__grow()
+        i = self.__length
+        self.__t[i] = t
+        self.__states[i] = state
+        self.__AoA[i] = AoA
+        self.__forces[i] = force
+        self.__length += 1
+
+    def __grow(self):
+        # Double the capacity (amortized O(1) appends)
+        chunk = len(self.__t)
+        self.__t = np.concatenate((self.__t, np.zeros(chunk)))
+        self.__states = np.concatenate((self.__states, np.zeros((chunk,) + self.__states.shape[1:])))
+        self.__AoA = np.concatenate((self.__AoA, np.zeros(chunk)))
+        self.__forces = np.concatenate((self.__forces, np.zeros((chunk, 3, 4))))
+
+    def getArrays(self):
+        """
+        :return: time, states, AoA and forces stored so far (np.arrays)
+        """
+        n = self.__length
+        return self.__t[:n], self.__states[:n], self.__AoA[:n], self.__forces[:n]
+
 # Solving simultaneous diff. equations
-def RK4(RHS, tmin, tmax, dt, w0, RHS_args=0):
+def RK4(RHS, tmin, tmax, dt, w0, RHS_args=0, events=()):
     """
     Runge-Kutta ODE solver of order 4, solving the equation system given by RHS
 
@@ -122,19 +399,21 @@ def RK4(RHS, tmin, tmax, dt, w0, RHS_args=0):
     :param dt: Float; time step, > 0
     :param w0: RHS-parameter-type; the initial state of the system
     :param RHS_args: [tupple] if RHS has several arguments, insert in order as a tupple.
-    :return: np.array[] ; matrix that contains the states at every instance (as row vectors)
+    :param events: [list] FlightEvents to locate (linear interpolation between steps). The integration
+                   stops at the first terminal event, with a last shorter step ending exactly at the event.
+    :return: np.array[] ; times, states (as row vectors), AoA and forces at every instance and a dict
+             with event times
     """
 
-    # Find times to evaluate and initialize array of positions
-    timelist = np.arange(tmin, tmax + dt, dt)
-    stateMatrix = np.zeros((len(timelist), len(w0)))
-    forceMatrix = np.zeros((len(timelist), 3, 4))
-    aoa = np.zeros(len(timelist))
+    # Number of time steps (same as np.arange(tmin, tmax + dt, dt) when tmax is finite)
+    steps = math.ceil((tmax + dt - tmin)/dt) if np.isfinite(tmax) else sys.maxsize
+    buffer = TrajectoryBuffer(len(w0), min(steps, 4096))
 
     # Initialize
-    w = w0
-    stateMatrix[0] = w
-    steps = len(timelist)
+    w = np.array(w0, dtype=float)
+    buffer.append(tmin, w, 0, np.zeros((3, 4)))
+    eventTimes = {event.getName(): [] for event in events}
+    gOld = np.array([event(tmin, w) for event in events])
 
     if RHS_args:
         def g(w, t): return RHS(w, t, *RHS_args)
@@ -143,27 +422,397 @@ def RK4(RHS, tmin, tmax, dt, w0, RHS_args=0):
 
     # Runge-Kutta algorithm
     for i in range(1, steps):
-        t = timelist[i]
+        t = tmin + i*dt
         s1, AoA, force = g(w, t)
         s2 = g(w + dt / 2 * s1, t + dt / 2)[0] # get dx only
         s3 = g(w + dt / 2 * s2, t + dt / 2)[0] # get dx only
         s4 = g(w + dt * s3, t + dt)[0] # get dx only
 
-        w = w + dt / 6 * (s1 + 2 * s2 + 2 * s3 + s4)
-        stateMatrix[i] = w  # Store new state
-        forceMatrix[i] = force  # Store forces
-        aoa[i] = AoA  # store AoA
+        wNew = w + dt / 6 * (s1 + 2 * s2 + 2 * s3 + s4)
+        gNew = np.array([event(t, wNew) for event in events])
+        stopTime = None
+        for j in np.nonzero((gOld < 0) & (gNew >= 0))[0]:
+            eventTime = t - dt*gNew[j]/(gNew[j] - gOld[j])
+            eventTimes[events[j].getName()].append(eventTime)
+            if events[j].isTerminal() and (stopTime is None or eventTime < stopTime):
+                stopTime = eventTime
+        if stopTime is not None:
+            # Last step ends at the terminal event
+            h = stopTime - (t - dt)
+            s2 = g(w + h / 2 * s1, t + h / 2)[0]
+            s3 = g(w + h / 2 * s2, t + h / 2)[0]
+            s4 = g(w + h * s3, t + h)[0]
+            w = w + h / 6 * (s1 + 2 * s2 + 2 * s3 + s4)
+            buffer.append(stopTime, w, AoA, force)
+            break
+        w = wNew
+        gOld = gNew
+        buffer.append(t, w, AoA, force)  # Store new state, AoA and forces
         #print("Iteration %5d/%d" % (i, steps - 1))
 
-    # Return state, AoA and forces at every instance (np.arrays)
-    return stateMatrix, aoa, forceMatrix
+    # Return time, state, AoA and forces at every instance (np.arrays) and events
+    timelist, stateMatrix, aoa, forceMatrix = buffer.getArrays()
+    for name in eventTimes:
+        eventTimes[name] = [time for time in eventTimes[name] if time <= timelist[-1]]
+    return timelist, stateMatrix, aoa, forceMatrix, eventTimes
+
+def RK4InPlace(RHS, tmin, tmax, dt, w0, RHS_args=(), events=()):
+    """
+    Same as RK4, for a RHS(w, t, out, *RHS_args) that writes the derivative into out and returns (out, AoA, forces).
+    The stages and intermediate states are preallocated and reused at every step.
+    """
+    steps = math.ceil((tmax + dt - tmin)/dt) if np.isfinite(tmax) else sys.maxsize
+    buffer = TrajectoryBuffer(len(w0), min(steps, 4096))
+    n = len(w0)
+    s1, s2, s3, s4 = np.zeros(n), np.zeros(n), np.zeros(n), np.zeros(n)
+    wStage = np.zeros(n)
+    wNew = np.zeros(n)
+    force = np.zeros((3, 4))  # forces of the first stage (the forces of RHS are overwritten by the later stages)
+
+    # Initialize
+    w = np.array(w0, dtype=float)
+    buffer.append(tmin, w, 0, np.zeros((3, 4)))
+    eventTimes = {event.getName(): [] for event in events}
+    gOld = np.array([event(tmin, w) for event in events])
+
+    def step(t, h, out):
+        # RK4 step of length h from w, with s1 already evaluated
+        np.multiply(s1, h/2, out=wStage)
+        np.add(wStage, w, out=wStage)
+        RHS(wStage, t + h/2, s2, *RHS_args)
+        np.multiply(s2, h/2, out=wStage)
+        np.add(wStage, w, out=wStage)
+        RHS(wStage, t + h/2, s3, *RHS_args)
+        np.multiply(s3, h, out=wStage)
+        np.add(wStage, w, out=wStage)
+        RHS(wStage, t + h, s4, *RHS_args)
+        np.add(s2, s3, out=out)
+        out *= 2
+        out += s1
+        out += s4
+        out *= h/6
+        out += w
+
+    # Runge-Kutta algorithm
+    for i in range(1, steps):
+        t = tmin + i*dt
+        AoA, stageForce = RHS(w, t, s1, *RHS_args)[1:]
+        np.copyto(force, stageForce)
+        step(t, dt, wNew)
+        gNew = np.array([event(t, wNew) for event in events])
+        stopTime = None
+        for j in np.nonzero((gOld < 0) & (gNew >= 0))[0]:
+            eventTime = t - dt*gNew[j]/(gNew[j] - gOld[j])
+            eventTimes[events[j].getName()].append(eventTime)
+            if events[j].isTerminal() and (stopTime is None or eventTime < stopTime):
+                stopTime = eventTime
+        if stopTime is not None:
+            # Last step ends at the terminal event
+            step(t, stopTime - (t - dt), wNew)
+            buffer.append(stopTime, wNew, AoA, force)
+            break
+        w, wNew = wNew, w
+        gOld = gNew
+        buffer.append(t, w, AoA, force)  # Store new state, AoA and forces
+
+    timelist, stateMatrix, aoa, forceMatrix = buffer.getArrays()
+    for name in eventTimes:
+        eventTimes[name] = [time for time in eventTimes[name] if time <= timelist[-1]]
+    return timelist, stateMatrix, aoa, forceMatrix, eventTimes
+
+# Dormand-Prince coefficients (embedded Runge-Kutta pair of order 5(4))
+DP_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1])
+DP_A = [np.array([]),
+        np.array([1/5]),
+        np.array([3/40, 9/40]),
+        np.array([44/45, -56/15, 32/9]),
+        np.array([19372/6561, -25360/2187, 64448/6561, -212/729]),
+        np.array([9017/3168, -355/33, 46732/5247, 49/176, -5103/18656])]
+DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84])
+DP_E = np.array([71/57600, 0, -71/16695, 71/1920, -17253/339200, 22/525, -1/40])  # 5th minus 4th order weights
+
+def RK45(RHS, tmin, tmax, dt, w0, RHS_args=0, events=(), rtol=1e-6, atol=1e-6):
+    """
+    Adaptive Runge-Kutta ODE solver (Dormand-Prince 5(4)) with error control and event location.
+    An event is located on the accepted step where it occurs, the solver then steps exactly to the event
+    and restarts from there, so that discontinuities in RHS (e.g. launch ramp exit, burnout) are not stepped over.
+
+    :param RHS: RHS(w, t); returns (dw, AoA, forces) like equationsMotion
+    :param tmin: Float; starting time, >= 0
+    :param tmax: Float; ending time, > tmin
+    :param dt: Float; initial time step, > 0
+    :param w0: RHS-parameter-type; the initial state of the system
+    :param RHS_args: [tupple] if RHS has several arguments, insert in order as a tupple.
+    :param events: [list] FlightEvents to locate
+    :param rtol: Float; relative tolerance of the local error
+    :param atol: Float; absolute tolerance of the local error
+    :return: times, states, AoA and forces at every accepted step (np.arrays) and a dict with event times
+    """
+    if RHS_args:
+        def g(w, t): return RHS(w, t, *RHS_args)
+    else:
+        def g(w, t): return RHS(w, t)
+
+    def step(t, w, k1, h):
+        k = [k1]
+        for i in range(1, 6):
+            k.append(g(w + h*(DP_A[i] @ np.array(k)), t + DP_C[i]*h)[0])
+        wNew = w + h*(DP_B @ np.array(k))
+        out = g(wNew, t + h)
+        k.append(out[0])
+        return wNew, out, h*(DP_E @ np.array(k))
+
+    def hermite(s, h, w, k1, wNew, k7):
+        # Cubic Hermite interpolation on the step, s in [0, 1]
+        return ((1 - s)**2*(1 + 2*s))*w + (s**2*(3 - 2*s))*wNew + h*s*(1 - s)*((1 - s)*k1 - s*k7)
+
+    t = tmin
+    w = np.array(w0, dtype=float)
+    k1, AoA, force = g(w, t)
+    buffer = TrajectoryBuffer(len(w))
+    buffer.append(t, w, AoA, force)
+    eventTimes = {event.getName(): [] for event in events}
+    gOld = np.array([event(t, w) for event in events])
+    h = dt
+    while t < tmax:
+        h = min(h, tmax - t)
+        wNew, out, error = step(t, w, k1, h)
+        scale = atol + rtol*np.maximum(np.abs(w), np.abs(wNew))
+        errorNorm = np.sqrt(np.mean((error/scale)**2))
+        if errorNorm > 1:
+            h *= max(0.2, 0.9*errorNorm**(-1/5))
+            continue
+        hNext = h*min(5, 0.9*errorNorm**(-1/5)) if errorNorm > 0 else 5*h
+        # look for events on the accepted step
+        gNew = np.array([event(t + h, wNew) for event in events])
+        crossed = np.nonzero((gOld < 0) & (gNew >= 0))[0]
+        stop = False
+        if len(crossed):
+            k7 = out[0]
+            eventTime = t + h
+            eventIndex = crossed[0]
+            for j in crossed:
+                a, b = 0, 1  # bisection on the interpolated state, keeping b on the side after the event
+                for _ in range(60):
+                    s = (a + b)/2
+                    if events[j](t + s*h, hermite(s, h, w, k1, wNew, k7)) < 0:
+                        a = s
+                    else:
+                        b = s
+                if t + b*h < eventTime:
+                    eventTime, eventIndex = t + b*h, j
+            if eventTime < t + h:
+                # step exactly to the event and restart the integration there
+                wNew, out, error = step(t, w, k1, eventTime - t)
+            h = eventTime - t
+            hNext = max(hNext, h)
+            gNew = np.array([event(eventTime, wNew) for event in events])
+            for j in crossed:
+                if j == eventIndex or gNew[j] >= 0:
+                    eventTimes[events[j].getName()].append(eventTime)
+                    gNew[j] = max(gNew[j], 0)  # the event has happened, do not detect it again
+                    stop = stop or events[j].isTerminal()
+        t = t + h
+        w = wNew
+        k1, AoA, force = out
+        gOld = gNew
+        h = hNext
+        buffer.append(t, w, AoA, force)
+        if stop:
+            break
+
+    return buffer.getArrays() + (eventTimes,)
 
 def unwrapState(x):
     position = x[:, 0:3]
     quaternion = x[:, 3:7]
     linearVelocity = x[:, 7:10]
     angularVelocity = x[:, 10:13]
-    euler = np.zeros(shape=(len(quaternion), 3))
-    for index in range(len(quaternion)):
-        euler[index,:] = Kinematics.quaternion2euler(quaternion[index,:])
+    euler = Kinematics.quaternion2eulerArray(quaternion)
     return (position, euler, linearVelocity, angularVelocity)
+
+# Ensemble of trajectories (N rockets/initial conditions integrated simultaneously)
+def calculateEnsembleTrajectory(rockets, initialInclinations, launchRampLengths, timeStep, simulationTime,
+                                wind=None):
+    """
+    Integrate N flights in one vectorized RK4 sweep. The state of the ensemble is a Nx13 array.
+    All members fly the same fixed time in the same wind, without events, stop conditions or caching, so the
+    dispersion runs of MonteCarlo and Sweep (each flight to its ground impact in its own wind, with its events and
+    outputs) fly their members with calculateTrajectory.
+
+    :param rockets: [rocket class or list of N rocket classes] the rocket(s) of the ensemble. Members
+                    sharing the same rocket instance have their mass properties and thrust evaluated once.
+    :param initialInclinations: [np.array] initial inclination of each member [rad]
+    :param launchRampLengths: [float or np.array] launch ramp length of each member [m]
+    :param timeStep: [float] time step, > 0
+    :param simulationTime: [float] end time of the simulation
+    :param wind: None, a constant wind velocity [np.array, m/s] or a Wind.WindField, the same for all members
+    :return: t and the same quantities as calculateTrajectory with a leading member axis,
+             e.g. position is a N x len(t) x 3 array.
+    """
+    initialInclinations = np.atleast_1d(initialInclinations)
+    n = len(initialInclinations)
+    if not isinstance(rockets, (list, tuple, np.ndarray)):
+        rockets = n*[rockets]
+    launchRampLengths = np.broadcast_to(launchRampLengths, (n,)).astype(float)
+    # Initial states (see initialState)
+    initialEuler = np.zeros((n, 3))
+    initialEuler[:, 0] = np.pi/2 - initialInclinations
+    initialDirections = Kinematics.RyzxArray(initialEuler)[:, :, 0]
+    x0 = np.zeros((n, 13))
+    x0[:, 0:3] = np.array([rocket.getLength() for rocket in rockets])[:, np.newaxis]*initialDirections
+    x0[:, 3:7] = Kinematics.euler2quaternionArray(initialEuler)
+    groups = groupRockets(rockets)
+    rampEnds = launchRampLengths + np.array([rocket.getLength() for rocket in rockets])
+    t = np.arange(0, simulationTime + timeStep, timeStep)
+    x, AoA, forces = RK4Ensemble(equationsMotionEnsemble, 0, simulationTime, timeStep, x0,
+                                 RHS_args=(groups, rampEnds, initialDirections, Wind.windField(wind)))
+    steps = len(t)
+    position = x[:, :, 0:3]
+    quaternion = x[:, :, 3:7]
+    linearVelocity = x[:, :, 7:10]
+    angularVelocity = x[:, :, 10:13]
+    euler = Kinematics.quaternion2eulerArray(quaternion)
+    # Transform velocity to world frame for plot
+    velocity = np.einsum('...ij,...j->...i', Kinematics.RquaternionArray(quaternion), linearVelocity)
+    drag = forces[:, :, :, 0]
+    lift = forces[:, :, :, 1]
+    gravity = forces[:, :, :, 2]
+    thrust = forces[:, :, :, 3]
+
+    return t, position, euler, AoA, velocity, angularVelocity, drag, lift, gravity, thrust
+
+def groupRockets(rockets):
+    """
+    :param rockets: [list] rocket of each ensemble member
+    :return: [list] of (rocket, member indices) for every distinct rocket instance
+    """
+    groups = {}
+    for i, rocket in enumerate(rockets):
+        groups.setdefault(id(rocket), (rocket, []))[1].append(i)
+    return [(rocket, np.array(indices)) for rocket, indices in groups.values()]
+
+def equationsMotionEnsemble(x, t, groups, rampEnds, initialDirections, wind=None):
+    """
+    Batched version of equationsMotion. Every row of x is the state of one ensemble member.
+
+    :param x: [np.array, Nx13] states of the ensemble
+    :param t: [float] time
+    :param groups: [list] (rocket, member indices) pairs, see groupRockets
+    :param rampEnds: [np.array] launchRampLength + rocket length for each member
+    :param initialDirections: [np.array, Nx3] direction of the launch ramp of each member
+    :param wind: [Wind.WindField] the wind of the members (None: no wind)
+    :return: dx [Nx13], AoA [N] and forces [Nx3x4] of each member
+    """
+    n = len(x)
+    position = x[:, 0:3]
+    quaternion = x[:, 3:7]
+    linearVelocity = x[:, 7:10]
+    angularVelocity = x[:, 10:13]
+    # determine which members are still at the launch ramp
+    stillAtLaunchRamp = np.einsum('ij,ij->i', position, initialDirections) <= rampEnds
+    # dPosition and dQuaternion
+    RotationBody2Inertial = Kinematics.RquaternionArray(quaternion)
+    RotationInertial2Body = RotationBody2Inertial.transpose(0, 2, 1)
+    dPosition = np.einsum('nij,nj->ni', RotationBody2Inertial, linearVelocity)
+    dQuaternion = np.einsum('nij,nj->ni', Kinematics.quaternionGradientArray(quaternion), angularVelocity)
+    # mass properties and thrust (evaluated once for each distinct rocket)
+    m = np.zeros(n)
+    COM = np.zeros((n, 3))
+    I = np.zeros((n, 3, 3))
+    thrust = np.zeros((n, 3))
+    for rocket, indices in groups:
+        m[indices], COM[indices], I[indices] = rocket.getMassProperties().evaluate(t)
+        thrust[indices, 0] = rocket.getMotor().thrust(t)
+    gravityWorld = np.zeros((n, 3))
+    gravityWorld[:, 2] = m*Forces.g
+    gravityBody = np.einsum('nij,nj->ni', RotationInertial2Body, gravityWorld)
+    # aerodynamic forces
+    windVelocity = np.zeros(3) if wind is None else wind.getVelocity(np.abs(position[:, 2]), t)
+    # Subtract wind from current rocket velocity to get velocity relative to the air
+    airVelocity = dPosition - windVelocity
+    xAxisBody = RotationBody2Inertial[:, :, 0]
+    airSpeed = np.linalg.norm(airVelocity, axis=1)
+    dirWindVelocity = airVelocity/(airSpeed + epsilon)[:, np.newaxis]
+    AoA = np.arccos(np.einsum('ij,ij->i', dirWindVelocity, xAxisBody))
+    dirDragBody = np.einsum('nij,nj->ni', RotationInertial2Body, -dirWindVelocity)
+    projectedDragBody = dirDragBody.copy()
+    projectedDragBody[:, 0] = 0
+    dirProjectedDragBody = projectedDragBody/(np.linalg.norm(projectedDragBody, axis=1) + epsilon)[:, np.newaxis]
+    dirLiftBody = np.cos(AoA)[:, np.newaxis]*dirProjectedDragBody
+    dirLiftBody[:, 0] += np.sin(AoA)
+    dragWorld = np.zeros((n, 3))
+    liftMagnitude = np.zeros(n)
+    COP = np.zeros((n, 3))
+    for rocket, indices in groups:
+        dragWorld[indices], liftMagnitude[indices] = rocket.getAeroForcesArray(AoA[indices], position[indices],
+                                                                                airVelocity[indices])
+        COP[indices] = rocket.getCOPArray(AoA[indices], airSpeed[indices], position[indices])
+    drag = np.einsum('nij,nj->ni', RotationInertial2Body, dragWorld)
+    lift = liftMagnitude[:, np.newaxis]*dirLiftBody
+    # inertia matrix and coriolis matrix for equations of motion
+    # seen from origin of body frame, not from center of mass (See Fossen)
+    H = np.tile(np.eye(6), (n, 1, 1))
+    H[:, 0:3, 3:6] = Kinematics.CrossProductMatrixArray(COM)
+    HT = H.transpose(0, 2, 1)
+    M = np.zeros((n, 6, 6))
+    M[:, 0:3, 0:3] = m[:, np.newaxis, np.newaxis]*np.eye(3)
+    M[:, 3:6, 3:6] = I
+    IBody = HT @ M @ H
+    S = np.zeros((n, 6, 6))
+    S[:, 0:3, 0:3] = Kinematics.CrossProductMatrixArray(m[:, np.newaxis]*angularVelocity)
+    S[:, 3:6, 3:6] = -Kinematics.CrossProductMatrixArray(np.einsum('nij,nj->ni', I, angularVelocity))
+    CBody = HT @ S @ H
+    # obtain generalized forces seen from origin of body frame
+    totalForce = thrust + gravityBody + drag + lift
+    forceMatrix = np.stack((drag, lift, gravityWorld, thrust), axis=2)
+    totalMoment = np.cross(COP - COM, drag + lift)
+    totalForce[stillAtLaunchRamp, 1:3] = 0
+    totalMoment[stillAtLaunchRamp] = 0
+    genForceBody = np.einsum('nij,nj->ni', HT, np.concatenate((totalForce, totalMoment), axis=1))
+    # find dx
+    genVelocity = np.concatenate((linearVelocity, angularVelocity), axis=1)
+    rhs = genForceBody - np.einsum('nij,nj->ni', CBody, genVelocity)
+    dGeneralizedVelocity = np.linalg.solve(IBody, rhs[:, :, np.newaxis])[:, :, 0]
+    dx = np.concatenate((dPosition, dQuaternion, dGeneralizedVelocity), axis=1)
+
+    return dx, AoA, forceMatrix
+
+def RK4Ensemble(RHS, tmin, tmax, dt, W0, RHS_args=0):
+    """
+    Runge-Kutta ODE solver of order 4 for an ensemble of states (see RK4)
+
+    :param RHS: RHS(W, t); Derivative of the states W (Nxn array, one state per row)
+    :param W0: [np.array, Nxn] the initial states of the ensemble
+    :return: states [N x steps x n], AoA [N x steps] and forces [N x steps x 3 x 4] of every member
+    """
+    timelist = np.arange(tmin, tmax + dt, dt)
+    steps = len(timelist)
+    n = len(W0)
+    stateMatrix = np.zeros((n, steps, W0.shape[1]))
+    forceMatrix = np.zeros((n, steps, 3, 4))
+    aoa = np.zeros((n, steps))
+
+    # Initialize
+    w = W0
+    stateMatrix[:, 0] = w
+
+    if RHS_args:
+        def g(w, t): return RHS(w, t, *RHS_args)
+    else:
+        def g(w, t): return RHS(w, t)
+
+    # Runge-Kutta algorithm
+    for i in range(1, steps):
+        t = timelist[i]
+        s1, AoA, force = g(w, t)
+        s2 = g(w + dt / 2 * s1, t + dt / 2)[0] # get dx only
+        s3 = g(w + dt / 2 * s2, t + dt / 2)[0] # get dx only
+        s4 = g(w + dt * s3, t + dt)[0] # get dx only
+
+        w = w + dt / 6 * (s1 + 2 * s2 + 2 * s3 + s4)
+        stateMatrix[:, i] = w  # Store new states
+        forceMatrix[:, i] = force  # Store forces
+        aoa[:, i] = AoA  # store AoA
+
+    return stateMatrix, aoa, forceMatrix
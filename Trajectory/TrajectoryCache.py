@@ -0,0 +1,219 @@
+"""
+Cache of simulated trajectories (opt-in, see the cache argument of Trajectory.calculateTrajectory)
+
+A trajectory is stored under a content hash of everything it depends on: the files the rocket was read from (rocket
+and part files, init file and CFD data or aero database), its motor, its dispersions, the launch and integration
+parameters, the wind and atmosphere tables and the source of the simulation modules. A rerun of the same flight
+(e.g. to change a plot) loads the stored arrays instead of integrating again. Rockets that were not read from files
+are not cached. The entries are .npz files in one directory; when the directory grows beyond its maximal size the
+least recently used entries are removed.
+
+--Propulse NTNU--
+"""
+import sys
+sys.path.append('../Rocket/')
+sys.path.append('../Forces/')
+sys.path.append('../Trajectory/')
+import os
+import time
+import hashlib
+import numpy as np
+import Forces
+import Wind
+from TrajectoryResult import TrajectoryResult
+from lib.File_utilities import file_digest, save_npz
+
+cacheVersion = 1  # part of the keys, increased when the stored arrays change
+defaultDirectory = '__trajectorycache__'
+defaultMaxSize = 2**30  # [bytes]
+
+# The source of the simulation: every module of these directories (relative to the repository), a change of any of
+# them gives new keys
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+codeDirectories = ('Rocket', 'Forces', 'Trajectory')
+codeDigest = None  # digest of the source, computed once per process (see codeVersion)
+
+def codeVersion():
+    """
+    :return: [str] SHA-1 digest (hex) of the source files (.py) of the simulation, computed when first asked for
+    """
+    global codeDigest
+    if codeDigest is None:
+        key = hashlib.sha1()
+        for directory in codeDirectories:
+            for path, directories, files in os.walk(os.path.join(root, directory)):
+                directories[:] = sorted(name for name in directories if name != '__pycache__')
+                for file in sorted(files):
+                    if file.endswith('.py'):
+                        name = os.path.relpath(os.path.join(path, file), root).replace(os.sep, '/')
+                        key.update(('%s %s' % (name, file_digest(os.path.join(path, file)))).encode())
+        codeDigest = key.hexdigest()
+    return codeDigest
+
+def motorDigest(motor):
+    """
+    :return: [str] SHA-1 digest (hex) of the thrust curve (with the thrust scale) and properties of a Motor
+    """
+    key = hashlib.sha1(motor.getName().encode())
+    for array in motor.getThrustCurve():
+        key.update(np.ascontiguousarray(array, dtype=float).tobytes())
+    key.update(repr([motor.getTotalImpulse(), motor.getMass(0), motor.getMass(motor.getBurnTime()),
+                     motor.getLength(), motor.getDiameter()]).encode())
+    return key.hexdigest()
+
+def trajectoryKey(rocket, initialInclination, launchRampLength, timeStep, simulationTime=None, method='RK4',
+                  rtol=1e-6, atol=1e-6, stopCondition=None, backend='reference', wind=None):
+    """
+    :param: see Trajectory.calculateTrajectory
+    :return: [str] SHA-1 digest (hex) of everything the trajectory depends on, None if the rocket was not read from
+             files
+    """
+    definition = rocket.getDefinition() if hasattr(rocket, 'getDefinition') else None
+    if definition is None or definition['files'] is None:
+        return None
+    key = hashlib.sha1(('%d %s %s' % (cacheVersion, codeVersion(), type(rocket).__name__)).encode())
+    for file in definition['files']:
+        key.update(file_digest(file).encode())
+    key.update(motorDigest(rocket.getMotor()).encode())
+    values = [(name, sorted(value.items()) if isinstance(value, dict) else value)
+              for name, value in sorted(definition.items()) if name != 'files']
+    parameters = [np.asarray(value).tolist() for value in (initialInclination, launchRampLength, timeStep,
+                                                           simulationTime, method, rtol, atol, stopCondition, backend)]
+    key.update(repr((values, parameters)).encode())
+    wind = Wind.windField(wind)
+    tables = wind.getTables() if wind is not None else ()
+    atmosphere = Forces.getAtmosphere()
+    for table in tables + atmosphere.getTables() + (atmosphere.getGroundAltitude(),):
+        key.update(np.ascontiguousarray(table, dtype=float).tobytes())
+    return key.hexdigest()
+
+def trajectoryCache(cache):
+    """
+    :param cache: None, True (the default cache), the directory of a cache [str] or a TrajectoryCache
+    :return: [TrajectoryCache] the cache, None for no caching
+    """
+    if cache is None or cache is False:
+        return None
+    if isinstance(cache, TrajectoryCache):
+        return cache
+    if cache is True:
+        return TrajectoryCache()
+    return TrajectoryCache(cache)
+
+class TrajectoryCache:
+    def __init__(self, directory=defaultDirectory, maxSize=defaultMaxSize):
+        """
+        :param directory: [str] directory of the entries (created when the first entry is saved)
+        :param maxSize: [int] maximal total size of the entries [bytes], the least recently used are removed
+        """
+        self.__directory = directory
+        self.__maxSize = maxSize
+
+    def getDirectory(self):
+        return self.__directory
+
+    def getMaxSize(self):
+        return self.__maxSize
+
+    def __path(self, key):
+        return os.path.join(self.__directory, '%s.npz' % key)
+
+    @staticmethod
+    def __touch(path):
+        # The modification time is the last use, set from the precise clock (the file system clock may be coarser
+        # than the time between a save and a load)
+        now = time.time_ns()
+        os.utime(path, ns=(now, now))
+
+    def key(self, rocket, *args, **kwargs):
+        """
+        :return: [str] the key of the trajectory, see trajectoryKey
+        """
+        return trajectoryKey(rocket, *args, **kwargs)
+
+    def load(self, key, rocket=None, wind=None):
+        """
+        :param rocket, wind: the rocket and wind of the result (see TrajectoryResult)
+        :return: [TrajectoryResult] the stored trajectory, None if it is not in the cache
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path) as data:
+                events = {name[len('event_'):]: data[name].tolist() for name in data.files
+                          if name.startswith('event_')}
+                result = TrajectoryResult(data['t'], data['x'], data['AoA'], data['forces'], events, rocket, wind)
+            self.__touch(path)
+        except (OSError, KeyError, ValueError):
+            return None
+        return result
+
+    def save(self, key, t, x, AoA, forces, events):
+        """
+        Store a trajectory (the output of Trajectory.integrateEquationsMotion) and remove the least recently used
+        entries beyond the maximal size.
+        """
+        os.makedirs(self.__directory, exist_ok=True)
+        arrays = {'t': t, 'x': x, 'AoA': AoA, 'forces': forces}
+        arrays.update({'event_' + name: np.asarray(times, dtype=float) for name, times in events.items()})
+        try:
+            save_npz(self.__path(key), arrays)  # other processes may save or load the same entry
+            self.__touch(self.__path(key))
+        except OSError:
+            print("WARNING: could not save the trajectory to '%s'." % self.__directory)
+            return
+        self.evict()
+
+    def inspect(self):
+        """
+        :return: [list] the entries, most recently used first, as dicts with key, size [bytes] and lastUse
+                 (seconds since the epoch)
+        """
+        if not os.path.isdir(self.__directory):
+            return []
+        entries = []
+        with os.scandir(self.__directory) as files:
+            for file in files:
+                if file.is_file() and file.name.endswith('.npz'):
+                    stat = file.stat()
+                    entries.append({'key': file.name[:-len('.npz')], 'size': stat.st_size, 'lastUse': stat.st_mtime})
+        return sorted(entries, key=lambda entry: entry['lastUse'], reverse=True)
+
+    def getSize(self):
+        """
+        :return: [int] total size of the entries [bytes]
+        """
+        return sum(entry['size'] for entry in self.inspect())
+
+    def __contains__(self, key):
+        return os.path.exists(self.__path(key))
+
+    def __len__(self):
+        return len(self.inspect())
+
+    def evict(self, maxSize=None):
+        """
+        Remove the least recently used entries until the total size is at most maxSize (default: the maximal size
+        of the cache).
+        """
+        maxSize = self.__maxSize if maxSize is None else maxSize
+        entries = self.inspect()
+        size = sum(entry['size'] for entry in entries)
+        while entries and size > maxSize:
+            entry = entries.pop()
+            try:
+                os.remove(self.__path(entry['key']))
+            except OSError:
+                continue  # removed by another process
+            size -= entry['size']
+
+    def clear(self):
+        """
+        Remove all entries.
+        """
+        self.evict(0)
+
+    def __repr__(self):
+        entries = self.inspect()
+        return 'TrajectoryCache(%r): %d trajectories, %.1f of %.1f MB, last used %s' % (
+            self.__directory, len(entries), sum(entry['size'] for entry in entries)/1e6, self.__maxSize/1e6,
+            time.ctime(entries[0]['lastUse']) if entries else 'never')
@@ -0,0 +1,164 @@
+"""
+Result of Trajectory.calculateTrajectory
+
+The integrated quantities are stored as columns of one contiguous structured array (one row per time step);
+the get functions of the columns return views without copying. Derived quantities are calculated when
+first asked for and kept.
+
+--Propulse NTNU--
+"""
+import numpy as np
+import Kinematics
+import Forces
+import Wind
+
+resultType = np.dtype([('t', float), ('position', float, 3), ('quaternion', float, 4), ('linearVelocity', float, 3),
+                       ('angularVelocity', float, 3), ('AoA', float), ('drag', float, 3), ('lift', float, 3),
+                       ('gravity', float, 3), ('thrust', float, 3)])
+
+class TrajectoryResult:
+    """
+    Iterating gives the legacy tuple
+    (t, position, euler, AoA, velocity (world frame), angularVelocity, drag, lift, gravity, thrust),
+    so old call sites may still unpack it. Columns are also available by name: result['position'].
+    """
+    def __init__(self, t, x, AoA, forces, events, rocket=None, wind=None):
+        """
+        :param t, x, AoA, forces, events: output of Trajectory.integrateEquationsMotion
+        :param rocket: [rocket class] the simulated rocket (for the stability margin)
+        :param wind: None, the constant wind velocity [np.array, m/s] or the Wind.WindField of the simulation
+        """
+        self.__data = np.zeros(len(t), dtype=resultType)
+        self.__data['t'] = t
+        self.__data['position'] = x[:, 0:3]
+        self.__data['quaternion'] = x[:, 3:7]
+        self.__data['linearVelocity'] = x[:, 7:10]
+        self.__data['angularVelocity'] = x[:, 10:13]
+        self.__data['AoA'] = AoA
+        self.__data['drag'] = forces[:, :, 0]
+        self.__data['lift'] = forces[:, :, 1]
+        self.__data['gravity'] = forces[:, :, 2]
+        self.__data['thrust'] = forces[:, :, 3]
+        self.__events = events
+        self.__rocket = rocket
+        self.__wind = Wind.windField(wind)
+        self.__derived = {}
+
+    def __iter__(self):
+        return iter((self.getTime(), self.getPosition(), self.getEuler(), self.getAoA(), self.getVelocity(),
+                     self.getAngularVelocity(), self.getDrag(), self.getLift(), self.getGravity(), self.getThrust()))
+
+    def __getitem__(self, key):
+        # Column by name, or entry of the legacy tuple by index
+        if isinstance(key, str):
+            return self.__data[key]
+        return tuple(self)[key]
+
+    # Integrated quantities (views of the columns)
+    def getData(self):
+        """
+        :return: [np.array] the structured array of the result (one row per time step)
+        """
+        return self.__data
+
+    def getTime(self):
+        return self.__data['t']
+
+    def getPosition(self):
+        return self.__data['position']
+
+    def getQuaternion(self):
+        return self.__data['quaternion']
+
+    def getLinearVelocity(self):
+        """
+        :return: [np.array] linear velocity in the body frame [m/s]
+        """
+        return self.__data['linearVelocity']
+
+    def getAngularVelocity(self):
+        return self.__data['angularVelocity']
+
+    def getAoA(self):
+        return self.__data['AoA']
+
+    def getDrag(self):
+        return self.__data['drag']
+
+    def getLift(self):
+        return self.__data['lift']
+
+    def getGravity(self):
+        return self.__data['gravity']
+
+    def getThrust(self):
+        return self.__data['thrust']
+
+    def getEvents(self):
+        """
+        :return: [dict] event name -> list of event times (see Trajectory.flightEvents)
+        """
+        return self.__events
+
+    def getRocket(self):
+        return self.__rocket
+
+    # Derived quantities (calculated on first access)
+    def __cached(self, name, function):
+        if name not in self.__derived:
+            self.__derived[name] = function()
+        return self.__derived[name]
+
+    def getEuler(self):
+        """
+        :return: [np.array] euler angles (pitch, yaw, roll) [rad]
+        """
+        return self.__cached('euler', lambda: Kinematics.quaternion2eulerArray(self.getQuaternion()))
+
+    def getVelocity(self):
+        """
+        :return: [np.array] velocity in the world frame [m/s]
+        """
+        return self.__cached('velocity', lambda: np.einsum('nij,nj->ni', Kinematics.RquaternionArray(
+            self.getQuaternion()), self.getLinearVelocity()))
+
+    def getAirVelocity(self):
+        """
+        :return: [np.array] velocity relative to the air in the world frame [m/s]
+        """
+        def airVelocity():
+            return self.getVelocity() - self.__wind.getVelocity(np.abs(self.getPosition()[:, 2]), self.getTime())
+        return self.__cached('airVelocity', airVelocity)
+
+    def getWind(self):
+        """
+        :return: [Wind.WindField] the wind of the simulation
+        """
+        return self.__wind
+
+    def getMach(self):
+        def mach():
+            speedOfSound = Forces.getAtmosphere().getSpeedOfSound(np.abs(self.getPosition()[:, 2]))
+            return np.linalg.norm(self.getAirVelocity(), axis=1)/speedOfSound
+        return self.__cached('mach', mach)
+
+    def getDynamicPressure(self):
+        """
+        :return: [np.array] dynamic pressure 1/2 rho v^2 [Pa]
+        """
+        def dynamicPressure():
+            density = Forces.getAtmosphere().getDensity(np.abs(self.getPosition()[:, 2]))
+            return 1/2*density*np.sum(self.getAirVelocity()**2, axis=1)
+        return self.__cached('dynamicPressure', dynamicPressure)
+
+    def getStabilityMargin(self):
+        """
+        :return: [np.array] distance from COP to COM along the rocket (positive when stable) [m]
+        """
+        def stabilityMargin():
+            if self.__rocket is None:
+                raise ValueError("The stability margin needs the rocket of the simulation.")
+            COM = self.__rocket.getMassProperties().getCOMArray(self.getTime())[:, 0]
+            airSpeed = np.linalg.norm(self.getAirVelocity(), axis=1)
+            return COM - self.__rocket.getCOPArray(self.getAoA(), airSpeed, self.getPosition())[:, 0]
+        return self.__cached('stabilityMargin', stabilityMargin)
@@ -44,18 +44,18 @@ simulationTime= 30
 trajectory = Trajectory.calculateTrajectory(Rocket1, initialInclination, launchRampLength, 
                                             timeStep, simulationTime)
 # Kinematics
-t = trajectory[0]
-position = trajectory[1]
-euler = trajectory[2]
-AoA = trajectory[3]
-linearVelocity = trajectory[4]
-angularVelocity = trajectory[5]
+t = trajectory.getTime()
+position = trajectory.getPosition()
+euler = trajectory.getEuler()
+AoA = trajectory.getAoA()
+linearVelocity = trajectory.getVelocity()  # in world frame
+angularVelocity = trajectory.getAngularVelocity()
 
 #Forces (as len(t)x3 matrices, one row correspond to 1 instance in time )
-drag = trajectory[6]
-lift = trajectory[7]
-gravity = trajectory[8]
-thrust = trajectory[9]
+drag = trajectory.getDrag()
+lift = trajectory.getLift()
+gravity = trajectory.getGravity()
+thrust = trajectory.getThrust()
 
 # Visualize trajectory
 